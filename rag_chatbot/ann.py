@@ -0,0 +1,174 @@
+"""Inverted-file (IVF) approximate nearest-neighbour search over an index matrix."""
+
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+from .vectors import matrix_digest, normalize_rows, top_k_indices
+
+_ASSIGN_BLOCK_ROWS = 16384
+
+
+def _assign(matrix: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    assignments = np.empty(matrix.shape[0], dtype=np.int64)
+    for start in range(0, matrix.shape[0], _ASSIGN_BLOCK_ROWS):
+        block = matrix[start : start + _ASSIGN_BLOCK_ROWS]
+        assignments[start : start + block.shape[0]] = np.argmax(block @ centroids.T, axis=1)
+    return assignments
+
+
+def _train_centroids(
+    sample: np.ndarray, lists: int, iterations: int, rng: np.random.Generator
+) -> np.ndarray:
+    """Spherical k-means: centroids are kept unit-length so scoring stays cosine."""
+    centroids = sample[rng.choice(sample.shape[0], lists, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = _assign(sample, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, sample)
+        empty = np.bincount(assignments, minlength=lists) == 0
+        if empty.any():
+            # Re-seed empty lists from random rows so every list stays useful.
+            sums[empty] = sample[rng.choice(sample.shape[0], int(empty.sum()))]
+        centroids = normalize_rows(sums)
+    return centroids
+
+
+@dataclass(frozen=True)
+class IVFIndex:
+    """Rows grouped into ``lists`` clusters; a query only scores the closest clusters.
+
+    ``ids[offsets[i]:offsets[i + 1]]`` are the matrix rows assigned to centroid
+    ``i``. Searching ``nprobe`` lists trades recall for speed; probing every list
+    is an exact search. ``digest`` is the :func:`matrix_digest` of the matrix
+    the index was built from.
+    """
+
+    centroids: np.ndarray
+    offsets: np.ndarray
+    ids: np.ndarray
+    digest: str
+
+    @property
+    def lists(self) -> int:
+        return self.centroids.shape[0]
+
+    @staticmethod
+    def build(
+        matrix: np.ndarray,
+        *,
+        lists: int,
+        iterations: int = 20,
+        sample_size: int | None = None,
+        seed: int = 0,
+        digest: str | None = None,
+    ) -> "IVFIndex":
+        """Train centroids on a sample of ``matrix`` (unit rows) and assign every row."""
+        count = matrix.shape[0]
+        lists = max(1, min(lists, count))
+        rng = np.random.default_rng(seed)
+        sample_size = min(count, sample_size or 256 * lists)
+        sample_rows = np.sort(rng.choice(count, sample_size, replace=False))
+        sample = np.asarray(matrix[sample_rows], dtype=np.float32)
+        centroids = _train_centroids(sample, lists, iterations, rng)
+        assignments = _assign(matrix, centroids)
+        ids = np.argsort(assignments, kind="stable")
+        offsets = np.zeros(lists + 1, dtype=np.int64)
+        np.cumsum(np.bincount(assignments, minlength=lists), out=offsets[1:])
+        id_dtype = np.int32 if count < 2**31 else np.int64
+        return IVFIndex(
+            centroids=centroids,
+            offsets=offsets,
+            ids=ids.astype(id_dtype),
+            digest=digest or matrix_digest(matrix),
+        )
+
+    def candidates(self, query: np.ndarray, nprobe: int) -> np.ndarray:
+        """Return the rows of the ``nprobe`` lists closest to ``query``, ascending."""
+        probes = top_k_indices(self.centroids @ query, nprobe)
+        rows = np.concatenate(
+            [self.ids[self.offsets[probe] : self.offsets[probe + 1]] for probe in probes]
+        )
+        # Ascending rows keep tie order stable and read the matrix front to back.
+        rows.sort()
+        return rows
+
+    def search(
+        self, matrix: np.ndarray, query: np.ndarray, *, top_k: int, nprobe: int
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Return ``(rows, scores)`` of the best ``top_k`` rows in the ``nprobe`` nearest lists.
+
+        ``query`` must be unit-length. Rows are returned best first with ties in
+        row order, like an exact search.
+        """
+        rows = self.candidates(query, nprobe)
+        scores = matrix[rows] @ query
+        best = top_k_indices(scores, top_k)
+        return rows[best], scores[best]
+
+    def save(self, path: Path) -> None:
+        with path.open("wb") as handle:
+            np.savez(
+                handle,
+                centroids=self.centroids,
+                offsets=self.offsets,
+                ids=self.ids,
+                digest=np.array(self.digest),
+            )
+
+    @staticmethod
+    def load(path: Path) -> "IVFIndex":
+        with np.load(path, allow_pickle=False) as data:
+            return IVFIndex(
+                centroids=data["centroids"],
+                offsets=data["offsets"],
+                ids=data["ids"],
+                digest=str(data["digest"]),
+            )
+
+
+def recall_report(
+    matrix: np.ndarray,
+    ann: IVFIndex,
+    queries: np.ndarray,
+    *,
+    top_k: int,
+    nprobes: list[int],
+) -> list[dict[str, float]]:
+    """Measure recall@k and latency of IVF search against exact search.
+
+    ``queries`` must be unit-length rows. Returns one row per ``nprobe`` plus an
+    ``nprobe=0`` row for the exact baseline.
+    """
+    exact_results = []
+    exact_times = []
+    for query in queries:
+        started = time.perf_counter()
+        exact_results.append(set(top_k_indices(matrix @ query, top_k).tolist()))
+        exact_times.append(time.perf_counter() - started)
+    report = [_report_row(0, 1.0, exact_times)]
+    for nprobe in nprobes:
+        hits = 0
+        times = []
+        for query, expected in zip(queries, exact_results):
+            started = time.perf_counter()
+            rows, _ = ann.search(matrix, query, top_k=top_k, nprobe=nprobe)
+            times.append(time.perf_counter() - started)
+            hits += len(expected.intersection(rows.tolist()))
+        expected_total = sum(len(expected) for expected in exact_results)
+        report.append(_report_row(nprobe, hits / expected_total if expected_total else 1.0, times))
+    return report
+
+
+def _report_row(nprobe: int, recall: float, times: list[float]) -> dict[str, float]:
+    latencies = np.asarray(times) * 1000.0
+    return {
+        "nprobe": nprobe,
+        "recall": recall,
+        "p50_ms": float(np.percentile(latencies, 50)) if len(latencies) else 0.0,
+        "p99_ms": float(np.percentile(latencies, 99)) if len(latencies) else 0.0,
+    }
@@ -2,18 +2,68 @@
 
 from __future__ import annotations
 
+import asyncio
+import json
+import logging
+import threading
+from contextlib import aclosing, asynccontextmanager
 from dataclasses import asdict
-from typing import List
+from typing import AsyncIterator, Iterable, Iterator, List
 
 from fastapi import FastAPI, HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
 
-from .chat import generate_answer
+from .caching import ChatCaches
+from .chat import ChatResponse as GeneratedAnswer
+from .chat import generate_answer_async, generate_answer_stream
+from .clients import get_clients
 from .config import AppConfig
-from .indexing import build_vector_index_from_gcs, load_vector_index, save_vector_index
-from .retrieval import RetrievedChunk, retrieve_context
+from .embeddings import VertexEmbeddingClient
+from .index_cache import IndexCache
+from .indexing import IndexEntry, iter_gcs_index_entries, write_vector_index
+from .metrics import CONTENT_TYPE, REGISTRY, MetricsMiddleware
+from .prompting import assemble_context
+from .retrieval import (
+    embed_queries_async,
+    embed_query_async,
+    needs_query_embedding,
+    retrieve_context_async,
+    retrieve_context_batch_async,
+    shutdown_shard_workers,
+)
 
-app = FastAPI(title="RAG Chatbot API")
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Warm up shared clients and the index at startup; release them at shutdown.
+
+    Warm-up also imports the Vertex and Cloud Storage SDKs, which the package
+    otherwise defers to first use, so it finishes before the service accepts
+    requests.
+    """
+    config = AppConfig.from_env()
+    if config.warm_up_clients and not config.validate():
+        try:
+            await asyncio.to_thread(get_clients().warm_up, config)
+            await index_cache.get_async(config)
+        except Exception:  # the first request retries and reports it
+            logger.warning("Warm-up failed; clients load on first use", exc_info=True)
+    try:
+        yield
+    finally:
+        shutdown_shard_workers()
+        get_clients().close()
+
+
+app = FastAPI(title="RAG Chatbot API", lifespan=lifespan)
+app.add_middleware(MetricsMiddleware)
+index_cache = IndexCache()
+_chat_caches: ChatCaches | None = None
+_chat_caches_lock = threading.Lock()
 
 
 class ChatRequest(BaseModel):
@@ -29,11 +79,23 @@ class Source(BaseModel):
 class ChatResponse(BaseModel):
     answer: str
     sources: List[Source]
+    prompt_tokens: int = 0
+    # Estimated context tokens left out as near-duplicates or over PROMPT_TOKEN_BUDGET.
+    tokens_saved: int = 0
+
+
+class BatchChatRequest(BaseModel):
+    queries: List[str]
+    # False skips Gemini and returns only the retrieved sources (e.g. for retrieval evals).
+    generate: bool = True
 
 
 class IndexRequest(BaseModel):
     prefix: str | None = None
     overwrite: bool = True
+    # Only re-embed blobs that are new or changed since the last build; implies updating
+    # the existing index in place, so ``overwrite`` is not consulted.
+    incremental: bool = False
 
 
 class IndexResponse(BaseModel):
@@ -53,32 +115,243 @@ def _load_config() -> AppConfig:
     return config
 
 
+def _get_embedding_client(config: AppConfig) -> VertexEmbeddingClient:
+    """Return the process-wide embedding client, so its model handle is loaded once."""
+    return get_clients().embedding_client(config)
+
+
+def _get_chat_caches(config: AppConfig) -> ChatCaches:
+    """Return the chat caches, sized from the first validated configuration."""
+    global _chat_caches
+    with _chat_caches_lock:
+        if _chat_caches is None:
+            _chat_caches = ChatCaches.from_config(config)
+        return _chat_caches
+
+
+def _chat_cache_samples(stat: str):
+    caches = _chat_caches
+    if caches is None:
+        return []
+    return [
+        ({"cache": name}, stats[stat])
+        for name, stats in caches.stats().items()
+        if stats is not None
+    ]
+
+
+REGISTRY.collector(
+    "rag_chat_cache_hits_total",
+    "Chat cache lookups that returned a stored value.",
+    ("cache",),
+    "counter",
+    lambda: _chat_cache_samples("hits"),
+)
+REGISTRY.collector(
+    "rag_chat_cache_misses_total",
+    "Chat cache lookups that found nothing usable.",
+    ("cache",),
+    "counter",
+    lambda: _chat_cache_samples("misses"),
+)
+REGISTRY.collector(
+    "rag_chat_cache_entries",
+    "Entries held by each chat cache.",
+    ("cache",),
+    "gauge",
+    lambda: _chat_cache_samples("size"),
+)
+
+
 @app.get("/healthz")
 def healthz() -> dict[str, str]:
     _load_config()
     return {"status": "ok"}
 
 
+@app.get("/metrics")
+def metrics() -> Response:
+    """Prometheus metrics: stage and Vertex latencies, cache results and index size."""
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
+@app.get("/cache/stats")
+def cache_stats() -> dict[str, dict[str, float] | None]:
+    return _get_chat_caches(_load_config()).stats()
+
+
 @app.post("/chat", response_model=ChatResponse)
-def chat(request: ChatRequest) -> ChatResponse:
+async def chat(request: ChatRequest) -> ChatResponse:
     config = _load_config()
-    chunks = retrieve_context(config, request.query)
-    response = generate_answer(config, request.query, chunks)
-    sources = [Source(**asdict(chunk)) for chunk in response.sources]
-    return ChatResponse(answer=response.answer, sources=sources)
+    index, index_version = await index_cache.get_with_version_async(config)
+    chat_caches = _get_chat_caches(config)
+    answers = chat_caches.answers
+    query_embedding = None
+    if answers is not None:
+        query_embedding = await embed_query_async(
+            config,
+            request.query,
+            cache=chat_caches.query_embeddings,
+            client=_get_embedding_client(config),
+        )
+        cached = answers.get(query_embedding, index_version)
+        if cached is not None:
+            return cached
+    chunks = await retrieve_context_async(
+        config,
+        request.query,
+        index=index,
+        query_embedding=query_embedding,
+        embedding_cache=chat_caches.query_embeddings,
+        embedding_client=_get_embedding_client(config),
+    )
+    response = await generate_answer_async(config, request.query, chunks)
+    result = _chat_response(response)
+    if answers is not None:
+        answers.put(query_embedding, index_version, result)
+    return result
+
+
+def _chat_response(response: GeneratedAnswer) -> ChatResponse:
+    return ChatResponse(
+        answer=response.answer,
+        sources=[Source(**asdict(chunk)) for chunk in response.sources],
+        prompt_tokens=response.prompt_tokens,
+        tokens_saved=response.tokens_saved,
+    )
+
+
+@app.post("/chat/batch")
+async def chat_batch(request: BatchChatRequest) -> StreamingResponse:
+    """Answer many queries, streaming one JSON line per query as soon as it is done.
+
+    Lines arrive in completion order and carry the query's position as
+    ``index`` plus the ``/chat`` response fields, or ``error`` if that query
+    failed. All queries are embedded in batched requests and searched together;
+    up to ``BATCH_CONCURRENCY`` answers are generated at once.
+    """
+    config = _load_config()
+    queries = request.queries
+    if len(queries) > config.batch_max_queries:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {config.batch_max_queries} queries per batch (BATCH_MAX_QUERIES)",
+        )
+    index, index_version = await index_cache.get_with_version_async(config)
+    chat_caches = _get_chat_caches(config)
+    answers = chat_caches.answers if request.generate else None
+    query_embeddings = None
+    if answers is not None or needs_query_embedding(config):
+        query_embeddings = await embed_queries_async(
+            config,
+            queries,
+            cache=chat_caches.query_embeddings,
+            client=_get_embedding_client(config),
+        )
+    contexts = await retrieve_context_batch_async(
+        config, queries, index=index, query_embeddings=query_embeddings
+    )
+    semaphore = asyncio.Semaphore(max(1, config.batch_concurrency))
+
+    async def answer(position: int) -> dict:
+        chunks = contexts[position]
+        if not request.generate:
+            sources = [Source(**asdict(chunk)) for chunk in chunks]
+            return {"index": position, "sources": jsonable_encoder(sources)}
+        try:
+            result = None
+            if answers is not None:
+                result = answers.get(query_embeddings[position], index_version)
+            if result is None:
+                async with semaphore:
+                    response = await generate_answer_async(config, queries[position], chunks)
+                result = _chat_response(response)
+                if answers is not None:
+                    answers.put(query_embeddings[position], index_version, result)
+        except Exception as exc:  # noqa: BLE001 - reported on this query's line
+            return {"index": position, "error": str(exc)}
+        return {"index": position, **jsonable_encoder(result)}
+
+    async def lines() -> AsyncIterator[str]:
+        tasks = [asyncio.create_task(answer(position)) for position in range(len(queries))]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield json.dumps(await finished) + "\n"
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+def _sse_event(event: str, data: object) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest) -> StreamingResponse:
+    """Stream an answer as server-sent events.
+
+    Emits one ``sources`` event with the chunks placed in the prompt, then
+    ``token`` events while Gemini generates, then ``done`` with the prompt's
+    ``prompt_tokens`` and ``tokens_saved`` (or ``error`` if generation fails).
+    """
+    config = _load_config()
+    index = await index_cache.get_async(config)
+    chunks = await retrieve_context_async(
+        config,
+        request.query,
+        index=index,
+        embedding_cache=_get_chat_caches(config).query_embeddings,
+        embedding_client=_get_embedding_client(config),
+    )
+
+    context = assemble_context(config, chunks)
+
+    async def events() -> AsyncIterator[str]:
+        yield _sse_event("sources", [asdict(chunk) for chunk in context.chunks])
+        answer = generate_answer_stream(config, request.query, context.chunks)
+        try:
+            async with aclosing(answer) as tokens:
+                async for text in tokens:
+                    yield _sse_event("token", {"text": text})
+        except Exception as exc:  # noqa: BLE001 - the status line has already been sent
+            yield _sse_event("error", {"detail": str(exc)})
+            return
+        yield _sse_event(
+            "done", {"prompt_tokens": context.tokens, "tokens_saved": context.tokens_saved}
+        )
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @app.post("/index", response_model=IndexResponse)
 def index_documents(request: IndexRequest) -> IndexResponse:
     config = _load_config()
-    if not request.overwrite:
-        existing = load_vector_index(config, config.vector_index_path)
+    if not request.overwrite and not request.incremental:
+        existing = index_cache.get(config)
         if existing.entries:
             raise HTTPException(
                 status_code=409,
                 detail="Vector index already exists. Set overwrite=true to replace it.",
             )
-    index = build_vector_index_from_gcs(config, prefix=request.prefix)
-    save_vector_index(config, index, config.vector_index_path)
-    indexed_docs = {entry.uri.split("#", 1)[0] for entry in index.entries}
+    manifest: dict[str, dict] = {}
+    indexed_docs: set[str] = set()
+
+    def track_documents(entries: Iterable[IndexEntry]) -> Iterator[IndexEntry]:
+        for entry in entries:
+            indexed_docs.add(entry.uri.split("#", 1)[0])
+            yield entry
+
+    entries = iter_gcs_index_entries(
+        config, manifest, prefix=request.prefix, incremental=request.incremental
+    )
+    write_vector_index(
+        config, track_documents(entries), config.vector_index_path, manifest=manifest
+    )
+    index_cache.refresh(config)
     return IndexResponse(indexed_documents=len(indexed_docs), index_uri=config.vector_index_path)
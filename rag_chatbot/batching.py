@@ -0,0 +1,84 @@
+"""Micro-batching of concurrent async calls into one request."""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Awaitable, Callable, Generic, Hashable, TypeVar
+
+T = TypeVar("T", bound=Hashable)
+R = TypeVar("R")
+
+
+class MicroBatcher(Generic[T, R]):
+    """Collect items submitted by concurrent callers and process them in one call.
+
+    :meth:`submit` waits until ``max_batch`` distinct items are pending or
+    ``max_wait`` seconds have passed since the first of them, then passes the
+    pending items to ``process`` and hands every caller its own result.
+    Identical items submitted together are processed once. If ``process``
+    raises, every caller in that batch gets the exception.
+    """
+
+    def __init__(
+        self,
+        process: Callable[[list[T]], Awaitable[list[R]]],
+        *,
+        max_batch: int,
+        max_wait: float,
+    ) -> None:
+        self._process = process
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0.0, max_wait)
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._pending: dict[T, list[asyncio.Future[R]]] = {}
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task[None]] = set()
+
+    async def submit(self, item: T) -> R:
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Futures belong to one event loop; start over on a new one.
+            self._loop = loop
+            self._pending = {}
+            self._timer = None
+        future: asyncio.Future[R] = loop.create_future()
+        self._pending.setdefault(item, []).append(future)
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending or self._loop is None:
+            return
+        batch, self._pending = self._pending, {}
+        task = self._loop.create_task(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: dict[T, list[asyncio.Future[R]]]) -> None:
+        items = list(batch)
+        try:
+            results = await self._process(items)
+            if len(results) != len(items):
+                raise RuntimeError(f"Batch returned {len(results)} results for {len(items)} items")
+        except asyncio.CancelledError:
+            for futures in batch.values():
+                for future in futures:
+                    future.cancel()
+            raise
+        except Exception as exc:  # noqa: BLE001 - handed to every caller in the batch
+            for futures in batch.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(exc)
+            return
+        for item, result in zip(items, results):
+            for future in batch[item]:
+                # A caller that was cancelled while waiting has a done future.
+                if not future.done():
+                    future.set_result(result)
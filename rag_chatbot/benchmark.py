@@ -0,0 +1,385 @@
+"""Offline benchmarks for index builds, loads and queries on synthetic corpora.
+
+Everything runs locally: embeddings come from a deterministic fake embedder and
+``gs://`` paths are served from a directory by :class:`LocalStorageClient`.
+"""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import json
+import math
+import multiprocessing
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, replace
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Sequence, TypeVar
+
+import numpy as np
+
+from .clients import ClientRegistry, use_clients
+from .config import AppConfig
+from .embeddings import iter_batches
+from .indexing import index_documents, load_vector_index, write_vector_index
+from .retrieval import search_chunks, shutdown_shard_workers
+
+T = TypeVar("T")
+
+REPORT_VERSION = 1
+_CHUNK_CHARS = 1500  # chunk_text's default slice size
+_WARMUP_QUERIES = 5
+_STORAGE_DIR = "gcs"
+
+
+class _LocalBlob:
+    def __init__(self, root: Path, name: str) -> None:
+        self.name = name
+        self._path = root / name
+
+    @property
+    def generation(self) -> int:
+        return self._path.stat().st_mtime_ns
+
+    @property
+    def etag(self) -> str:
+        stat = self._path.stat()
+        return f"{stat.st_size:x}-{stat.st_mtime_ns:x}"
+
+    @property
+    def size(self) -> int:
+        return self._path.stat().st_size
+
+    @property
+    def md5_hash(self) -> str:
+        # Base64 of the binary digest, as GCS reports it.
+        return base64.b64encode(hashlib.md5(self._path.read_bytes()).digest()).decode("ascii")
+
+    def exists(self) -> bool:
+        return self._path.is_file()
+
+    def upload_from_filename(self, filename: str, content_type: str | None = None) -> None:
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        partial = self._path.with_name(f".{self._path.name}.upload")
+        shutil.copyfile(filename, partial)
+        os.replace(partial, self._path)
+
+    def upload_from_string(self, data: str | bytes, content_type: str | None = None) -> None:
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        payload = data.encode("utf-8") if isinstance(data, str) else data
+        partial = self._path.with_name(f".{self._path.name}.upload")
+        partial.write_bytes(payload)
+        os.replace(partial, self._path)
+
+    def download_to_filename(self, filename: str) -> None:
+        shutil.copyfile(self._path, filename)
+
+    def download_as_bytes(self) -> bytes:
+        return self._path.read_bytes()
+
+    def download_as_text(self, encoding: str = "utf-8") -> str:
+        return self._path.read_text(encoding=encoding)
+
+    def open(self, mode: str = "rb", encoding: str | None = None):
+        if "r" not in mode:
+            raise ValueError("LocalStorageClient blobs are written with upload_from_*")
+        return self._path.open(mode.replace("t", ""), encoding=encoding)
+
+    def delete(self) -> None:
+        self._path.unlink()
+
+
+class _LocalBucket:
+    def __init__(self, root: Path, name: str) -> None:
+        self.name = name
+        self.root = root / name
+
+    def blob(self, name: str, chunk_size: int | None = None) -> _LocalBlob:
+        return _LocalBlob(self.root, name)
+
+    def get_blob(self, name: str) -> _LocalBlob | None:
+        blob = self.blob(name)
+        return blob if blob.exists() else None
+
+
+class LocalStorageClient:
+    """The subset of ``google.cloud.storage.Client`` this package uses, backed by a directory.
+
+    ``gs://bucket/name`` maps to ``<root>/bucket/name``. Install it with
+    ``use_clients(ClientRegistry(storage_client=...))``.
+    """
+
+    def __init__(self, root: Path) -> None:
+        self.root = Path(root)
+
+    def bucket(self, name: str) -> _LocalBucket:
+        return _LocalBucket(self.root, name)
+
+    def list_blobs(self, bucket: _LocalBucket | str, prefix: str | None = None) -> list[_LocalBlob]:
+        if isinstance(bucket, str):
+            bucket = self.bucket(bucket)
+        if not bucket.root.exists():
+            return []
+        names = sorted(
+            path.relative_to(bucket.root).as_posix()
+            for path in bucket.root.rglob("*")
+            if path.is_file() and not path.name.startswith(".")
+        )
+        return [bucket.blob(name) for name in names if name.startswith(prefix or "")]
+
+
+def fake_embedding(text: str, dim: int) -> np.ndarray:
+    """A unit vector derived only from ``text``, the same on every run and machine."""
+    seed = int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "big")
+    vector = np.random.default_rng(seed).standard_normal(dim, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+class FakeEmbeddingClient:
+    """Offline stand-in for :class:`~rag_chatbot.embeddings.VertexEmbeddingClient`."""
+
+    def __init__(self, config: AppConfig, dim: int) -> None:
+        self.config = config
+        self.dim = dim
+
+    def batches(self, items: Iterable[T], text_of: Callable[[T], str] = str) -> Iterator[list[T]]:
+        return iter_batches(
+            items,
+            max_items=self.config.embedding_batch_size,
+            max_tokens=self.config.embedding_batch_tokens,
+            text_of=text_of,
+        )
+
+    def embed_texts(self, texts: Sequence[str]) -> list[list[float]]:
+        return [fake_embedding(text, self.dim).tolist() for text in texts]
+
+
+class SyntheticCorpus:
+    """``chunks`` chunks of word-like text in documents of ``chunks_per_document`` chunks.
+
+    Every chunk is a labelled slice of one seeded word stream, so any chunk (or
+    document) can be regenerated from its number alone and no two are equal.
+    """
+
+    def __init__(self, chunks: int, chunks_per_document: int, seed: int = 0) -> None:
+        self.chunks = chunks
+        self.chunks_per_document = chunks_per_document
+        self.documents = math.ceil(chunks / chunks_per_document)
+        rng = np.random.default_rng(seed)
+        letters = "abcdefghijklmnopqrstuvwxyz"
+        vocabulary = [
+            "".join(letters[i] for i in rng.integers(0, 26, rng.integers(2, 10)))
+            for _ in range(5000)
+        ]
+        self._stream = " ".join(vocabulary[i] for i in rng.integers(0, 5000, 200_000).tolist())
+        self._seed = seed
+
+    def chunk(self, row: int) -> str:
+        number, position = divmod(row, self.chunks_per_document)
+        start = int(
+            np.random.default_rng((self._seed, row)).integers(0, len(self._stream) - _CHUNK_CHARS)
+        )
+        text = f"document {number} part {position} {self._stream[start : start + _CHUNK_CHARS]}"
+        return text[:_CHUNK_CHARS]
+
+    def document(self, number: int) -> tuple[str, str]:
+        """Return ``(uri, text)``; the text splits into exactly this document's chunks."""
+        first = number * self.chunks_per_document
+        rows = range(first, min(first + self.chunks_per_document, self.chunks))
+        return f"synthetic/{number:07d}.txt", "".join(self.chunk(row) for row in rows)
+
+
+@dataclass(frozen=True)
+class BenchmarkSettings:
+    sizes: tuple[int, ...] = (10_000, 100_000, 1_000_000)
+    dim: int = 768
+    queries: int = 200
+    top_k: int = 5
+    chunks_per_document: int = 20
+    index_format: str = "vidx"
+    seed: int = 0
+
+
+def _case_config(config: AppConfig, settings: BenchmarkSettings) -> AppConfig:
+    suffix = ".vidx" if settings.index_format == "vidx" else ".jsonl"
+    return replace(
+        config,
+        gcp_project_id="benchmark",
+        document_bucket="benchmark",
+        vector_index_path=f"gs://benchmark/index/index{suffix}",
+        embedding_cache_path="",
+    )
+
+
+def _peak_rss_mb() -> float:
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _build_case(config: AppConfig, settings: BenchmarkSettings, chunks: int, workdir: str) -> dict:
+    config = _case_config(config, settings)
+    corpus = SyntheticCorpus(chunks, settings.chunks_per_document, settings.seed)
+    embedder = FakeEmbeddingClient(config, settings.dim)
+    storage_root = Path(workdir) / _STORAGE_DIR
+    with use_clients(ClientRegistry(storage_client=LocalStorageClient(storage_root))):
+        started = time.perf_counter()
+        entries = index_documents(config, embedder, range(corpus.documents), corpus.document)
+        written = write_vector_index(config, entries, config.vector_index_path)
+        seconds = time.perf_counter() - started
+    index_bytes = sum(path.stat().st_size for path in storage_root.rglob("*") if path.is_file())
+    return {
+        "chunks": written,
+        "build_seconds": seconds,
+        "build_chunks_per_second": written / seconds if seconds else 0.0,
+        "index_bytes": index_bytes,
+        "build_peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def _serve_case(config: AppConfig, settings: BenchmarkSettings, chunks: int, workdir: str) -> dict:
+    config = _case_config(config, settings)
+    corpus = SyntheticCorpus(chunks, settings.chunks_per_document, settings.seed)
+    # Queries are noisy copies of stored chunks, so each has true near neighbours.
+    rng = np.random.default_rng(settings.seed + 1)
+    rows = rng.integers(0, chunks, _WARMUP_QUERIES + settings.queries)
+    queries = []
+    for row in rows.tolist():
+        text = corpus.chunk(row)
+        noise = rng.normal(scale=0.05, size=settings.dim).astype(np.float32)
+        queries.append((text, (fake_embedding(text, settings.dim) + noise).tolist()))
+    storage = LocalStorageClient(Path(workdir) / _STORAGE_DIR)
+    with use_clients(ClientRegistry(storage_client=storage)):
+        started = time.perf_counter()
+        index = load_vector_index(config, config.vector_index_path)
+        load_seconds = time.perf_counter() - started
+        latencies = []
+        try:
+            for position, (text, embedding) in enumerate(queries):
+                started = time.perf_counter()
+                search_chunks(config, index, embedding, text, top_k=settings.top_k)
+                if position >= _WARMUP_QUERIES:
+                    latencies.append(time.perf_counter() - started)
+        finally:
+            shutdown_shard_workers()
+    latencies_ms = np.asarray(latencies) * 1000.0
+    return {
+        "load_seconds": load_seconds,
+        "queries": len(latencies),
+        "query_p50_ms": float(np.percentile(latencies_ms, 50)),
+        "query_p95_ms": float(np.percentile(latencies_ms, 95)),
+        "query_p99_ms": float(np.percentile(latencies_ms, 99)),
+        "serve_peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def _git_commit() -> str | None:
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=Path(__file__).resolve().parent,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip() or None
+
+
+def run_benchmark(config: AppConfig, settings: BenchmarkSettings, *, isolate: bool = True) -> dict:
+    """Build, load and query a synthetic index for every size in ``settings.sizes``.
+
+    Retrieval settings (``ANN_*``, ``INDEX_QUANTIZATION``, ``INDEX_SHARDS``,
+    ``RETRIEVAL_MODE``, ...) come from ``config``. With ``isolate=True`` the
+    build and the load/query phase of each size run in fresh processes, so
+    their peak RSS figures do not include earlier work. Returns a JSON-ready
+    report.
+    """
+    results = []
+    for chunks in settings.sizes:
+        with tempfile.TemporaryDirectory(prefix="rag-benchmark-") as workdir:
+            if isolate:
+                context = multiprocessing.get_context("spawn")
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                    build = executor.submit(_build_case, config, settings, chunks, workdir)
+                    build = build.result()
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                    serve = executor.submit(_serve_case, config, settings, chunks, workdir)
+                    serve = serve.result()
+            else:
+                build = _build_case(config, settings, chunks, workdir)
+                serve = _serve_case(config, settings, chunks, workdir)
+        results.append({"size": chunks, **build, **serve})
+    return {
+        "version": REPORT_VERSION,
+        "commit": _git_commit(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "cpu_count": os.cpu_count(),
+        "settings": {
+            **asdict(settings),
+            "ann_lists": config.ann_lists,
+            "ann_nprobe": config.ann_nprobe,
+            "index_quantization": config.index_quantization,
+            "index_shards": config.index_shards,
+            "retrieval_mode": config.retrieval_mode,
+        },
+        "results": results,
+    }
+
+
+# Metrics compared by compare_reports(); True means higher is better.
+COMPARED_METRICS = {
+    "build_chunks_per_second": True,
+    "load_seconds": False,
+    "query_p50_ms": False,
+    "query_p95_ms": False,
+    "query_p99_ms": False,
+    "build_peak_rss_mb": False,
+    "serve_peak_rss_mb": False,
+}
+
+
+def compare_reports(baseline: dict, current: dict) -> list[dict]:
+    """Pair up the sizes both reports measured and return one row per metric.
+
+    ``change`` is ``current / baseline``; ``regressed`` is set when the change
+    is in the wrong direction by more than 10%.
+    """
+    rows = []
+    previous = {result["size"]: result for result in baseline["results"]}
+    for result in current["results"]:
+        before = previous.get(result["size"])
+        if before is None:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            if not before.get(metric):
+                continue
+            change = result[metric] / before[metric]
+            regressed = change < 0.9 if higher_is_better else change > 1.1
+            rows.append(
+                {
+                    "size": result["size"],
+                    "metric": metric,
+                    "baseline": before[metric],
+                    "current": result[metric],
+                    "change": change,
+                    "regressed": regressed,
+                }
+            )
+    return rows
+
+
+def write_report(report: dict, path: Path) -> None:
+    path.write_text(json.dumps(report, indent=2, sort_keys=True) + "\n", encoding="utf-8")
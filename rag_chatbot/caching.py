@@ -0,0 +1,206 @@
+"""In-process caches for the chat path: query embeddings and semantic answers."""
+
+from __future__ import annotations
+
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Generic, Hashable, Sequence, TypeVar
+
+import numpy as np
+
+from .config import AppConfig
+from .vectors import normalize_vector
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+def normalize_query(query: str) -> str:
+    """Case-fold and collapse whitespace so trivially different queries share a key."""
+    return " ".join(query.casefold().split())
+
+
+class _CacheStats:
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def snapshot(self, size: int, max_size: int) -> dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "size": size,
+            "max_size": max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class TTLCache(Generic[K, V]):
+    """Thread-safe LRU cache whose entries also expire ``ttl_seconds`` after insertion."""
+
+    def __init__(self, *, max_size: int, ttl_seconds: float) -> None:
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = _CacheStats()
+
+    def get(self, key: K) -> V | None:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is not None and item[0] <= time.monotonic():
+                del self._entries[key]
+                self._stats.expirations += 1
+                item = None
+            if item is None:
+                self._stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats.hits += 1
+            return item[1]
+
+    def put(self, key: K, value: V) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._stats.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict[str, float]:
+        with self._lock:
+            return self._stats.snapshot(len(self._entries), self.max_size)
+
+
+@dataclass(frozen=True)
+class _AnswerEntry(Generic[V]):
+    embedding: np.ndarray
+    expires_at: float
+    value: V
+
+
+class SemanticAnswerCache(Generic[V]):
+    """Return a stored answer for queries whose embedding is close to a cached one.
+
+    A lookup hits when the cosine similarity to a cached query embedding is at
+    least ``threshold`` and the answer was produced against the same index
+    version. Storing an answer for a new index version drops every answer from
+    older versions. Entries expire after ``ttl_seconds`` and the least recently
+    used ones are evicted beyond ``max_size``.
+    """
+
+    def __init__(self, *, max_size: int, ttl_seconds: float, threshold: float) -> None:
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.threshold = threshold
+        self._entries: OrderedDict[int, _AnswerEntry[V]] = OrderedDict()
+        self._index_version: object = None
+        self._keys = itertools.count()
+        self._matrix: np.ndarray | None = None
+        self._matrix_keys: list[int] = []
+        self._lock = threading.Lock()
+        self._stats = _CacheStats()
+
+    def get(self, embedding: Sequence[float], index_version: object) -> V | None:
+        query = normalize_vector(embedding)
+        with self._lock:
+            self._expire(time.monotonic())
+            if not self._entries or index_version != self._index_version:
+                self._stats.misses += 1
+                return None
+            if self._matrix is None:
+                self._matrix_keys = list(self._entries)
+                self._matrix = np.stack([entry.embedding for entry in self._entries.values()])
+            if self._matrix.shape[1] != query.shape[0]:
+                self._stats.misses += 1
+                return None
+            scores = self._matrix @ query
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                self._stats.misses += 1
+                return None
+            key = self._matrix_keys[best]
+            self._entries.move_to_end(key)
+            self._stats.hits += 1
+            return self._entries[key].value
+
+    def put(self, embedding: Sequence[float], index_version: object, value: V) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            if index_version != self._index_version:
+                self._entries.clear()
+                self._index_version = index_version
+            self._entries[next(self._keys)] = _AnswerEntry(
+                embedding=normalize_vector(embedding),
+                expires_at=time.monotonic() + self.ttl_seconds,
+                value=value,
+            )
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._stats.evictions += 1
+            self._matrix = None
+
+    def _expire(self, now: float) -> None:
+        expired = [key for key, entry in self._entries.items() if entry.expires_at <= now]
+        for key in expired:
+            del self._entries[key]
+        if expired:
+            self._stats.expirations += len(expired)
+            self._matrix = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict[str, float]:
+        with self._lock:
+            return self._stats.snapshot(len(self._entries), self.max_size)
+
+
+@dataclass
+class ChatCaches:
+    """The caches used by the chat endpoints; a layer is None when disabled."""
+
+    query_embeddings: TTLCache[str, list[float]] | None
+    answers: SemanticAnswerCache | None
+
+    @staticmethod
+    def from_config(config: AppConfig) -> "ChatCaches":
+        query_embeddings = None
+        if config.query_cache_size > 0:
+            query_embeddings = TTLCache(
+                max_size=config.query_cache_size, ttl_seconds=config.query_cache_ttl_seconds
+            )
+        answers = None
+        if config.answer_cache_size > 0:
+            answers = SemanticAnswerCache(
+                max_size=config.answer_cache_size,
+                ttl_seconds=config.answer_cache_ttl_seconds,
+                threshold=config.answer_cache_threshold,
+            )
+        return ChatCaches(query_embeddings=query_embeddings, answers=answers)
+
+    def stats(self) -> dict[str, dict[str, float] | None]:
+        return {
+            "query_embeddings": (
+                self.query_embeddings.stats() if self.query_embeddings is not None else None
+            ),
+            "answers": self.answers.stats() if self.answers is not None else None,
+        }
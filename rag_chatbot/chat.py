@@ -3,17 +3,22 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Iterable
+from typing import AsyncIterator, Iterable
 
+from .clients import get_clients
 from .config import AppConfig
-from .gcp import initialize_vertex_ai
+from .metrics import timed, vertex_call
+from .prompting import assemble_context
 from .retrieval import RetrievedChunk
 
 
 @dataclass(frozen=True)
 class ChatResponse:
     answer: str
+    # The chunks the prompt was built from (see :func:`assemble_context`).
     sources: Iterable[RetrievedChunk]
+    prompt_tokens: int = 0
+    tokens_saved: int = 0
 
 
 def build_prompt(query: str, chunks: Iterable[RetrievedChunk]) -> str:
@@ -24,22 +29,94 @@ def build_prompt(query: str, chunks: Iterable[RetrievedChunk]) -> str:
     )
 
 
-def _load_generative_model():
-    from vertexai.preview.generative_models import GenerativeModel
+def generate_answer(
+    config: AppConfig,
+    query: str,
+    chunks: Iterable[RetrievedChunk],
+) -> ChatResponse:
+    """Generate an answer using Vertex AI Gemini.
 
-    return GenerativeModel
+    Throttled and transient Gemini failures are retried by the model's shared
+    :class:`~rag_chatbot.throttling.AdaptiveController`.
+    """
+    context = assemble_context(config, chunks)
+    prompt = build_prompt(query, context.chunks)
+    clients = get_clients()
+    model = clients.generative_model(config)
 
+    def request():
+        with vertex_call("generate"):
+            return model.generate_content(prompt)
 
-def generate_answer(
+    with timed("generate"):
+        response = clients.vertex_controller(config, config.chat_model).call(request)
+    answer = response.text or ""
+    return ChatResponse(
+        answer=answer,
+        sources=context.chunks,
+        prompt_tokens=context.tokens,
+        tokens_saved=context.tokens_saved,
+    )
+
+
+async def generate_answer_async(
     config: AppConfig,
     query: str,
     chunks: Iterable[RetrievedChunk],
 ) -> ChatResponse:
-    """Generate an answer using Vertex AI Gemini."""
-    initialize_vertex_ai(config)
-    prompt = build_prompt(query, chunks)
-    model_cls = _load_generative_model()
-    model = model_cls(config.chat_model)
-    response = model.generate_content(prompt)
+    """Async variant of :func:`generate_answer` that awaits Gemini instead of blocking."""
+    context = assemble_context(config, chunks)
+    prompt = build_prompt(query, context.chunks)
+    clients = get_clients()
+    model = clients.generative_model(config)
+
+    async def request():
+        with vertex_call("generate"):
+            return await model.generate_content_async(prompt)
+
+    with timed("generate"):
+        controller = clients.vertex_controller(config, config.chat_model)
+        response = await controller.call_async(request)
     answer = response.text or ""
-    return ChatResponse(answer=answer, sources=chunks)
+    return ChatResponse(
+        answer=answer,
+        sources=context.chunks,
+        prompt_tokens=context.tokens,
+        tokens_saved=context.tokens_saved,
+    )
+
+
+async def generate_answer_stream(
+    config: AppConfig,
+    query: str,
+    chunks: Iterable[RetrievedChunk],
+) -> AsyncIterator[str]:
+    """Yield answer text from Vertex AI Gemini as it is generated.
+
+    Closing the generator, or cancelling the task awaiting it (e.g. when the
+    client disconnects), closes the response stream right away, even while
+    Gemini is between chunks. The prompt is built from
+    ``assemble_context(config, chunks).chunks``; pass chunks that were already
+    assembled to report them as sources, since assembling is idempotent.
+    """
+    prompt = build_prompt(query, assemble_context(config, chunks).chunks)
+    clients = get_clients()
+    model = clients.generative_model(config)
+
+    async def request():
+        with vertex_call("generate_stream"):
+            return await model.generate_content_async(prompt, stream=True)
+
+    with timed("generate_stream"):
+        # Only opening the stream is retried; text already yielded cannot be taken back.
+        controller = clients.vertex_controller(config, config.chat_model)
+        responses = await controller.call_async(request)
+        try:
+            async for response in responses:
+                text = response.text
+                if text:
+                    yield text
+        finally:
+            aclose = getattr(responses, "aclose", None)
+            if aclose is not None:
+                await aclose()
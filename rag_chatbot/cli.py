@@ -3,13 +3,21 @@
 from __future__ import annotations
 
 import argparse
+import json
+import math
 from pathlib import Path
 
 from .chat import generate_answer
 from .config import AppConfig
 from .gcp import initialize_vertex_ai
 from .ingest import upload_documents
-from .indexing import build_vector_index
+from .indexing import (
+    ShardedIndex,
+    build_vector_index,
+    iter_index_entries,
+    load_vector_index,
+    write_vector_index,
+)
 from .retrieval import retrieve_context
 
 
@@ -35,7 +43,12 @@ def run_ingest(paths: list[Path]) -> int:
     print("Uploaded documents:")
     for uri in result.uploaded:
         print(f"- {uri}")
-    return 0
+    if result.skipped:
+        print(f"Skipped {len(result.skipped)} unchanged documents.")
+    for upload in result.failed:
+        print(f"Failed to upload {upload.path}: {upload.error}")
+    print(f"Uploaded {result.bytes_uploaded} bytes.")
+    return 1 if result.failed else 0
 
 
 def run_chat(query: str) -> int:
@@ -70,6 +83,94 @@ def run_index(paths: list[Path], output: Path | None) -> int:
     return 0
 
 
+def run_convert_index(source: str, output: Path | None) -> int:
+    config = AppConfig.from_env()
+    output_path = output or Path(config.vector_index_path)
+    if str(output_path) == source:
+        print("Refusing to convert an index onto itself; pass a different --output.")
+        return 1
+    count = write_vector_index(config, iter_index_entries(config, source), str(output_path))
+    print(f"Converted {count} entries from {source} to {output_path}")
+    return 0
+
+
+def run_ann_report(
+    index_path: str | None, queries: int, top_k: int, nprobes: list[int], lists: int | None
+) -> int:
+    import numpy as np
+
+    from .ann import IVFIndex, recall_report
+    from .vectors import normalize_rows
+
+    config = AppConfig.from_env()
+    path_value = index_path or config.vector_index_path
+    index = load_vector_index(config, path_value)
+    if not index.entries:
+        print(f"No index entries found at {path_value}")
+        return 1
+    if isinstance(index, ShardedIndex):
+        print(f"{path_value} is sharded; pass one shard with --index: {index.locations[0]}")
+        return 1
+    matrix = index.matrix
+    ann = index.ann
+    if ann is None or lists is not None:
+        lists = lists or config.ann_lists or max(1, int(4 * math.sqrt(matrix.shape[0])))
+        print(f"Training an IVF index with {lists} lists")
+        ann = IVFIndex.build(matrix, lists=lists)
+    # Perturbed copies of stored vectors stand in for real queries.
+    rng = np.random.default_rng(0)
+    rows = rng.choice(matrix.shape[0], min(queries, matrix.shape[0]), replace=False)
+    noise = rng.normal(scale=0.05, size=(rows.shape[0], matrix.shape[1]))
+    sample = normalize_rows(matrix[rows] + noise.astype(matrix.dtype))
+    report = recall_report(matrix, ann, sample, top_k=top_k, nprobes=nprobes)
+    print(f"{matrix.shape[0]} entries, {ann.lists} lists, {sample.shape[0]} queries")
+    print(f"{'nprobe':>8} {f'recall@{top_k}':>10} {'p50 ms':>8} {'p99 ms':>8}")
+    for row in report:
+        label = "exact" if row["nprobe"] == 0 else str(row["nprobe"])
+        print(f"{label:>8} {row['recall']:>10.3f} {row['p50_ms']:>8.3f} {row['p99_ms']:>8.3f}")
+    return 0
+
+
+def run_benchmark(
+    sizes: list[int],
+    dim: int,
+    queries: int,
+    index_format: str,
+    output: Path | None,
+    compare: Path | None,
+) -> int:
+    from . import benchmark
+
+    config = AppConfig.from_env()
+    settings = benchmark.BenchmarkSettings(
+        sizes=tuple(sizes), dim=dim, queries=queries, index_format=index_format
+    )
+    report = benchmark.run_benchmark(config, settings)
+    print(
+        f"{'chunks':>9} {'build/s':>9} {'load s':>8} {'p50 ms':>8} {'p95 ms':>8} "
+        f"{'p99 ms':>8} {'build MB':>9} {'serve MB':>9}"
+    )
+    for row in report["results"]:
+        print(
+            f"{row['size']:>9} {row['build_chunks_per_second']:>9.0f} "
+            f"{row['load_seconds']:>8.3f} {row['query_p50_ms']:>8.3f} "
+            f"{row['query_p95_ms']:>8.3f} {row['query_p99_ms']:>8.3f} "
+            f"{row['build_peak_rss_mb']:>9.0f} {row['serve_peak_rss_mb']:>9.0f}"
+        )
+    if output is not None:
+        benchmark.write_report(report, output)
+        print(f"Report written to {output}")
+    if compare is None:
+        return 0
+    baseline = json.loads(compare.read_text(encoding="utf-8"))
+    regressions = 0
+    for row in benchmark.compare_reports(baseline, report):
+        flag = "REGRESSED" if row["regressed"] else ""
+        regressions += row["regressed"]
+        print(f"{row['size']:>9} {row['metric']:<24} {row['change']:>7.2f}x {flag}")
+    return 1 if regressions else 0
+
+
 def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(description="RAG Chatbot CLI")
     subparsers = parser.add_subparsers(dest="command", required=True)
@@ -83,11 +184,46 @@ def build_parser() -> argparse.ArgumentParser:
     chat_parser.add_argument("query")
 
     index_parser = subparsers.add_parser("index", help="Build a local vector index")
-    index_parser.add_argument("paths", nargs="+", type=Path)
+    index_parser.add_argument("paths", nargs="*", type=Path)
     index_parser.add_argument(
         "--output",
         type=Path,
-        help="Output JSONL path (defaults to VECTOR_INDEX_PATH)",
+        help=(
+            "Output index path; a .vidx suffix writes the binary format, anything else "
+            "JSONL (defaults to VECTOR_INDEX_PATH)"
+        ),
+    )
+    index_parser.add_argument(
+        "--convert",
+        metavar="INDEX",
+        help="Convert an existing index (local path or gs:// URI) instead of embedding paths",
+    )
+
+    ann_parser = subparsers.add_parser(
+        "ann-report", help="Compare IVF search recall and latency against exact search"
+    )
+    ann_parser.add_argument("--index", help="Index path (defaults to VECTOR_INDEX_PATH)")
+    ann_parser.add_argument("--queries", type=int, default=200)
+    ann_parser.add_argument("--top-k", type=int, default=10)
+    ann_parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 16, 64])
+    ann_parser.add_argument(
+        "--lists", type=int, help="Train a fresh IVF index with this many lists"
+    )
+
+    benchmark_parser = subparsers.add_parser(
+        "benchmark", help="Benchmark index builds, loads and queries on synthetic data"
+    )
+    benchmark_parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000]
+    )
+    benchmark_parser.add_argument("--dim", type=int, default=768)
+    benchmark_parser.add_argument("--queries", type=int, default=200)
+    benchmark_parser.add_argument("--format", choices=["vidx", "jsonl"], default="vidx")
+    benchmark_parser.add_argument("--output", type=Path, help="Write the JSON report here")
+    benchmark_parser.add_argument(
+        "--compare",
+        type=Path,
+        help="Compare with an earlier JSON report; exits 1 if any metric regressed",
     )
 
     return parser
@@ -104,7 +240,19 @@ def main() -> int:
     if args.command == "chat":
         return run_chat(args.query)
     if args.command == "index":
+        if args.convert:
+            if args.paths:
+                parser.error("index: pass either document paths or --convert, not both")
+            return run_convert_index(args.convert, args.output)
+        if not args.paths:
+            parser.error("index: at least one document path is required")
         return run_index(args.paths, args.output)
+    if args.command == "ann-report":
+        return run_ann_report(args.index, args.queries, args.top_k, args.nprobe, args.lists)
+    if args.command == "benchmark":
+        return run_benchmark(
+            args.sizes, args.dim, args.queries, args.format, args.output, args.compare
+        )
     raise ValueError(f"Unknown command {args.command}")
 
 
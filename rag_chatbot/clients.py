@@ -0,0 +1,207 @@
+"""Process-wide registry of long-lived Google Cloud clients."""
+
+from __future__ import annotations
+
+import threading
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+from .config import AppConfig
+from .embeddings import VertexEmbeddingClient
+from .gcp import initialize_vertex_ai
+from .metrics import REGISTRY
+from .throttling import AdaptiveController
+
+
+def _new_storage_client(config: AppConfig):
+    import google.auth
+    from google.auth.transport.requests import AuthorizedSession
+    from google.cloud import storage
+    from requests.adapters import HTTPAdapter
+
+    credentials, _ = google.auth.default(scopes=storage.Client.SCOPE)
+    # One pooled session, sized for the parallel downloads and uploads of index builds.
+    session = AuthorizedSession(credentials)
+    adapter = HTTPAdapter(
+        pool_connections=config.http_pool_size, pool_maxsize=config.http_pool_size
+    )
+    session.mount("https://", adapter)
+    return storage.Client(project=config.gcp_project_id, credentials=credentials, _http=session)
+
+
+def _new_generative_model(config: AppConfig):
+    from vertexai.preview.generative_models import GenerativeModel
+
+    initialize_vertex_ai(config)
+    return GenerativeModel(config.chat_model)
+
+
+class ClientRegistry:
+    """Storage, embedding and Gemini clients created once and shared by every caller.
+
+    Reusing clients keeps credentials, gRPC channels and pooled HTTP
+    connections alive between requests. Clients are created on first use or
+    by :meth:`warm_up`. Any of them can be fixed up front, e.g. to a fake in
+    tests; install a registry with :func:`use_clients`. The registry also
+    holds one :class:`~rag_chatbot.throttling.AdaptiveController` per Vertex
+    model, shared by everything that calls that model.
+    """
+
+    def __init__(
+        self,
+        *,
+        storage_client: Any = None,
+        embedding_client: Any = None,
+        generative_model: Any = None,
+    ) -> None:
+        self._lock = threading.Lock()
+        self._storage_override = storage_client
+        self._embedding_override = embedding_client
+        self._generative_override = generative_model
+        self._storage: dict[tuple, Any] = {}
+        self._embedding: dict[AppConfig, VertexEmbeddingClient] = {}
+        self._generative: dict[tuple, Any] = {}
+        self._controllers: dict[tuple, AdaptiveController] = {}
+
+    @property
+    def storage_override(self) -> Any:
+        """The storage client fixed when the registry was built, if any."""
+        return self._storage_override
+
+    def storage_client(self, config: AppConfig):
+        """The Cloud Storage client for ``config``'s project."""
+        if self._storage_override is not None:
+            return self._storage_override
+        key = (config.gcp_project_id, config.http_pool_size)
+        client = self._storage.get(key)
+        if client is None:
+            with self._lock:
+                client = self._storage.get(key)
+                if client is None:
+                    client = self._storage[key] = _new_storage_client(config)
+        return client
+
+    def embedding_client(self, config: AppConfig) -> VertexEmbeddingClient:
+        """The embedding client for ``config``; its model handle is loaded once."""
+        if self._embedding_override is not None:
+            return self._embedding_override
+        client = self._embedding.get(config)
+        if client is None:
+            with self._lock:
+                client = self._embedding.setdefault(config, VertexEmbeddingClient(config))
+        return client
+
+    def generative_model(self, config: AppConfig):
+        """The Gemini model handle for ``CHAT_MODEL``."""
+        if self._generative_override is not None:
+            return self._generative_override
+        key = (config.gcp_project_id, config.gcp_region, config.chat_model)
+        model = self._generative.get(key)
+        if model is None:
+            with self._lock:
+                model = self._generative.get(key)
+                if model is None:
+                    model = self._generative[key] = _new_generative_model(config)
+        return model
+
+    def vertex_controller(self, config: AppConfig, model: str) -> AdaptiveController:
+        """The controller that paces and retries calls to ``model``."""
+        key = (config.gcp_project_id, config.gcp_region, model)
+        controller = self._controllers.get(key)
+        if controller is None:
+            with self._lock:
+                controller = self._controllers.get(key)
+                if controller is None:
+                    controller = self._controllers[key] = AdaptiveController(
+                        model,
+                        max_concurrency=config.vertex_max_concurrency,
+                        requests_per_minute=config.vertex_requests_per_minute,
+                        max_retries=config.vertex_max_retries,
+                        backoff_seconds=config.vertex_backoff_seconds,
+                    )
+        return controller
+
+    def vertex_controllers(self) -> list[AdaptiveController]:
+        with self._lock:
+            return list(self._controllers.values())
+
+    def warm_up(self, config: AppConfig) -> None:
+        """Create every client ``config`` needs now, so the first request does not wait."""
+        self.storage_client(config)
+        self.embedding_client(config).load_model()
+        self.generative_model(config)
+
+    def close(self) -> None:
+        """Close the pooled HTTP sessions and forget every client.
+
+        Controllers are kept, so their throttle counts stay monotonic.
+        """
+        with self._lock:
+            for client in self._storage.values():
+                client.close()
+            self._storage.clear()
+            self._embedding.clear()
+            self._generative.clear()
+
+
+_clients = ClientRegistry()
+
+
+def _controller_samples(stat: str):
+    return [
+        ({"model": controller.name}, controller.stats()[stat])
+        for controller in get_clients().vertex_controllers()
+    ]
+
+
+REGISTRY.collector(
+    "rag_vertex_concurrency_limit",
+    "Vertex AI calls allowed in flight by the adaptive controller.",
+    ("model",),
+    "gauge",
+    lambda: _controller_samples("limit"),
+)
+REGISTRY.collector(
+    "rag_vertex_in_flight",
+    "Vertex AI calls in flight.",
+    ("model",),
+    "gauge",
+    lambda: _controller_samples("in_flight"),
+)
+REGISTRY.collector(
+    "rag_vertex_throttles_total",
+    "Vertex AI calls rejected with HTTP 429 or 503.",
+    ("model",),
+    "counter",
+    lambda: _controller_samples("throttles"),
+)
+REGISTRY.collector(
+    "rag_vertex_retries_total",
+    "Vertex AI calls retried after a throttled or transient failure.",
+    ("model",),
+    "counter",
+    lambda: _controller_samples("retries"),
+)
+
+
+def get_clients() -> ClientRegistry:
+    """Return the registry installed for this process."""
+    return _clients
+
+
+def install_clients(registry: ClientRegistry) -> None:
+    """Install ``registry`` for the rest of the process, e.g. in a worker process."""
+    global _clients
+    _clients = registry
+
+
+@contextmanager
+def use_clients(registry: ClientRegistry) -> Iterator[ClientRegistry]:
+    """Install ``registry`` for the duration of the block, e.g. one with fake clients."""
+    global _clients
+    previous = _clients
+    _clients = registry
+    try:
+        yield registry
+    finally:
+        _clients = previous
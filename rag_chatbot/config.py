@@ -16,18 +16,104 @@ class AppConfig:
 
     gcp_project_id: str
     gcp_region: str
+    embedding_model: str
     chat_model: str
     document_bucket: str
     vector_index_path: str
+    index_refresh_seconds: float = 5.0
+    embedding_batch_size: int = 250
+    embedding_batch_tokens: int = 20000
+    embedding_cache_path: str = ""
+    embedding_cache_max_entries: int = 100_000
+    index_load_workers: int = 8
+    index_chunk_workers: int = 2
+    index_embed_workers: int = 4
+    query_cache_size: int = 1024
+    query_cache_ttl_seconds: float = 3600.0
+    answer_cache_size: int = 0
+    answer_cache_ttl_seconds: float = 600.0
+    answer_cache_threshold: float = 0.97
+    ann_lists: int = 0
+    ann_nprobe: int = 16
+    index_quantization: str = "none"
+    pq_subvector_dims: int = 4
+    quantized_shortlist_factor: int = 10
+    index_shards: int = 1
+    search_processes: int = 0
+    lexical_index: bool = False
+    retrieval_mode: str = "vector"
+    lexical_candidates: int = 100
+    rrf_k: int = 60
+    prompt_token_budget: int = 4000
+    prompt_duplicate_threshold: float = 0.8
+    batch_concurrency: int = 8
+    batch_max_queries: int = 10000
+    http_pool_size: int = 32
+    warm_up_clients: bool = True
+    ingest_workers: int = 8
+    upload_chunk_mb: int = 16
+    query_batch_size: int = 32
+    query_batch_wait_ms: float = 5.0
+    embedding_dimensions: int = 0
+    first_stage_dims: int = 256
+    vertex_max_concurrency: int = 16
+    vertex_requests_per_minute: float = 0.0
+    vertex_max_retries: int = 5
+    vertex_backoff_seconds: float = 1.0
 
     @staticmethod
     def from_env() -> "AppConfig":
         return AppConfig(
             gcp_project_id=os.environ.get("GCP_PROJECT_ID", ""),
             gcp_region=os.environ.get("GCP_REGION", "us-central1"),
+            embedding_model=os.environ.get("EMBEDDING_MODEL", "gemini-embedding-001"),
             chat_model=os.environ.get("CHAT_MODEL", "gemini-2.5-pro"),
             document_bucket=os.environ.get("DOCUMENT_BUCKET", ""),
             vector_index_path=os.environ.get("VECTOR_INDEX_PATH", "vector_index.jsonl"),
+            index_refresh_seconds=float(os.environ.get("INDEX_REFRESH_SECONDS", "5")),
+            embedding_batch_size=int(os.environ.get("EMBEDDING_BATCH_SIZE", "250")),
+            embedding_batch_tokens=int(os.environ.get("EMBEDDING_BATCH_TOKENS", "20000")),
+            embedding_cache_path=os.environ.get("EMBEDDING_CACHE_PATH", ""),
+            embedding_cache_max_entries=int(
+                os.environ.get("EMBEDDING_CACHE_MAX_ENTRIES", "100000")
+            ),
+            index_load_workers=int(os.environ.get("INDEX_LOAD_WORKERS", "8")),
+            index_chunk_workers=int(os.environ.get("INDEX_CHUNK_WORKERS", "2")),
+            index_embed_workers=int(os.environ.get("INDEX_EMBED_WORKERS", "4")),
+            query_cache_size=int(os.environ.get("QUERY_CACHE_SIZE", "1024")),
+            query_cache_ttl_seconds=float(os.environ.get("QUERY_CACHE_TTL_SECONDS", "3600")),
+            answer_cache_size=int(os.environ.get("ANSWER_CACHE_SIZE", "0")),
+            answer_cache_ttl_seconds=float(os.environ.get("ANSWER_CACHE_TTL_SECONDS", "600")),
+            answer_cache_threshold=float(os.environ.get("ANSWER_CACHE_THRESHOLD", "0.97")),
+            ann_lists=int(os.environ.get("ANN_LISTS", "0")),
+            ann_nprobe=int(os.environ.get("ANN_NPROBE", "16")),
+            index_quantization=os.environ.get("INDEX_QUANTIZATION", "none"),
+            pq_subvector_dims=int(os.environ.get("PQ_SUBVECTOR_DIMS", "4")),
+            quantized_shortlist_factor=int(os.environ.get("QUANTIZED_SHORTLIST_FACTOR", "10")),
+            index_shards=int(os.environ.get("INDEX_SHARDS", "1")),
+            search_processes=int(os.environ.get("SEARCH_PROCESSES", "0")),
+            lexical_index=os.environ.get("LEXICAL_INDEX", "").lower() in {"1", "true", "yes"},
+            retrieval_mode=os.environ.get("RETRIEVAL_MODE", "vector"),
+            lexical_candidates=int(os.environ.get("LEXICAL_CANDIDATES", "100")),
+            rrf_k=int(os.environ.get("RRF_K", "60")),
+            prompt_token_budget=int(os.environ.get("PROMPT_TOKEN_BUDGET", "4000")),
+            prompt_duplicate_threshold=float(
+                os.environ.get("PROMPT_DUPLICATE_THRESHOLD", "0.8")
+            ),
+            batch_concurrency=int(os.environ.get("BATCH_CONCURRENCY", "8")),
+            batch_max_queries=int(os.environ.get("BATCH_MAX_QUERIES", "10000")),
+            http_pool_size=int(os.environ.get("HTTP_POOL_SIZE", "32")),
+            warm_up_clients=os.environ.get("WARM_UP_CLIENTS", "1").lower() in {"1", "true", "yes"},
+            ingest_workers=int(os.environ.get("INGEST_WORKERS", "8")),
+            upload_chunk_mb=int(os.environ.get("UPLOAD_CHUNK_MB", "16")),
+            query_batch_size=int(os.environ.get("QUERY_BATCH_SIZE", "32")),
+            query_batch_wait_ms=float(os.environ.get("QUERY_BATCH_WAIT_MS", "5")),
+            embedding_dimensions=int(os.environ.get("EMBEDDING_DIMENSIONS", "0")),
+            first_stage_dims=int(os.environ.get("FIRST_STAGE_DIMS", "256")),
+            vertex_max_concurrency=int(os.environ.get("VERTEX_MAX_CONCURRENCY", "16")),
+            vertex_requests_per_minute=float(os.environ.get("VERTEX_REQUESTS_PER_MINUTE", "0")),
+            vertex_max_retries=int(os.environ.get("VERTEX_MAX_RETRIES", "5")),
+            vertex_backoff_seconds=float(os.environ.get("VERTEX_BACKOFF_SECONDS", "1")),
         )
 
     def validate(self) -> list[str]:
@@ -0,0 +1,178 @@
+"""Persistent, content-addressed cache of chunk embeddings."""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import sqlite3
+import tempfile
+import threading
+from pathlib import Path
+from typing import Sequence
+
+import numpy as np
+
+from .config import AppConfig
+from .gcp import is_gcs_uri, load_storage_client, parse_gcs_uri
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    key TEXT PRIMARY KEY,
+    vector BLOB NOT NULL,
+    last_used INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used);
+"""
+
+
+def cache_key(model: str, text: str) -> str:
+    """Return the cache key for ``text`` embedded with ``model``."""
+    digest = hashlib.sha256()
+    digest.update(model.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(text.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class EmbeddingCache:
+    """SQLite-backed embedding cache keyed by (model, sha256 of the chunk text).
+
+    Vectors are stored as float32, the precision the index keeps anyway. When the
+    cache holds more than ``max_entries`` vectors, the least recently used ones
+    are evicted. A ``gs://`` location is downloaded when the cache is opened and
+    uploaded again by :meth:`close`.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        *,
+        max_entries: int,
+        remote_uri: str | None = None,
+        storage_client=None,
+    ) -> None:
+        self.path = path
+        self.max_entries = max_entries
+        self.remote_uri = remote_uri
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(str(path), check_same_thread=False)
+        self._connection.executescript(_SCHEMA)
+        self._count, latest = self._connection.execute(
+            "SELECT COUNT(*), COALESCE(MAX(last_used), 0) FROM embeddings"
+        ).fetchone()
+        self._clock = latest
+        self._storage_client = storage_client
+
+    def get_many(self, model: str, texts: Sequence[str]) -> list[list[float] | None]:
+        """Return the cached vector for each text, or None where it is missing."""
+        keys = [cache_key(model, text) for text in texts]
+        found: dict[str, bytes] = {}
+        with self._lock:
+            unique_keys = list(dict.fromkeys(keys))
+            for start in range(0, len(unique_keys), 500):
+                batch = unique_keys[start : start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._connection.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                )
+                found.update(rows)
+            if found:
+                self._clock += 1
+                self._connection.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                    [(self._clock, key) for key in found],
+                )
+                self._connection.commit()
+            results: list[list[float] | None] = []
+            for key in keys:
+                vector = found.get(key)
+                if vector is None:
+                    self.misses += 1
+                    results.append(None)
+                else:
+                    self.hits += 1
+                    results.append(np.frombuffer(vector, dtype="<f4").tolist())
+        return results
+
+    def put_many(
+        self, model: str, texts: Sequence[str], vectors: Sequence[Sequence[float]]
+    ) -> None:
+        with self._lock:
+            self._clock += 1
+            rows = {
+                cache_key(model, text): np.asarray(vector, dtype="<f4").tobytes()
+                for text, vector in zip(texts, vectors)
+            }
+            before = self._connection.total_changes
+            self._connection.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                [(key, vector, self._clock) for key, vector in rows.items()],
+            )
+            self._count += self._connection.total_changes - before
+            self._evict()
+            self._connection.commit()
+
+    def _evict(self) -> None:
+        excess = self._count - self.max_entries
+        if excess <= 0:
+            return
+        deleted = self._connection.execute(
+            "DELETE FROM embeddings WHERE key IN "
+            "(SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+            (excess,),
+        ).rowcount
+        self._count -= deleted
+        self.evictions += deleted
+
+    def __len__(self) -> int:
+        return self._count
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "entries": self._count,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def close(self) -> None:
+        """Flush the cache, uploading it back to GCS when it lives there."""
+        with self._lock:
+            self._connection.commit()
+            self._connection.close()
+        if self.remote_uri is None:
+            return
+        try:
+            bucket_name, blob_name = parse_gcs_uri(self.remote_uri)
+            blob = self._storage_client.bucket(bucket_name).blob(blob_name)
+            blob.upload_from_filename(str(self.path), content_type="application/x-sqlite3")
+        finally:
+            os.unlink(self.path)
+
+
+def open_embedding_cache(config: AppConfig) -> EmbeddingCache | None:
+    """Open the cache configured by ``EMBEDDING_CACHE_PATH`` (None when unset)."""
+    location = config.embedding_cache_path
+    if not location:
+        return None
+    if not is_gcs_uri(location):
+        path = Path(location)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return EmbeddingCache(path, max_entries=config.embedding_cache_max_entries)
+
+    bucket_name, blob_name = parse_gcs_uri(location)
+    client = load_storage_client(config)
+    blob = client.bucket(bucket_name).blob(blob_name)
+    handle, local_path = tempfile.mkstemp(suffix=".sqlite")
+    os.close(handle)
+    if blob.exists():
+        blob.download_to_filename(local_path)
+    return EmbeddingCache(
+        Path(local_path),
+        max_entries=config.embedding_cache_max_entries,
+        remote_uri=location,
+        storage_client=client,
+    )
@@ -2,26 +2,253 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Iterable, Sequence
-
-from vertexai.preview.language_models import TextEmbeddingModel
+import asyncio
+import threading
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator, Sequence, TypeVar
 
+from .batching import MicroBatcher
 from .config import AppConfig
+from .embedding_cache import EmbeddingCache
 from .gcp import initialize_vertex_ai
+from .metrics import REGISTRY, vertex_call
+from .throttling import AdaptiveController
+
+if TYPE_CHECKING:
+    from vertexai.preview.language_models import TextEmbeddingModel
+
+T = TypeVar("T")
+
+EMBEDDING_CACHE_LOOKUPS = REGISTRY.counter(
+    "rag_embedding_cache_lookups_total",
+    "Texts looked up in the persistent embedding cache, by result.",
+    ("result",),
+)
+QUERY_BATCH_SIZES = REGISTRY.histogram(
+    "rag_query_embedding_batch_size",
+    "Distinct queries per micro-batched query embedding request.",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 250),
+)
+
+# Texts accepted per embedding request, by model name prefix. Gemini embedding
+# models take a single input; unknown models are treated the same way.
+_MODEL_MAX_TEXTS = (
+    ("gemini-embedding-", 1),
+    ("text-embedding-", 250),
+    ("text-multilingual-embedding-", 250),
+)
+
+
+def max_texts_per_request(model: str) -> int:
+    """Return how many texts one embedding request for ``model`` may carry."""
+    for prefix, limit in _MODEL_MAX_TEXTS:
+        if model.startswith(prefix):
+            return limit
+    return 1
+
+
+def estimate_tokens(text: str) -> int:
+    """Conservatively estimate the token count of ``text`` for request sizing."""
+    return len(text) // 3 + 1
+
+
+def iter_batches(
+    items: Iterable[T],
+    *,
+    max_items: int,
+    max_tokens: int,
+    text_of: Callable[[T], str] = str,
+) -> Iterator[list[T]]:
+    """Group ``items`` into ordered batches within per-request item and token limits.
+
+    An item that exceeds ``max_tokens`` on its own is sent alone; the service
+    truncates it.
+    """
+    batch: list[T] = []
+    batch_tokens = 0
+    for item in items:
+        tokens = estimate_tokens(text_of(item))
+        if batch and (len(batch) >= max_items or batch_tokens + tokens > max_tokens):
+            yield batch
+            batch = []
+            batch_tokens = 0
+        batch.append(item)
+        batch_tokens += tokens
+    if batch:
+        yield batch
 
 
 @dataclass(frozen=True)
 class VertexEmbeddingClient:
-    """Client wrapper for generating text embeddings."""
+    """Client wrapper for generating text embeddings.
+
+    The Vertex model handle is created on first use and reused for the lifetime
+    of the client, so keep one client around for a whole index build. When a
+    ``cache`` is given, cached vectors are returned without calling Vertex and
+    newly computed ones are added to it. ``EMBEDDING_DIMENSIONS`` asks the model
+    for shorter vectors. Requests go through the model's shared
+    :class:`~rag_chatbot.throttling.AdaptiveController`, which retries
+    throttled ones.
+    """
 
     config: AppConfig
+    cache: EmbeddingCache | None = field(default=None, compare=False)
+    _model_lock: threading.Lock = field(
+        default_factory=threading.Lock, init=False, repr=False, compare=False
+    )
+
+    @cached_property
+    def _model(self) -> TextEmbeddingModel:
+        # Index builds embed from several threads; load the model only once.
+        with self._model_lock:
+            if "_model" in self.__dict__:
+                return self.__dict__["_model"]
+            # The Vertex SDK takes seconds to import; only embedding paths pay for it.
+            from vertexai.preview.language_models import TextEmbeddingModel
+
+            initialize_vertex_ai(self.config)
+            return TextEmbeddingModel.from_pretrained(self.config.embedding_model)
+
+    @cached_property
+    def _query_batcher(self) -> MicroBatcher[str, list[float]]:
+        return MicroBatcher(
+            self._embed_query_batch,
+            max_batch=min(
+                self.config.query_batch_size,
+                max_texts_per_request(self.config.embedding_model),
+            ),
+            max_wait=self.config.query_batch_wait_ms / 1000,
+        )
+
+    async def _embed_query_batch(self, texts: list[str]) -> list[list[float]]:
+        QUERY_BATCH_SIZES.observe(len(texts))
+        return await self.embed_texts_async(texts)
+
+    async def embed_query_async(self, text: str) -> list[float]:
+        """Embed one query, sharing a request with queries embedded concurrently.
+
+        Queries arriving within ``QUERY_BATCH_WAIT_MS`` of each other are sent
+        together, up to ``QUERY_BATCH_SIZE`` (and the model's per-request
+        limit) at a time. Models that take one text per request are not batched.
+        """
+        if self._query_batcher.max_batch == 1:
+            return (await self.embed_texts_async([text]))[0]
+        return await self._query_batcher.submit(text)
+
+    @property
+    def _cache_model(self) -> str:
+        # Vectors of different sizes from one model must not share cache entries.
+        dimensions = self.config.embedding_dimensions
+        model = self.config.embedding_model
+        return f"{model}@{dimensions}" if dimensions > 0 else model
+
+    @property
+    def _request_options(self) -> dict[str, int]:
+        if self.config.embedding_dimensions > 0:
+            return {"output_dimensionality": self.config.embedding_dimensions}
+        return {}
+
+    def load_model(self) -> None:
+        """Load the Vertex model handle now rather than on the first request."""
+        _ = self._model
+
+    def batches(self, items: Iterable[T], text_of: Callable[[T], str] = str) -> Iterator[list[T]]:
+        """Group ``items`` into batches that fit one embedding request.
+
+        ``EMBEDDING_BATCH_SIZE`` is capped at the model's own per-request limit.
+        """
+        return iter_batches(
+            items,
+            max_items=min(
+                self.config.embedding_batch_size,
+                max_texts_per_request(self.config.embedding_model),
+            ),
+            max_tokens=self.config.embedding_batch_tokens,
+            text_of=text_of,
+        )
 
     def embed_texts(self, texts: Sequence[str]) -> list[list[float]]:
-        initialize_vertex_ai(self.config)
-        model = TextEmbeddingModel.from_pretrained("gemini-embedding-001")
-        embeddings = model.get_embeddings(texts)
-        return [embedding.values for embedding in embeddings]
+        if self.cache is None:
+            return self._embed_uncached(texts)
+        model = self._cache_model
+        embeddings = self.cache.get_many(model, texts)
+        missing = [position for position, vector in enumerate(embeddings) if vector is None]
+        _count_lookups(len(texts), len(missing))
+        if missing:
+            missing_texts = [texts[position] for position in missing]
+            computed = self._embed_uncached(missing_texts)
+            self.cache.put_many(model, missing_texts, computed)
+            for position, vector in zip(missing, computed):
+                embeddings[position] = vector
+        return embeddings
+
+    async def embed_texts_async(self, texts: Sequence[str]) -> list[list[float]]:
+        """Async variant of :meth:`embed_texts`; blocking work runs off the event loop."""
+        if self.cache is None:
+            return await self._embed_uncached_async(texts)
+        model = self._cache_model
+        embeddings = await asyncio.to_thread(self.cache.get_many, model, texts)
+        missing = [position for position, vector in enumerate(embeddings) if vector is None]
+        _count_lookups(len(texts), len(missing))
+        if missing:
+            missing_texts = [texts[position] for position in missing]
+            computed = await self._embed_uncached_async(missing_texts)
+            await asyncio.to_thread(self.cache.put_many, model, missing_texts, computed)
+            for position, vector in zip(missing, computed):
+                embeddings[position] = vector
+        return embeddings
+
+    @property
+    def _controller(self) -> AdaptiveController:
+        from .clients import get_clients
+
+        return get_clients().vertex_controller(self.config, self.config.embedding_model)
+
+    def _embed_uncached(self, texts: Sequence[str]) -> list[list[float]]:
+        controller = self._controller
+        embeddings: list[list[float]] = []
+        for batch in self.batches(texts):
+
+            def request(batch: list[str] = batch):
+                with vertex_call("embed"):
+                    return self._model.get_embeddings(batch, **self._request_options)
+
+            results = controller.call(request)
+            embeddings.extend(embedding.values for embedding in results)
+        return _checked(embeddings, texts)
+
+    async def _embed_uncached_async(self, texts: Sequence[str]) -> list[list[float]]:
+        if "_model" in self.__dict__:
+            model = self._model
+        else:
+            model = await asyncio.to_thread(lambda: self._model)
+        controller = self._controller
+        embeddings: list[list[float]] = []
+        for batch in self.batches(texts):
+
+            async def request(batch: list[str] = batch):
+                with vertex_call("embed"):
+                    return await model.get_embeddings_async(batch, **self._request_options)
+
+            results = await controller.call_async(request)
+            embeddings.extend(embedding.values for embedding in results)
+        return _checked(embeddings, texts)
+
+
+def _count_lookups(texts: int, missing: int) -> None:
+    if texts > missing:
+        EMBEDDING_CACHE_LOOKUPS.inc(texts - missing, result="hit")
+    if missing:
+        EMBEDDING_CACHE_LOOKUPS.inc(missing, result="miss")
+
+
+def _checked(embeddings: list[list[float]], texts: Sequence[str]) -> list[list[float]]:
+    if len(embeddings) != len(texts):
+        raise RuntimeError(
+            f"Embedding service returned {len(embeddings)} vectors for {len(texts)} texts"
+        )
+    return embeddings
 
 
 def chunk_text(text: str, *, chunk_size: int = 1500) -> Iterable[str]:
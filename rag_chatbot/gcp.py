@@ -2,16 +2,31 @@
 
 from __future__ import annotations
 
+import threading
 from typing import Optional
 
 from .config import AppConfig
 
+_vertex_lock = threading.Lock()
+_vertex_settings: tuple[str, str] | None = None
+
 
 def initialize_vertex_ai(config: AppConfig) -> None:
-    """Initialize the Vertex AI SDK with the configured project settings."""
-    from google.cloud import aiplatform
+    """Initialize the Vertex AI SDK with the configured project settings.
+
+    Only the first call for a given project and region does any work.
+    """
+    global _vertex_settings
+    settings = (config.gcp_project_id, config.gcp_region)
+    if _vertex_settings == settings:
+        return
+    with _vertex_lock:
+        if _vertex_settings == settings:
+            return
+        from google.cloud import aiplatform
 
-    aiplatform.init(project=config.gcp_project_id, location=config.gcp_region)
+        aiplatform.init(project=config.gcp_project_id, location=config.gcp_region)
+        _vertex_settings = settings
 
 
 def get_endpoint_resource_id(endpoint_name: str) -> Optional[str]:
@@ -20,3 +35,27 @@ def get_endpoint_resource_id(endpoint_name: str) -> Optional[str]:
     if not parts:
         return None
     return parts[-1] or None
+
+
+def load_storage_client(config: AppConfig):
+    """Return the shared Cloud Storage client for the configured project.
+
+    See :class:`~rag_chatbot.clients.ClientRegistry`.
+    """
+    from .clients import get_clients
+
+    return get_clients().storage_client(config)
+
+
+def is_gcs_uri(value: str) -> bool:
+    return value.startswith("gs://")
+
+
+def parse_gcs_uri(uri: str) -> tuple[str, str]:
+    """Split ``gs://bucket/blob`` into ``(bucket, blob)``."""
+    if not uri.startswith("gs://"):
+        raise ValueError(f"Not a GCS URI: {uri}")
+    bucket_name, _, blob_name = uri[5:].partition("/")
+    if not bucket_name or not blob_name:
+        raise ValueError(f"Invalid GCS URI: {uri}")
+    return bucket_name, blob_name
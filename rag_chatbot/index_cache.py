@@ -0,0 +1,117 @@
+"""Process-lifetime cache of the loaded vector index."""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from dataclasses import dataclass
+
+from .config import AppConfig
+from .indexing import LoadedIndex, get_index_version, load_vector_index
+from .metrics import REGISTRY, timed
+
+INDEX_CACHE_REQUESTS = REGISTRY.counter(
+    "rag_index_cache_requests_total",
+    "Index lookups by outcome: hit (fresh), revalidated (unchanged) or loaded.",
+    ("result",),
+)
+INDEX_CHUNKS = REGISTRY.gauge("rag_index_chunks", "Chunks in the cached vector index.")
+INDEX_LOADS = REGISTRY.counter("rag_index_loads_total", "Times the vector index was (re)loaded.")
+
+
+@dataclass(frozen=True)
+class _CachedIndex:
+    path_value: str
+    version: tuple | None
+    index: LoadedIndex
+    checked_at: float
+
+
+class IndexCache:
+    """Hold the loaded index in memory and reload it only when the stored copy changes.
+
+    The stored index is revalidated at most every ``config.index_refresh_seconds``
+    using :func:`get_index_version`, so steady-state requests never touch the
+    index payload. Replacing the cached index is a single reference swap, so
+    readers always see either the old or the new index, never a mix.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._current: _CachedIndex | None = None
+
+    def get(self, config: AppConfig) -> LoadedIndex:
+        return self.get_with_version(config)[0]
+
+    async def get_async(self, config: AppConfig) -> LoadedIndex:
+        """Like :meth:`get`, but revalidates and reloads on a worker thread."""
+        return (await self.get_with_version_async(config))[0]
+
+    def get_with_version(self, config: AppConfig) -> tuple[LoadedIndex, tuple | None]:
+        """Return the index together with the fingerprint of the copy it was loaded from.
+
+        Both come from the same cache entry, so a concurrent reload cannot pair
+        one index with another index's version.
+        """
+        current = self._current
+        if self._is_fresh(current, config):
+            INDEX_CACHE_REQUESTS.inc(result="hit")
+            return current.index, current.version
+        with self._lock:
+            # Another thread may have revalidated while we waited for the lock.
+            current = self._current
+            if self._is_fresh(current, config):
+                INDEX_CACHE_REQUESTS.inc(result="hit")
+                return current.index, current.version
+            path_value = config.vector_index_path
+            with timed("index_revalidate"):
+                version = get_index_version(config, path_value)
+            if (
+                current is not None
+                and current.path_value == path_value
+                and current.version == version
+            ):
+                self._current = _CachedIndex(path_value, version, current.index, time.monotonic())
+                INDEX_CACHE_REQUESTS.inc(result="revalidated")
+                return current.index, version
+            index = self._load(config, path_value)
+            self._current = _CachedIndex(path_value, version, index, time.monotonic())
+            INDEX_CACHE_REQUESTS.inc(result="loaded")
+            return index, version
+
+    async def get_with_version_async(
+        self, config: AppConfig
+    ) -> tuple[LoadedIndex, tuple | None]:
+        """Like :meth:`get_with_version`, but revalidates and reloads on a worker thread."""
+        current = self._current
+        if self._is_fresh(current, config):
+            INDEX_CACHE_REQUESTS.inc(result="hit")
+            return current.index, current.version
+        return await asyncio.to_thread(self.get_with_version, config)
+
+    def refresh(self, config: AppConfig) -> LoadedIndex:
+        """Reload the index from storage unconditionally, e.g. right after writing it."""
+        with self._lock:
+            path_value = config.vector_index_path
+            version = get_index_version(config, path_value)
+            index = self._load(config, path_value)
+            self._current = _CachedIndex(path_value, version, index, time.monotonic())
+            return index
+
+    def clear(self) -> None:
+        with self._lock:
+            self._current = None
+
+    @staticmethod
+    def _load(config: AppConfig, path_value: str) -> LoadedIndex:
+        index = load_vector_index(config, path_value)
+        INDEX_LOADS.inc()
+        INDEX_CHUNKS.set(len(index.entries))
+        return index
+
+    @staticmethod
+    def _is_fresh(current: _CachedIndex | None, config: AppConfig) -> bool:
+        if current is None or current.path_value != config.vector_index_path:
+            return False
+        return time.monotonic() - current.checked_at < config.index_refresh_seconds
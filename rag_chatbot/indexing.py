@@ -1,14 +1,34 @@
-"""Simple JSONL-based vector index for retrieval."""
+"""Vector index storage (JSONL or binary) for retrieval."""
 
 from __future__ import annotations
 
-from dataclasses import asdict, dataclass
+import bisect
+from contextlib import ExitStack, contextmanager
+from dataclasses import asdict, dataclass, field
+from itertools import islice
 import json
+import hashlib
+import mmap
+import os
 from pathlib import Path
-from typing import Iterable
+import secrets
+import shutil
+import struct
+import tempfile
+from typing import Callable, Iterable, Iterator, Sequence, TypeVar, overload
 
+import numpy as np
+
+from .ann import IVFIndex
+from .embedding_cache import open_embedding_cache
 from .embeddings import VertexEmbeddingClient, chunk_text
 from .config import AppConfig
+from .gcp import is_gcs_uri, load_storage_client, parse_gcs_uri
+from .lexical import BM25Index
+from .metrics import timed
+from .pipeline import bounded_map
+from .quantization import QUANTIZATION_MODES, QuantizedCodes, build_codes, load_codes, save_codes
+from .vectors import EMBEDDING_DTYPE, matrix_digest, normalize_rows
 
 
 @dataclass(frozen=True)
@@ -18,21 +38,84 @@ class IndexEntry:
     embedding: list[float]
 
 
+T = TypeVar("T")
+
+BINARY_INDEX_SUFFIX = ".vidx"
+MANIFEST_SUFFIX = ".manifest.json"
+ANN_SUFFIX = ".ivf.npz"
+CODES_SUFFIX = ".codes.npz"
+LEXICAL_SUFFIX = ".bm25.npz"
+SIDECAR_SUFFIXES = (ANN_SUFFIX, CODES_SUFFIX, LEXICAL_SUFFIX)
+# A sharded index is a shard list at ``<index>.shards.json`` naming shard files
+# ``<index>.shard-<build>-<i>-of-<n>.vidx`` stored next to it.
+SHARDS_SUFFIX = ".shards.json"
+SHARD_INFIX = ".shard-"
+# Resumable uploads send the index in pieces of this size (a multiple of 256 KiB).
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+# Rows normalized at a time when a JSONL index is streamed to build its sidecars.
+_SIDECAR_BLOCK_ROWS = 16384
+
+# Binary layout: magic + padding, normalized float32 rows starting at a 64-byte
+# boundary, float32 row norms, int64 text offsets, utf-8 text, JSON header, then a
+# trailer holding the header length and the magic again.
+_BINARY_MAGIC = b"RAGVIDX1"
+_BINARY_DATA_OFFSET = 64
+_BINARY_TRAILER = struct.Struct("<Q8s")
+
+
+def is_binary_index_path(path_value: str | Path) -> bool:
+    """Return True when ``path_value`` names a binary (``.vidx``) index."""
+    return str(path_value).endswith(BINARY_INDEX_SUFFIX)
+
+
 @dataclass
 class VectorIndex:
-    entries: list[IndexEntry]
+    entries: Sequence[IndexEntry]
+    # Blob name -> {"generation", "md5"} for the documents a GCS build indexed.
+    manifest: dict[str, dict] | None = field(default=None, compare=False)
+    # Optional IVF index over ``matrix`` used for approximate search.
+    ann: IVFIndex | None = field(default=None, compare=False, repr=False)
+    # Optional int8/PQ/prefix codes of ``matrix`` used for coarse scoring.
+    codes: QuantizedCodes | None = field(default=None, compare=False, repr=False)
+    # Optional BM25 index over the entries' content for keyword and hybrid search.
+    lexical: BM25Index | None = field(default=None, compare=False, repr=False)
+    _matrix: np.ndarray | None = field(default=None, init=False, repr=False, compare=False)
+    _digest: str | None = field(default=None, init=False, repr=False, compare=False)
+
+    @property
+    def digest(self) -> str:
+        """:func:`matrix_digest` of ``matrix``; binary indexes store it in their header."""
+        if self._digest is None:
+            self._digest = matrix_digest(self.matrix)
+        return self._digest
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """Contiguous ``(len(entries), dim)`` float32 matrix of unit-length embeddings.
+
+        Built on first access and reused for every query, so scoring an index is
+        a single matrix-vector product. Mutating ``entries`` afterwards is not
+        supported.
+        """
+        if self._matrix is None:
+            if not self.entries:
+                self._matrix = np.zeros((0, 0), dtype=EMBEDDING_DTYPE)
+            else:
+                self._matrix = normalize_rows([entry.embedding for entry in self.entries])
+        return self._matrix
 
     def to_jsonl(self) -> str:
         return "\n".join(json.dumps(asdict(entry)) for entry in self.entries) + "\n"
 
     def save(self, path: Path) -> None:
-        with path.open("w", encoding="utf-8") as handle:
-            handle.write(self.to_jsonl())
+        _write_index_file(self.entries, path)
 
     @staticmethod
     def load(path: Path) -> "VectorIndex":
         if not path.exists():
             return VectorIndex(entries=[])
+        if is_binary_index_path(path):
+            return read_binary_index(path)
         return VectorIndex.from_jsonl(path.read_text(encoding="utf-8"))
 
     @staticmethod
@@ -45,92 +128,921 @@ class VectorIndex:
         return VectorIndex(entries=entries)
 
 
+class _BinaryEntries(Sequence[IndexEntry]):
+    """Read-only entry view over the sections of a memory-mapped binary index."""
+
+    def __init__(
+        self, matrix: np.ndarray, norms: np.ndarray, offsets: np.ndarray, text: memoryview
+    ) -> None:
+        self._matrix = matrix
+        self._norms = norms
+        self._offsets = offsets
+        self._text = text
+
+    def __len__(self) -> int:
+        return self._matrix.shape[0]
+
+    @overload
+    def __getitem__(self, position: int) -> IndexEntry: ...
+
+    @overload
+    def __getitem__(self, position: slice) -> list[IndexEntry]: ...
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self[item] for item in range(*position.indices(len(self)))]
+        position = int(position)
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError("index entry out of range")
+        uri_start, content_start, content_end = self._offsets[2 * position : 2 * position + 3]
+        return IndexEntry(
+            uri=str(self._text[uri_start:content_start], "utf-8"),
+            content=str(self._text[content_start:content_end], "utf-8"),
+            embedding=(self._matrix[position] * self._norms[position]).tolist(),
+        )
+
+    def contents(self) -> Iterator[str]:
+        """Yield each entry's content without materializing its embedding."""
+        for position in range(len(self)):
+            content_start, content_end = self._offsets[2 * position + 1 : 2 * position + 3]
+            yield str(self._text[content_start:content_end], "utf-8")
+
+
+class _BinaryIndexWriter:
+    """Write a binary index incrementally with memory independent of its size.
+
+    Rows go straight to the output file; norms, offsets and text are spooled to
+    temporary files and appended by :meth:`close`.
+    """
+
+    def __init__(self, path: Path) -> None:
+        with ExitStack() as files:
+            self._handle = files.enter_context(path.open("wb"))
+            self._norms = files.enter_context(tempfile.TemporaryFile())
+            self._offsets = files.enter_context(tempfile.TemporaryFile())
+            self._text = files.enter_context(tempfile.TemporaryFile())
+            # Closed by close() or abort(); only a failed open closes them here.
+            self._files = files.pop_all()
+        self._handle.write(_BINARY_MAGIC.ljust(_BINARY_DATA_OFFSET, b"\0"))
+        self._offsets.write(struct.pack("<q", 0))
+        self._text_size = 0
+        self._count = 0
+        self._dim: int | None = None
+        self._digest = None  # sha256 over the rows, started once the width is known
+
+    def add(self, entry: IndexEntry) -> None:
+        vector = np.asarray(entry.embedding, dtype=EMBEDDING_DTYPE)
+        if self._dim is None:
+            self._dim = vector.shape[0]
+            self._digest = hashlib.sha256(f"{self._dim}:".encode("ascii"))
+        elif vector.shape[0] != self._dim:
+            raise ValueError(
+                f"Embedding for {entry.uri} has {vector.shape[0]} dimensions, "
+                f"expected {self._dim}"
+            )
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector = vector / norm
+        row = vector.astype("<f4", copy=False).tobytes()
+        self._handle.write(row)
+        self._digest.update(row)
+        self._norms.write(struct.pack("<f", norm))
+        for value in (entry.uri, entry.content):
+            encoded = value.encode("utf-8")
+            self._text.write(encoded)
+            self._text_size += len(encoded)
+            self._offsets.write(struct.pack("<q", self._text_size))
+        self._count += 1
+
+    def close(self) -> int:
+        """Write the trailing sections and return the number of entries."""
+        header = {
+            "version": 1,
+            "count": self._count,
+            "dim": self._dim or 0,
+            # Same value as matrix_digest() over the stored rows.
+            "digest": self._digest.hexdigest() if self._digest is not None else "",
+        }
+        with self._files:
+            spools = (("norms", self._norms), ("offsets", self._offsets), ("text", self._text))
+            for name, spool in spools:
+                header[name] = self._handle.tell()
+                spool.seek(0)
+                shutil.copyfileobj(spool, self._handle)
+            encoded_header = json.dumps(header).encode("utf-8")
+            self._handle.write(encoded_header)
+            self._handle.write(_BINARY_TRAILER.pack(len(encoded_header), _BINARY_MAGIC))
+        return self._count
+
+    def abort(self) -> None:
+        self._files.close()
+
+
+def write_binary_index(entries: Iterable[IndexEntry], path: Path) -> int:
+    """Write ``entries`` to ``path`` in the binary index format."""
+    writer = _BinaryIndexWriter(path)
+    try:
+        for entry in entries:
+            writer.add(entry)
+    except BaseException:
+        writer.abort()
+        raise
+    return writer.close()
+
+
+def read_binary_index(path: Path) -> VectorIndex:
+    """Memory-map a binary index; embeddings and text are paged in on demand."""
+    with path.open("rb") as handle:
+        buffer = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+    trailer_start = len(buffer) - _BINARY_TRAILER.size
+    if trailer_start < _BINARY_DATA_OFFSET or buffer[: len(_BINARY_MAGIC)] != _BINARY_MAGIC:
+        raise ValueError(f"Not a binary vector index: {path}")
+    header_length, magic = _BINARY_TRAILER.unpack_from(buffer, trailer_start)
+    if magic != _BINARY_MAGIC:
+        raise ValueError(f"Truncated binary vector index: {path}")
+    header_start = trailer_start - header_length
+    header = json.loads(buffer[header_start:trailer_start])
+    count, dim = header["count"], header["dim"]
+    matrix = np.frombuffer(
+        buffer, dtype="<f4", count=count * dim, offset=_BINARY_DATA_OFFSET
+    ).reshape(count, dim)
+    norms = np.frombuffer(buffer, dtype="<f4", count=count, offset=header["norms"])
+    offsets = np.frombuffer(buffer, dtype="<i8", count=2 * count + 1, offset=header["offsets"])
+    text = memoryview(buffer)[header["text"] : header_start]
+    entries = _BinaryEntries(matrix, norms, offsets, text)
+    index = VectorIndex(entries=entries)
+    index._matrix = matrix
+    index._digest = header.get("digest") or None
+    return index
+
+
+class _ShardedEntries(Sequence[IndexEntry]):
+    """Entries of every shard in shard order; shards are opened on first access."""
+
+    def __init__(self, index: "ShardedIndex") -> None:
+        self._index = index
+        self._starts = [0]
+        for count in index.counts:
+            self._starts.append(self._starts[-1] + count)
+
+    def __len__(self) -> int:
+        return self._starts[-1]
+
+    def __iter__(self) -> Iterator[IndexEntry]:
+        for position, count in enumerate(self._index.counts):
+            if count:
+                yield from self._index.shard(position).entries
+
+    @overload
+    def __getitem__(self, position: int) -> IndexEntry: ...
+
+    @overload
+    def __getitem__(self, position: slice) -> list[IndexEntry]: ...
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self[item] for item in range(*position.indices(len(self)))]
+        position = int(position)
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError("index entry out of range")
+        shard = bisect.bisect_right(self._starts, position) - 1
+        return self._index.shard(shard).entries[position - self._starts[shard]]
+
+
+@dataclass
+class ShardedIndex:
+    """An index split into shards (``INDEX_SHARDS``) that are searched independently.
+
+    Loading only reads the shard list; each shard is opened by the process
+    that searches it, or here on first use of :meth:`shard` or ``entries``.
+    ``build`` changes on every write, so shard locations are never reused.
+    """
+
+    config: AppConfig = field(compare=False, repr=False)
+    build: str
+    locations: list[str]
+    counts: list[int]
+    digests: list[str]
+    manifest: dict[str, dict] | None = field(default=None, compare=False)
+    _shards: dict[int, VectorIndex] = field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
+
+    @property
+    def entries(self) -> Sequence[IndexEntry]:
+        return _ShardedEntries(self)
+
+    def shard(self, position: int) -> VectorIndex:
+        loaded = self._shards.get(position)
+        if loaded is None:
+            loaded = load_vector_index(self.config, self.locations[position])
+            self._shards[position] = loaded
+        return loaded
+
+
+LoadedIndex = VectorIndex | ShardedIndex
+
+
+def shard_of(uri: str, shards: int) -> int:
+    """Return the shard holding ``uri``; every chunk of a document lands in the same shard."""
+    document = uri.partition("#")[0].encode("utf-8")
+    return int.from_bytes(hashlib.blake2b(document, digest_size=8).digest(), "big") % shards
+
+
+def shards_path(path_value: str) -> str:
+    """Return the location of the shard list of a sharded index."""
+    return f"{path_value}{SHARDS_SUFFIX}"
+
+
+def _sibling(path_value: str, name: str) -> str:
+    head, separator, _ = path_value.rpartition("/")
+    return f"{head}{separator}{name}"
+
+
+def _read_json(config: AppConfig, location: str) -> dict | None:
+    if is_gcs_uri(location):
+        bucket_name, blob_name = parse_gcs_uri(location)
+        blob = load_storage_client(config).bucket(bucket_name).blob(blob_name)
+        if not blob.exists():
+            return None
+        return json.loads(blob.download_as_text())
+    path = Path(location)
+    if not path.exists():
+        return None
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def _load_shard_list(config: AppConfig, path_value: str) -> ShardedIndex | None:
+    payload = _read_json(config, shards_path(path_value))
+    if payload is None:
+        return None
+    shards = payload["shards"]
+    return ShardedIndex(
+        config=config,
+        build=payload["build"],
+        locations=[_sibling(path_value, shard["name"]) for shard in shards],
+        counts=[shard["count"] for shard in shards],
+        digests=[shard["digest"] for shard in shards],
+    )
+
+
 def build_vector_index(
     config: AppConfig,
     source_paths: Iterable[Path],
     output_path: Path,
-) -> VectorIndex:
-    """Create a JSONL vector index from local documents."""
-    client = VertexEmbeddingClient(config)
-    entries: list[IndexEntry] = []
+) -> int:
+    """Stream a vector index of local documents to ``output_path``.
 
-    for path in source_paths:
-        text = path.read_text(encoding="utf-8", errors="ignore")
-        for chunk_id, chunk in enumerate(chunk_text(text)):
-            embedding = client.embed_texts([chunk])[0]
-            uri = f"{path.as_posix()}#chunk={chunk_id}"
-            entries.append(IndexEntry(uri=uri, content=chunk, embedding=embedding))
+    The format is chosen by the suffix of ``output_path``; returns the number of
+    entries written.
+    """
 
-    index = VectorIndex(entries=entries)
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    index.save(output_path)
-    return index
+    def read(path: Path) -> tuple[str, str]:
+        return path.as_posix(), path.read_text(encoding="utf-8", errors="ignore")
+
+    with index_embedder(config) as client:
+        entries = index_documents(config, client, source_paths, read)
+        return write_vector_index(config, entries, str(output_path))
 
 
-def _load_storage_client(config: AppConfig):
-    from google.cloud import storage
+@contextmanager
+def index_embedder(config: AppConfig) -> Iterator[VertexEmbeddingClient]:
+    """Yield an embedding client backed by the configured embedding cache, if any."""
+    cache = open_embedding_cache(config)
+    try:
+        yield VertexEmbeddingClient(config, cache=cache)
+    finally:
+        if cache is not None:
+            cache.close()
 
-    return storage.Client(project=config.gcp_project_id)
 
+def embed_chunks(
+    embedder: VertexEmbeddingClient,
+    chunks: Iterable[tuple[str, str]],
+    *,
+    workers: int = 1,
+) -> Iterator[IndexEntry]:
+    """Embed ``(uri, content)`` pairs in request-sized batches, preserving order.
 
-def _is_gcs_uri(value: str) -> bool:
-    return value.startswith("gs://")
+    Up to ``workers`` embedding requests are in flight at once.
+    """
 
+    def embed(batch: list[tuple[str, str]]) -> list[IndexEntry]:
+        with timed("index_embed"):
+            embeddings = embedder.embed_texts([content for _, content in batch])
+        return [
+            IndexEntry(uri=uri, content=content, embedding=embedding)
+            for (uri, content), embedding in zip(batch, embeddings)
+        ]
 
-def _parse_gcs_uri(uri: str) -> tuple[str, str]:
-    if not uri.startswith("gs://"):
-        raise ValueError(f"Not a GCS URI: {uri}")
-    bucket_name, _, blob_name = uri[5:].partition("/")
-    if not bucket_name or not blob_name:
-        raise ValueError(f"Invalid GCS URI: {uri}")
-    return bucket_name, blob_name
+    batches = embedder.batches(chunks, text_of=lambda chunk: chunk[1])
+    for entries in bounded_map(embed, batches, workers=workers):
+        yield from entries
+
+
+def _chunk_document(document: tuple[str, str]) -> list[tuple[str, str]]:
+    base_uri, text = document
+    return [
+        (f"{base_uri}#chunk={chunk_id}", chunk)
+        for chunk_id, chunk in enumerate(chunk_text(text))
+    ]
+
+
+def index_documents(
+    config: AppConfig,
+    embedder: VertexEmbeddingClient,
+    documents: Iterable[T],
+    load: Callable[[T], tuple[str, str]],
+) -> Iterator[IndexEntry]:
+    """Load, chunk and embed ``documents`` as overlapping, bounded stages.
 
+    ``load`` turns a document into ``(base_uri, text)``. Each stage runs on its
+    own pool sized by ``INDEX_LOAD_WORKERS``, ``INDEX_CHUNK_WORKERS`` and
+    ``INDEX_EMBED_WORKERS``; entries come out in document and chunk order.
+    """
+    texts = bounded_map(load, documents, workers=config.index_load_workers)
+    chunked = bounded_map(_chunk_document, texts, workers=config.index_chunk_workers)
+    chunks = (chunk for document_chunks in chunked for chunk in document_chunks)
+    return embed_chunks(embedder, chunks, workers=config.index_embed_workers)
 
-def load_vector_index(config: AppConfig, path_value: str) -> VectorIndex:
-    if _is_gcs_uri(path_value):
-        bucket_name, blob_name = _parse_gcs_uri(path_value)
-        client = _load_storage_client(config)
+
+def get_index_version(config: AppConfig, path_value: str) -> tuple | None:
+    """Return a cheap fingerprint of the stored index, or None if it does not exist.
+
+    Local indexes are fingerprinted by mtime and size, GCS indexes by the blob's
+    generation and etag (a metadata-only request). A sharded index is
+    fingerprinted by its shard list, which every build rewrites last.
+    """
+    for location in (shards_path(path_value), path_value):
+        version = _stored_version(config, location)
+        if version is not None:
+            return version
+    return None
+
+
+def _stored_version(config: AppConfig, location: str) -> tuple | None:
+    if is_gcs_uri(location):
+        bucket_name, blob_name = parse_gcs_uri(location)
+        client = load_storage_client(config)
+        blob = client.bucket(bucket_name).get_blob(blob_name)
+        if blob is None:
+            return None
+        return (blob.generation, blob.etag)
+    try:
+        stat = os.stat(location)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def load_vector_index(config: AppConfig, path_value: str) -> LoadedIndex:
+    """Load the index at ``path_value``; a sharded index only has its shard list read."""
+    with timed("index_load"):
+        return _load_vector_index(config, path_value)
+
+
+def _load_vector_index(config: AppConfig, path_value: str) -> LoadedIndex:
+    sharded = _load_shard_list(config, path_value)
+    if sharded is not None:
+        return sharded
+    if is_gcs_uri(path_value):
+        bucket_name, blob_name = parse_gcs_uri(path_value)
+        client = load_storage_client(config)
         bucket = client.bucket(bucket_name)
         blob = bucket.blob(blob_name)
         if not blob.exists():
             return VectorIndex(entries=[])
-        content = blob.download_as_text()
-        return VectorIndex.from_jsonl(content)
-    return VectorIndex.load(Path(path_value))
+        if is_binary_index_path(blob_name):
+            index = _download_binary_index(blob)
+        else:
+            index = VectorIndex.from_jsonl(blob.download_as_text())
+    else:
+        index = VectorIndex.load(Path(path_value))
+    if index.entries:
+        if config.ann_nprobe > 0:
+            index.ann = _load_sidecar(config, ann_path(path_value), IVFIndex.load, index)
+        # Codes are only written for binary indexes, whose rows stay memory-mapped.
+        if config.quantized_shortlist_factor > 0 and is_binary_index_path(path_value):
+            index.codes = _load_sidecar(config, codes_path(path_value), load_codes, index)
+        if config.retrieval_mode != "vector":
+            index.lexical = _load_sidecar(config, lexical_path(path_value), BM25Index.load, index)
+    return index
 
 
-def save_vector_index(config: AppConfig, index: VectorIndex, path_value: str) -> None:
-    if _is_gcs_uri(path_value):
-        bucket_name, blob_name = _parse_gcs_uri(path_value)
-        client = _load_storage_client(config)
-        bucket = client.bucket(bucket_name)
-        blob = bucket.blob(blob_name)
-        blob.upload_from_string(index.to_jsonl(), content_type="application/json")
+def ann_path(path_value: str) -> str:
+    """Return the location of the IVF sidecar stored next to an index."""
+    return f"{path_value}{ANN_SUFFIX}"
+
+
+def codes_path(path_value: str) -> str:
+    """Return the location of the quantized-codes sidecar stored next to an index."""
+    return f"{path_value}{CODES_SUFFIX}"
+
+
+def lexical_path(path_value: str) -> str:
+    """Return the location of the BM25 sidecar stored next to an index."""
+    return f"{path_value}{LEXICAL_SUFFIX}"
+
+
+def _load_sidecar(
+    config: AppConfig, location: str, loader: Callable[[Path], T], index: VectorIndex
+) -> T | None:
+    """Load the sidecar at ``location`` if it was built from ``index``.
+
+    A missing sidecar, or one left over from a different build, yields None and
+    retrieval falls back to scoring the full-precision matrix.
+    """
+    if is_gcs_uri(location):
+        bucket_name, blob_name = parse_gcs_uri(location)
+        blob = load_storage_client(config).bucket(bucket_name).blob(blob_name)
+        if not blob.exists():
+            return None
+        handle, local_path = tempfile.mkstemp(suffix=Path(blob_name).suffix)
+        os.close(handle)
+        try:
+            blob.download_to_filename(local_path)
+            sidecar = loader(Path(local_path))
+        finally:
+            os.unlink(local_path)
+    else:
+        path = Path(location)
+        if not path.exists():
+            return None
+        sidecar = loader(path)
+    return sidecar if sidecar.digest == index.digest else None
+
+
+def _build_sidecars(config: AppConfig, index_path: Path) -> list[str]:
+    """Build the sidecars ``ANN_LISTS``, ``INDEX_QUANTIZATION`` and ``LEXICAL_INDEX`` ask for.
+
+    Each is written to ``<index_path><suffix>``; the suffixes built are returned.
+    """
+    if config.ann_lists <= 0 and config.index_quantization == "none" and not config.lexical_index:
+        return []
+    with timed("index_sidecars"):
+        return _write_sidecars(config, index_path)
+
+
+def _spool_jsonl_matrix(config: AppConfig, index_path: Path, spool: Path) -> np.ndarray:
+    """Write the unit-length rows of the JSONL index at ``index_path`` to ``spool`` and map them.
+
+    Rows are normalized a block at a time exactly as :attr:`VectorIndex.matrix`
+    does, so the mapped matrix has the same :func:`matrix_digest` as the loaded
+    index while only one block is held in memory.
+    """
+    entries = iter_index_entries(config, str(index_path))
+    count = 0
+    dim = None
+    with spool.open("wb") as handle:
+        while block := list(islice(entries, _SIDECAR_BLOCK_ROWS)):
+            rows = normalize_rows([entry.embedding for entry in block])
+            if dim is None:
+                dim = rows.shape[1]
+            elif rows.shape[1] != dim:
+                raise ValueError(f"Index rows have {rows.shape[1]} dimensions, expected {dim}")
+            handle.write(rows.tobytes())
+            count += rows.shape[0]
+    if not count:
+        return np.zeros((0, 0), dtype=EMBEDDING_DTYPE)
+    return np.memmap(spool, dtype=EMBEDDING_DTYPE, mode="r", shape=(count, dim))
+
+
+def _write_sidecars(config: AppConfig, index_path: Path) -> list[str]:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if is_binary_index_path(index_path):
+            index = read_binary_index(index_path)
+            matrix, digest = index.matrix, index.digest
+            contents = index.entries.contents
+        else:
+            # Stream a JSONL index instead of loading it, so building its
+            # sidecars does not hold every entry in memory.
+            matrix = _spool_jsonl_matrix(config, index_path, Path(tmp_dir) / "rows")
+            digest = matrix_digest(matrix)
+
+            def contents() -> Iterator[str]:
+                return (entry.content for entry in iter_index_entries(config, str(index_path)))
+
+        if not matrix.shape[0]:
+            return []
+        built = []
+        if config.ann_lists > 0:
+            IVFIndex.build(matrix, lists=config.ann_lists, digest=digest).save(
+                Path(f"{index_path}{ANN_SUFFIX}")
+            )
+            built.append(ANN_SUFFIX)
+        codes = build_codes(
+            matrix,
+            config.index_quantization,
+            pq_subvector_dims=config.pq_subvector_dims,
+            first_stage_dims=config.first_stage_dims,
+            digest=digest,
+        )
+        if codes is not None:
+            save_codes(codes, Path(f"{index_path}{CODES_SUFFIX}"))
+            built.append(CODES_SUFFIX)
+        if config.lexical_index:
+            BM25Index.build(contents(), digest=digest).save(Path(f"{index_path}{LEXICAL_SUFFIX}"))
+            built.append(LEXICAL_SUFFIX)
+        return built
+
+
+def _remove_stale_sidecars(config: AppConfig, path_value: str, built: list[str]) -> None:
+    """Delete sidecars of an earlier build that the latest build did not produce."""
+    stale = [suffix for suffix in SIDECAR_SUFFIXES if suffix not in built]
+    if is_gcs_uri(path_value):
+        bucket_name, blob_name = parse_gcs_uri(path_value)
+        bucket = load_storage_client(config).bucket(bucket_name)
+        for suffix in stale:
+            blob = bucket.blob(f"{blob_name}{suffix}")
+            if blob.exists():
+                blob.delete()
+        return
+    for suffix in stale:
+        Path(f"{path_value}{suffix}").unlink(missing_ok=True)
+
+
+def _download_binary_index(blob) -> VectorIndex:
+    handle, local_path = tempfile.mkstemp(suffix=BINARY_INDEX_SUFFIX)
+    os.close(handle)
+    try:
+        blob.download_to_filename(local_path)
+        # The mapping keeps the data alive after the temporary file is unlinked.
+        return read_binary_index(Path(local_path))
+    finally:
+        os.unlink(local_path)
+
+
+def iter_index_entries(config: AppConfig, path_value: str) -> Iterator[IndexEntry]:
+    """Stream the entries stored at ``path_value`` without holding them all in memory."""
+    if is_binary_index_path(path_value):
+        yield from load_vector_index(config, path_value).entries
+        return
+    if is_gcs_uri(path_value):
+        bucket_name, blob_name = parse_gcs_uri(path_value)
+        blob = load_storage_client(config).bucket(bucket_name).blob(blob_name)
+        if not blob.exists():
+            return
+        handle = blob.open("rt", encoding="utf-8")
+    else:
+        path = Path(path_value)
+        if not path.exists():
+            return
+        handle = path.open("r", encoding="utf-8")
+    with handle:
+        for line in handle:
+            if line.strip():
+                yield IndexEntry(**json.loads(line))
+
+
+def _write_index_file(entries: Iterable[IndexEntry], path: Path) -> int:
+    if is_binary_index_path(path):
+        return write_binary_index(entries, path)
+    count = 0
+    with path.open("w", encoding="utf-8") as handle:
+        for entry in entries:
+            handle.write(json.dumps(asdict(entry)))
+            handle.write("\n")
+            count += 1
+    return count
+
+
+def write_vector_index(
+    config: AppConfig,
+    entries: Iterable[IndexEntry],
+    path_value: str,
+    *,
+    manifest: dict[str, dict] | None = None,
+) -> int:
+    """Stream ``entries`` to ``path_value`` and return how many were written.
+
+    Entries are written one at a time to a local temporary file, so memory does
+    not grow with the index. The new index only becomes visible once it is
+    complete: local files are swapped in with an atomic rename and ``gs://``
+    targets are sent as a chunked resumable upload, which GCS publishes when it
+    is finalized. Sidecars requested by ``ANN_LISTS`` (IVF),
+    ``INDEX_QUANTIZATION`` (int8/PQ/prefix codes) and ``LEXICAL_INDEX`` (BM25) are built
+    from the finished file and stored before the index is published, so a reader that sees the new index
+    can also find them; sidecars the build did not produce are then removed.
+    Each sidecar records the digest of the matrix it was built from and is
+    ignored when loaded next to a different index. ``manifest`` may be filled
+    in while ``entries`` is consumed; it is saved after the index.
+    """
+    if config.index_quantization not in QUANTIZATION_MODES:
+        raise ValueError(
+            f"Unknown INDEX_QUANTIZATION {config.index_quantization!r}; "
+            f"expected one of {QUANTIZATION_MODES}"
+        )
+    if config.index_quantization != "none" and not is_binary_index_path(path_value):
+        # Codes only save memory when full-precision rows stay memory-mapped on disk.
+        raise ValueError(
+            f"INDEX_QUANTIZATION={config.index_quantization} needs a binary index; "
+            f"write to a {BINARY_INDEX_SUFFIX} path instead of {path_value}"
+        )
+    if config.index_shards > 1:
+        if not is_binary_index_path(path_value):
+            raise ValueError(
+                f"INDEX_SHARDS={config.index_shards} needs a binary index; "
+                f"write to a {BINARY_INDEX_SUFFIX} path instead of {path_value}"
+            )
+        count = _write_sharded_index(config, entries, path_value)
+        if manifest is not None:
+            _save_index_manifest(config, manifest, path_value)
+        return count
+    if is_gcs_uri(path_value):
+        bucket_name, blob_name = parse_gcs_uri(path_value)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            local_path = Path(tmp_dir) / Path(blob_name).name
+            count = _write_index_file(entries, local_path)
+            bucket = load_storage_client(config).bucket(bucket_name)
+            built = _build_sidecars(config, local_path)
+            with timed("index_upload"):
+                for suffix in built:
+                    sidecar = bucket.blob(f"{blob_name}{suffix}", chunk_size=UPLOAD_CHUNK_SIZE)
+                    sidecar.upload_from_filename(
+                        f"{local_path}{suffix}", content_type="application/octet-stream"
+                    )
+                blob = bucket.blob(blob_name, chunk_size=UPLOAD_CHUNK_SIZE)
+                content_type = (
+                    "application/octet-stream"
+                    if is_binary_index_path(blob_name)
+                    else "application/json"
+                )
+                blob.upload_from_filename(str(local_path), content_type=content_type)
+    else:
+        output_path = Path(path_value)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        handle, tmp_name = tempfile.mkstemp(
+            dir=output_path.parent, prefix=f".{output_path.name}.", suffix=output_path.suffix
+        )
+        os.close(handle)
+        try:
+            count = _write_index_file(entries, Path(tmp_name))
+            built = _build_sidecars(config, Path(tmp_name))
+            for suffix in built:
+                os.replace(f"{tmp_name}{suffix}", f"{path_value}{suffix}")
+            os.replace(tmp_name, output_path)
+        except BaseException:
+            os.unlink(tmp_name)
+            for suffix in SIDECAR_SUFFIXES:
+                Path(f"{tmp_name}{suffix}").unlink(missing_ok=True)
+            raise
+    _remove_stale_sidecars(config, path_value, built)
+    previous = _load_shard_list(config, path_value)
+    if previous is not None:
+        # The shard list shadows the index, so drop it before its shards.
+        _delete_locations(config, [shards_path(path_value)])
+        _delete_shards(config, previous.locations)
+    if manifest is not None:
+        _save_index_manifest(config, manifest, path_value)
+    return count
+
+
+def _write_sharded_index(config: AppConfig, entries: Iterable[IndexEntry], path_value: str) -> int:
+    """Write ``entries`` as ``config.index_shards`` binary shards split by document.
+
+    Shards and their sidecars are published under fresh names first and the
+    shard list last, so readers switch from the previous build to the new one
+    in a single step; the previous build's files are removed afterwards.
+    """
+    shards = config.index_shards
+    build = secrets.token_hex(4)
+    base_name = path_value.rpartition("/")[2]
+    names = [
+        f"{base_name}{SHARD_INFIX}{build}-{shard:03d}-of-{shards:03d}{BINARY_INDEX_SUFFIX}"
+        for shard in range(shards)
+    ]
+    previous = _load_shard_list(config, path_value)
+    if is_gcs_uri(path_value):
+        tmp_parent = None
+    else:
+        tmp_parent = Path(path_value).parent
+        tmp_parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=tmp_parent, prefix=f".{base_name}.") as tmp_dir:
+        local_paths = [Path(tmp_dir) / name for name in names]
+        writers = [_BinaryIndexWriter(path) for path in local_paths]
+        try:
+            for entry in entries:
+                writers[shard_of(entry.uri, shards)].add(entry)
+        except BaseException:
+            for writer in writers:
+                writer.abort()
+            raise
+        counts = [writer.close() for writer in writers]
+        digests = [read_binary_index(path).digest for path in local_paths]
+        for local_path, name in zip(local_paths, names):
+            location = _sibling(path_value, name)
+            for suffix in _build_sidecars(config, local_path):
+                _publish_file(config, Path(f"{local_path}{suffix}"), f"{location}{suffix}")
+            _publish_file(config, local_path, location)
+        shard_list = {
+            "version": 1,
+            "build": build,
+            "shards": [
+                {"name": name, "count": count, "digest": digest}
+                for name, count, digest in zip(names, counts, digests)
+            ],
+        }
+        list_path = Path(tmp_dir) / Path(shards_path(base_name)).name
+        list_path.write_text(json.dumps(shard_list), encoding="utf-8")
+        _publish_file(config, list_path, shards_path(path_value))
+    # An unsharded index at the same path is shadowed by the shard list now.
+    _delete_locations(
+        config, [path_value, *(f"{path_value}{suffix}" for suffix in SIDECAR_SUFFIXES)]
+    )
+    if previous is not None:
+        _delete_shards(config, previous.locations)
+    return sum(counts)
+
+
+def _publish_file(config: AppConfig, local_path: Path, location: str) -> None:
+    """Move a finished local file to ``location`` (atomic rename or GCS upload)."""
+    if is_gcs_uri(location):
+        bucket_name, blob_name = parse_gcs_uri(location)
+        bucket = load_storage_client(config).bucket(bucket_name)
+        blob = bucket.blob(blob_name, chunk_size=UPLOAD_CHUNK_SIZE)
+        content_type = (
+            "application/json" if location.endswith(".json") else "application/octet-stream"
+        )
+        with timed("index_upload"):
+            blob.upload_from_filename(str(local_path), content_type=content_type)
+    else:
+        os.replace(local_path, location)
+
+
+def _delete_locations(config: AppConfig, locations: Iterable[str]) -> None:
+    for location in locations:
+        if is_gcs_uri(location):
+            bucket_name, blob_name = parse_gcs_uri(location)
+            blob = load_storage_client(config).bucket(bucket_name).blob(blob_name)
+            if blob.exists():
+                blob.delete()
+        else:
+            Path(location).unlink(missing_ok=True)
+
+
+def _delete_shards(config: AppConfig, locations: Iterable[str]) -> None:
+    _delete_locations(
+        config,
+        [
+            shard
+            for location in locations
+            for shard in (location, *(f"{location}{suffix}" for suffix in SIDECAR_SUFFIXES))
+        ],
+    )
+
+
+def save_vector_index(config: AppConfig, index: LoadedIndex, path_value: str) -> None:
+    write_vector_index(config, index.entries, path_value, manifest=index.manifest)
+
+
+def manifest_path(path_value: str) -> str:
+    """Return the location of the blob manifest stored next to an index."""
+    return f"{path_value}{MANIFEST_SUFFIX}"
+
+
+def load_index_manifest(config: AppConfig, path_value: str) -> dict[str, dict] | None:
+    """Load the blob manifest stored next to the index at ``path_value``, if any."""
+    payload = _read_json(config, manifest_path(path_value))
+    return None if payload is None else payload["blobs"]
+
+
+def _save_index_manifest(config: AppConfig, manifest: dict[str, dict], path_value: str) -> None:
+    location = manifest_path(path_value)
+    payload = json.dumps({"version": 1, "blobs": manifest}, sort_keys=True)
+    if is_gcs_uri(location):
+        bucket_name, blob_name = parse_gcs_uri(location)
+        blob = load_storage_client(config).bucket(bucket_name).blob(blob_name)
+        blob.upload_from_string(payload, content_type="application/json")
         return
-    output_path = Path(path_value)
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    index.save(output_path)
+    Path(location).write_text(payload, encoding="utf-8")
+
+
+def _blob_fingerprint(blob) -> dict:
+    return {"generation": blob.generation, "md5": blob.md5_hash}
+
+
+def _blob_unchanged(previous: dict | None, blob) -> bool:
+    if previous is None:
+        return False
+    if previous.get("md5") and blob.md5_hash:
+        return previous["md5"] == blob.md5_hash
+    return previous.get("generation") == blob.generation
+
+
+def _document_name(uri: str, bucket_name: str) -> str | None:
+    document, _, _ = uri.partition("#")
+    bucket_prefix = f"gs://{bucket_name}/"
+    if not document.startswith(bucket_prefix):
+        return None
+    return document[len(bucket_prefix) :]
+
+
+def _excluded_blob_names(config: AppConfig) -> set[str]:
+    """Names of our own artifacts that may live in the document bucket."""
+    excluded = set()
+    for location in (
+        config.vector_index_path,
+        manifest_path(config.vector_index_path),
+        shards_path(config.vector_index_path),
+        *(f"{config.vector_index_path}{suffix}" for suffix in SIDECAR_SUFFIXES),
+        config.embedding_cache_path,
+    ):
+        if is_gcs_uri(location):
+            bucket_name, blob_name = parse_gcs_uri(location)
+            if bucket_name == config.document_bucket:
+                excluded.add(blob_name)
+    return excluded
+
+
+def _excluded_blob_prefix(config: AppConfig) -> str | None:
+    """Name prefix of the index shards (and their sidecars) in the document bucket."""
+    if is_gcs_uri(config.vector_index_path):
+        bucket_name, blob_name = parse_gcs_uri(config.vector_index_path)
+        if bucket_name == config.document_bucket:
+            return f"{blob_name}{SHARD_INFIX}"
+    return None
+
+
+def iter_gcs_index_entries(
+    config: AppConfig,
+    manifest: dict[str, dict],
+    *,
+    prefix: str | None = None,
+    incremental: bool = False,
+) -> Iterator[IndexEntry]:
+    """Stream index entries for the documents in the bucket.
+
+    ``manifest`` is filled with the generation and MD5 hash of every indexed
+    blob and is complete once the iterator is exhausted. With
+    ``incremental=True`` the existing index and manifest are read and only new
+    or changed blobs under ``prefix`` are downloaded and embedded; entries for
+    blobs that no longer exist are dropped and entries outside ``prefix`` are
+    kept as they are.
+    """
+    client = load_storage_client(config)
+    bucket = client.bucket(config.document_bucket)
+    excluded = _excluded_blob_names(config)
+    excluded_prefix = _excluded_blob_prefix(config)
+    blobs = [
+        blob
+        for blob in client.list_blobs(bucket, prefix=prefix)
+        if not blob.name.endswith("/")
+        and blob.name not in excluded
+        and not (excluded_prefix and blob.name.startswith(excluded_prefix))
+    ]
+
+    changed = blobs
+    if incremental:
+        previous = load_index_manifest(config, config.vector_index_path) or {}
+        listed = {blob.name for blob in blobs}
+        unchanged = {
+            blob.name for blob in blobs if _blob_unchanged(previous.get(blob.name), blob)
+        }
+        changed = [blob for blob in blobs if blob.name not in unchanged]
+        manifest.update(
+            (name, fingerprint)
+            for name, fingerprint in previous.items()
+            if name not in listed and not name.startswith(prefix or "")
+        )
+        manifest.update(
+            (blob.name, _blob_fingerprint(blob)) for blob in blobs if blob.name in unchanged
+        )
+
+        def keep(name: str | None) -> bool:
+            if name is None or not name.startswith(prefix or ""):
+                return True
+            return name in unchanged
+
+        for entry in iter_index_entries(config, config.vector_index_path):
+            if keep(_document_name(entry.uri, config.document_bucket)):
+                yield entry
+
+    def download(blob) -> tuple[str, str]:
+        with timed("index_download"):
+            payload = blob.download_as_bytes()
+        text = payload.decode("utf-8", errors="ignore")
+        return f"gs://{config.document_bucket}/{blob.name}", text
+
+    with index_embedder(config) as embedder:
+        yield from index_documents(config, embedder, changed, download)
+    manifest.update((blob.name, _blob_fingerprint(blob)) for blob in changed)
 
 
 def build_vector_index_from_gcs(
-    config: AppConfig, *, prefix: str | None = None
+    config: AppConfig, *, prefix: str | None = None, incremental: bool = False
 ) -> VectorIndex:
-    client = _load_storage_client(config)
-    bucket = client.bucket(config.document_bucket)
-    index_bucket: str | None = None
-    index_blob: str | None = None
-    if _is_gcs_uri(config.vector_index_path):
-        index_bucket, index_blob = _parse_gcs_uri(config.vector_index_path)
-    entries: list[IndexEntry] = []
-    embedder = VertexEmbeddingClient(config)
-    for blob in client.list_blobs(bucket, prefix=prefix):
-        if blob.name.endswith("/"):
-            continue
-        if index_bucket == config.document_bucket and blob.name == index_blob:
-            continue
-        text = blob.download_as_bytes().decode("utf-8", errors="ignore")
-        for chunk_id, chunk in enumerate(chunk_text(text)):
-            embedding = embedder.embed_texts([chunk])[0]
-            uri = f"gs://{config.document_bucket}/{blob.name}#chunk={chunk_id}"
-            entries.append(IndexEntry(uri=uri, content=chunk, embedding=embedding))
-    return VectorIndex(entries=entries)
+    """Build an in-memory index from the document bucket.
+
+    The returned index carries the blob manifest that :func:`save_vector_index`
+    stores next to it. Prefer streaming :func:`iter_gcs_index_entries` into
+    :func:`write_vector_index` for large buckets.
+    """
+    manifest: dict[str, dict] = {}
+    entries = list(
+        iter_gcs_index_entries(config, manifest, prefix=prefix, incremental=incremental)
+    )
+    return VectorIndex(entries=entries, manifest=manifest)
@@ -2,29 +2,125 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass
+import base64
+import hashlib
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Iterable
 
-from google.cloud import storage
-
 from .config import AppConfig
+from .gcp import load_storage_client
+from .metrics import REGISTRY, timed
+from .pipeline import bounded_map
+
+# Resumable upload chunks must be a multiple of 256 KiB.
+_CHUNK_ALIGNMENT = 256 * 1024
+_HASH_BLOCK_BYTES = 1024 * 1024
+
+INGEST_FILES = REGISTRY.counter(
+    "rag_ingest_files_total", "Documents handled by ingest, by status.", ("status",)
+)
+INGEST_BYTES = REGISTRY.counter("rag_ingest_bytes_total", "Document bytes uploaded by ingest.")
+
+
+@dataclass(frozen=True)
+class FileUpload:
+    """Outcome of ingesting one local file.
+
+    ``status`` is ``uploaded``, ``skipped`` (the blob already holds the same
+    content) or ``failed`` (see ``error``).
+    """
+
+    path: Path
+    uri: str
+    status: str
+    bytes_uploaded: int = 0
+    error: str = ""
 
 
 @dataclass(frozen=True)
 class IngestionResult:
     uploaded: list[str]
+    files: list[FileUpload] = field(default_factory=list)
+
+    @property
+    def skipped(self) -> list[str]:
+        return [upload.uri for upload in self.files if upload.status == "skipped"]
+
+    @property
+    def failed(self) -> list[FileUpload]:
+        return [upload for upload in self.files if upload.status == "failed"]
+
+    @property
+    def bytes_uploaded(self) -> int:
+        return sum(upload.bytes_uploaded for upload in self.files)
+
+
+def _md5_base64(path: Path) -> str:
+    digest = hashlib.md5()
+    with path.open("rb") as handle:
+        while block := handle.read(_HASH_BLOCK_BYTES):
+            digest.update(block)
+    return base64.b64encode(digest.digest()).decode("ascii")
+
+
+def _crc32c_base64(path: Path) -> str:
+    import google_crc32c
+
+    checksum = google_crc32c.Checksum()
+    with path.open("rb") as handle:
+        while block := handle.read(_HASH_BLOCK_BYTES):
+            checksum.update(block)
+    return base64.b64encode(checksum.digest()).decode("ascii")
+
+
+def _matches_blob(path: Path, size: int, blob) -> bool:
+    """Whether ``blob`` already holds ``path``'s content, going by GCS's own hashes."""
+    if blob is None or (blob.size is not None and blob.size != size):
+        return False
+    if blob.md5_hash:
+        return blob.md5_hash == _md5_base64(path)
+    # Composite objects only carry a CRC32C.
+    if getattr(blob, "crc32c", None):
+        return blob.crc32c == _crc32c_base64(path)
+    return False
+
+
+def _upload_chunk_bytes(config: AppConfig) -> int:
+    chunk = max(config.upload_chunk_mb, 1) * 1024 * 1024
+    return chunk - chunk % _CHUNK_ALIGNMENT
 
 
 def upload_documents(config: AppConfig, source_paths: Iterable[Path]) -> IngestionResult:
-    """Upload local documents to the configured GCS bucket."""
-    client = storage.Client(project=config.gcp_project_id)
+    """Upload local documents to the configured GCS bucket.
+
+    ``INGEST_WORKERS`` files are uploaded at a time. A file is skipped when the
+    blob of the same name already has its MD5 (or, for composite objects,
+    CRC32C). Files larger than ``UPLOAD_CHUNK_MB`` use a resumable upload in
+    chunks of that size, so a dropped connection only resends one chunk. A
+    failed file is reported in the result and does not stop the others.
+    """
+    client = load_storage_client(config)
     bucket = client.bucket(config.document_bucket)
+    chunk_bytes = _upload_chunk_bytes(config)
 
-    uploaded: list[str] = []
-    for path in source_paths:
-        blob = bucket.blob(path.name)
-        blob.upload_from_filename(path)
-        uploaded.append(f"gs://{config.document_bucket}/{path.name}")
+    def upload(path: Path) -> FileUpload:
+        path = Path(path)
+        uri = f"gs://{config.document_bucket}/{path.name}"
+        try:
+            size = path.stat().st_size
+            if _matches_blob(path, size, bucket.get_blob(path.name)):
+                return FileUpload(path=path, uri=uri, status="skipped")
+            blob = bucket.blob(path.name, chunk_size=chunk_bytes if size > chunk_bytes else None)
+            with timed("ingest_upload"):
+                blob.upload_from_filename(str(path))
+            return FileUpload(path=path, uri=uri, status="uploaded", bytes_uploaded=size)
+        except Exception as exc:  # noqa: BLE001 - reported per file
+            return FileUpload(path=path, uri=uri, status="failed", error=str(exc) or repr(exc))
 
-    return IngestionResult(uploaded=uploaded)
+    files = list(bounded_map(upload, source_paths, workers=config.ingest_workers))
+    for upload_result in files:
+        INGEST_FILES.inc(status=upload_result.status)
+        INGEST_BYTES.inc(upload_result.bytes_uploaded)
+    uploaded = [upload.uri for upload in files if upload.status == "uploaded"]
+    return IngestionResult(uploaded=uploaded, files=files)
@@ -0,0 +1,143 @@
+"""BM25 inverted index over index chunks for keyword and hybrid retrieval."""
+
+from __future__ import annotations
+
+import re
+from array import array
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable
+
+import numpy as np
+
+# Words, plus identifiers joined by - . _ : / (error codes, SKUs, versions).
+_TOKEN_PATTERN = re.compile(r"\w+(?:[-.:/]\w+)*")
+_BM25_K1 = 1.2
+_BM25_B = 0.75
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercase tokens of ``text``; compound identifiers also yield their parts."""
+    tokens = []
+    for match in _TOKEN_PATTERN.finditer(text.lower()):
+        token = match.group()
+        tokens.append(token)
+        if not token.isalnum():
+            tokens.extend(part for part in re.split(r"[-.:/_]", token) if part)
+    return tokens
+
+
+@dataclass(frozen=True)
+class BM25Index:
+    """Postings of every term, stored term by term in sorted ``terms`` order.
+
+    ``rows[offsets[i]:offsets[i + 1]]`` are the chunks containing ``terms[i]``
+    (ascending) and ``freqs`` their term counts. ``digest`` is the
+    :func:`~rag_chatbot.vectors.matrix_digest` of the index it was built with.
+    """
+
+    terms: np.ndarray
+    offsets: np.ndarray
+    rows: np.ndarray
+    freqs: np.ndarray
+    lengths: np.ndarray
+    digest: str
+
+    @staticmethod
+    def build(texts: Iterable[str], *, digest: str) -> "BM25Index":
+        vocabulary: dict[str, int] = {}
+        term_ids, rows, freqs = array("q"), array("q"), array("f")
+        lengths = array("f")
+        for row, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            lengths.append(sum(counts.values()))
+            for term, count in counts.items():
+                term_ids.append(vocabulary.setdefault(term, len(vocabulary)))
+                rows.append(row)
+                freqs.append(count)
+        terms = sorted(vocabulary)
+        rank = np.empty(len(terms), dtype=np.int64)
+        rank[[vocabulary[term] for term in terms]] = np.arange(len(terms))
+        sorted_ids = rank[np.frombuffer(term_ids, dtype=np.int64)]
+        # Stable, so each term's rows stay ascending.
+        order = np.argsort(sorted_ids, kind="stable")
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sorted_ids, minlength=len(terms)), out=offsets[1:])
+        row_dtype = np.int32 if len(lengths) < 2**31 else np.int64
+        return BM25Index(
+            terms=np.array(terms, dtype=str),
+            offsets=offsets,
+            rows=np.frombuffer(rows, dtype=np.int64)[order].astype(row_dtype),
+            freqs=np.frombuffer(freqs, dtype=np.float32)[order],
+            lengths=np.frombuffer(lengths, dtype=np.float32).copy(),
+            digest=digest,
+        )
+
+    def search(self, text: str, limit: int) -> tuple[np.ndarray, np.ndarray]:
+        """Return ``(rows, scores)`` of the ``limit`` best BM25 matches for ``text``.
+
+        Rows are best first with ties in row order; both are empty when no
+        query term occurs in the index.
+        """
+        count = self.lengths.shape[0]
+        terms = sorted(set(tokenize(text)))
+        positions = np.searchsorted(self.terms, terms) if terms else np.zeros(0, np.int64)
+        postings_rows, postings_scores = [], []
+        average_length = float(self.lengths.mean()) if count else 0.0
+        for term, position in zip(terms, positions):
+            if position >= self.terms.shape[0] or self.terms[position] != term:
+                continue
+            start, stop = self.offsets[position], self.offsets[position + 1]
+            rows = self.rows[start:stop]
+            freqs = self.freqs[start:stop]
+            frequency = stop - start
+            idf = np.log(1.0 + (count - frequency + 0.5) / (frequency + 0.5))
+            norm = _BM25_K1 * (1.0 - _BM25_B + _BM25_B * self.lengths[rows] / average_length)
+            postings_rows.append(rows)
+            postings_scores.append(idf * freqs * (_BM25_K1 + 1.0) / (freqs + norm))
+        if not postings_rows:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        rows, inverse = np.unique(np.concatenate(postings_rows), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(postings_scores))
+        best = np.lexsort((rows, -scores))[:limit]
+        return rows[best].astype(np.int64), scores[best].astype(np.float32)
+
+    def save(self, path: Path) -> None:
+        with path.open("wb") as handle:
+            np.savez(
+                handle,
+                terms=self.terms,
+                offsets=self.offsets,
+                rows=self.rows,
+                freqs=self.freqs,
+                lengths=self.lengths,
+                digest=np.array(self.digest),
+            )
+
+    @staticmethod
+    def load(path: Path) -> "BM25Index":
+        with np.load(path, allow_pickle=False) as data:
+            return BM25Index(
+                terms=data["terms"],
+                offsets=data["offsets"],
+                rows=data["rows"],
+                freqs=data["freqs"],
+                lengths=data["lengths"],
+                digest=str(data["digest"]),
+            )
+
+
+def reciprocal_rank_fusion(rankings: Iterable[np.ndarray], k: int) -> tuple[np.ndarray, np.ndarray]:
+    """Fuse best-first row rankings: each row scores ``sum(1 / (k + rank))``.
+
+    Returns ``(rows, scores)`` best first, ties in row order.
+    """
+    fused: dict[int, float] = {}
+    for ranking in rankings:
+        for rank, row in enumerate(ranking.tolist(), start=1):
+            fused[row] = fused.get(row, 0.0) + 1.0 / (k + rank)
+    rows = np.fromiter(fused.keys(), dtype=np.int64, count=len(fused))
+    scores = np.fromiter(fused.values(), dtype=np.float64, count=len(fused))
+    order = np.lexsort((rows, -scores))
+    return rows[order], scores[order].astype(np.float32)
@@ -0,0 +1,365 @@
+"""Lightweight Prometheus metrics and per-request stage timings.
+
+Metrics live in the process-wide :data:`REGISTRY` and are rendered in the
+Prometheus text format by :meth:`MetricsRegistry.render`. Recording a value is
+a dictionary update under a lock, so instrumentation can stay on in production.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterable, Iterator
+
+# Seconds; spans in-memory scoring (sub-millisecond) to Gemini generation.
+DEFAULT_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+Labels = tuple[str, ...]
+Sample = tuple[dict[str, str], float]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, label_names: Labels) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict[str, str]) -> Labels:
+        if labels.keys() != set(self.label_names):
+            raise ValueError(f"{self.name} takes labels {self.label_names}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """A monotonically increasing total per label set."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, label_names: Labels = ()) -> None:
+        super().__init__(name, help_text, label_names)
+        self._values: dict[Labels, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def lines(self) -> list[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+            for key, value in values
+        ]
+
+
+class Gauge(Counter):
+    """A value per label set that can go up and down."""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    """Observations counted into cumulative ``le`` buckets, with their sum and count."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        label_names: Labels = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, help_text, label_names)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket (+Inf last)..., sum]
+        self._values: dict[Labels, list[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        position = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            state[position] += 1
+            state[-1] += value
+
+    def count(self, **labels: str) -> int:
+        state = self._values.get(self._key(labels))
+        return int(sum(state[:-1])) if state else 0
+
+    def lines(self) -> list[str]:
+        with self._lock:
+            values = sorted((key, list(state)) for key, state in self._values.items())
+        lines = []
+        for key, state in values:
+            cumulative = 0.0
+            for bound, count in zip((*self.buckets, float("inf")), state[:-1]):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(self.label_names, key, le)} "
+                    f"{_format_value(cumulative)}"
+                )
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(state[-1])}")
+            lines.append(f"{self.name}_count{labels} {_format_value(cumulative)}")
+        return lines
+
+
+class _Collected(_Metric):
+    """Samples read from ``collect`` at scrape time, e.g. existing cache statistics."""
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        label_names: Labels,
+        kind: str,
+        collect: Callable[[], Iterable[Sample]],
+    ) -> None:
+        super().__init__(name, help_text, label_names)
+        self.kind = kind
+        self._collect = collect
+
+    def lines(self) -> list[str]:
+        return [
+            f"{self.name}{_format_labels(self.label_names, self._key(labels))} "
+            f"{_format_value(value)}"
+            for labels, value in self._collect()
+        ]
+
+
+class MetricsRegistry:
+    """Named metrics rendered together; registering a name again returns the existing metric."""
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric):
+                    raise ValueError(
+                        f"Metric {metric.name} is already registered as {existing.kind}"
+                    )
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help_text: str, label_names: Labels = ()) -> Counter:
+        return self._register(Counter(name, help_text, label_names))
+
+    def gauge(self, name: str, help_text: str, label_names: Labels = ()) -> Gauge:
+        return self._register(Gauge(name, help_text, label_names))
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        label_names: Labels = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, help_text, label_names, buckets))
+
+    def collector(
+        self,
+        name: str,
+        help_text: str,
+        label_names: Labels,
+        kind: str,
+        collect: Callable[[], Iterable[Sample]],
+    ) -> None:
+        """Register samples produced by ``collect`` on every render, replacing earlier ones."""
+        with self._lock:
+            self._metrics[name] = _Collected(name, help_text, label_names, kind, collect)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        lines = []
+        for metric in metrics:
+            samples = metric.lines()
+            if samples:
+                lines.extend(metric.header())
+                lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "rag_stage_duration_seconds",
+    "Time spent in each retrieval, generation and indexing stage.",
+    ("stage",),
+)
+VERTEX_REQUESTS = REGISTRY.counter(
+    "rag_vertex_requests_total", "Vertex AI calls by operation.", ("operation",)
+)
+VERTEX_ERRORS = REGISTRY.counter(
+    "rag_vertex_errors_total",
+    "Vertex AI calls that raised, by operation and exception type.",
+    ("operation", "error"),
+)
+VERTEX_SECONDS = REGISTRY.histogram(
+    "rag_vertex_request_duration_seconds", "Vertex AI call latency.", ("operation",)
+)
+HTTP_SECONDS = REGISTRY.histogram(
+    "rag_http_request_duration_seconds",
+    "HTTP request latency until the response is complete.",
+    ("method", "route", "status"),
+)
+
+_stage_timings: ContextVar[list[tuple[str, float]] | None] = ContextVar(
+    "rag_stage_timings", default=None
+)
+
+
+@contextmanager
+def timed(stage: str) -> Iterator[None]:
+    """Record how long the block takes as ``stage``.
+
+    The duration goes to ``rag_stage_duration_seconds`` and, inside
+    :func:`collect_timings`, to the current request's timings (threads started
+    with ``asyncio.to_thread`` share them).
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        timings = _stage_timings.get()
+        if timings is not None:
+            timings.append((stage, elapsed))
+
+
+@contextmanager
+def collect_timings() -> Iterator[list[tuple[str, float]]]:
+    """Collect ``(stage, seconds)`` pairs recorded by :func:`timed` within the block."""
+    timings: list[tuple[str, float]] = []
+    token = _stage_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _stage_timings.reset(token)
+
+
+@contextmanager
+def vertex_call(operation: str) -> Iterator[None]:
+    """Count a Vertex AI call and its failures, and time it."""
+    VERTEX_REQUESTS.inc(operation=operation)
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception as exc:
+        VERTEX_ERRORS.inc(operation=operation, error=type(exc).__name__)
+        raise
+    finally:
+        VERTEX_SECONDS.observe(time.perf_counter() - started, operation=operation)
+
+
+def server_timing(timings: Iterable[tuple[str, float]]) -> str:
+    """Format timings as a ``Server-Timing`` header value; repeated stages are summed."""
+    totals: dict[str, float] = {}
+    for stage, seconds in timings:
+        totals[stage] = totals.get(stage, 0.0) + seconds
+    return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in totals.items())
+
+
+class MetricsMiddleware:
+    """ASGI middleware that times HTTP requests and adds a ``Server-Timing`` header.
+
+    The header lists the stages recorded before the response started, so for a
+    streamed response it covers the work done before the first byte.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = "500"
+
+        with collect_timings() as timings:
+
+            async def send_with_timing(message) -> None:
+                nonlocal status
+                if message["type"] == "http.response.start":
+                    status = str(message["status"])
+                    header = server_timing(timings)
+                    if header:
+                        headers = list(message.get("headers", []))
+                        headers.append((b"server-timing", header.encode("latin-1")))
+                        message = {**message, "headers": headers}
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_timing)
+            finally:
+                route = scope.get("route")
+                HTTP_SECONDS.observe(
+                    time.perf_counter() - started,
+                    method=scope["method"],
+                    # Route templates keep the label set bounded; unmatched paths share one.
+                    route=getattr(route, "path", "unmatched"),
+                    status=status,
+                )
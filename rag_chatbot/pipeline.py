@@ -0,0 +1,39 @@
+"""Bounded, ordered worker-pool stages for building indexes."""
+
+from __future__ import annotations
+
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def bounded_map(
+    fn: Callable[[T], R],
+    items: Iterable[T],
+    *,
+    workers: int,
+    max_pending: int | None = None,
+) -> Iterator[R]:
+    """Apply ``fn`` to ``items`` on a thread pool, yielding results in input order.
+
+    At most ``max_pending`` (default ``2 * workers``) items are in flight, so a
+    slow consumer stalls the producer instead of letting results pile up.
+    Chaining several calls gives a pipeline whose stages overlap while memory
+    stays bounded. Closing the iterator early cancels the queued work.
+    """
+    workers = max(1, workers)
+    max_pending = max(1, max_pending or 2 * workers)
+    executor = ThreadPoolExecutor(max_workers=workers)
+    pending: deque[Future[R]] = deque()
+    try:
+        for item in items:
+            pending.append(executor.submit(fn, item))
+            if len(pending) >= max_pending:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
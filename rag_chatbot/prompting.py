@@ -0,0 +1,96 @@
+"""Token-budgeted prompt context with near-duplicate chunk removal."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, replace
+from typing import Iterable
+
+from .config import AppConfig
+from .embeddings import estimate_tokens
+from .metrics import timed
+from .retrieval import RetrievedChunk
+
+_SHINGLE_WORDS = 3
+
+
+@dataclass(frozen=True)
+class PromptContext:
+    """The chunks placed in a prompt, in rank order, and what was left out.
+
+    ``tokens`` and ``tokens_saved`` use the same conservative estimate as
+    embedding requests; ``tokens_saved`` counts the content of every dropped
+    (or truncated) chunk.
+    """
+
+    chunks: list[RetrievedChunk]
+    tokens: int
+    tokens_saved: int
+    duplicates: int
+    over_budget: int
+
+
+def shingles(text: str) -> set[int]:
+    """Hashes of the overlapping word triples in ``text`` (case-insensitive)."""
+    words = text.lower().split()
+    if len(words) <= _SHINGLE_WORDS:
+        return {hash(tuple(words))}
+    return {
+        hash(tuple(words[start : start + _SHINGLE_WORDS]))
+        for start in range(len(words) - _SHINGLE_WORDS + 1)
+    }
+
+
+def _jaccard(left: set[int], right: set[int]) -> float:
+    if not left or not right:
+        return 0.0
+    return len(left & right) / len(left | right)
+
+
+def assemble_context(config: AppConfig, chunks: Iterable[RetrievedChunk]) -> PromptContext:
+    """Pick the chunks for a prompt within ``PROMPT_TOKEN_BUDGET``.
+
+    Chunks are taken best first. A chunk whose word shingles overlap an
+    already chosen chunk by at least ``PROMPT_DUPLICATE_THRESHOLD`` (Jaccard)
+    is dropped, as is any chunk that no longer fits the budget. If even the
+    best chunk does not fit, it is truncated to the budget. A budget or
+    threshold of 0 disables that check. Assembling the result again returns
+    it unchanged.
+    """
+    with timed("assemble_context"):
+        return _assemble_context(config, chunks)
+
+
+def _assemble_context(config: AppConfig, chunks: Iterable[RetrievedChunk]) -> PromptContext:
+    budget = config.prompt_token_budget
+    threshold = config.prompt_duplicate_threshold
+    chosen: list[RetrievedChunk] = []
+    chosen_shingles: list[set[int]] = []
+    tokens = saved = duplicates = over_budget = 0
+    for chunk in chunks:
+        chunk_tokens = estimate_tokens(chunk.content)
+        chunk_shingles = shingles(chunk.content) if threshold > 0 else set()
+        if threshold > 0 and any(
+            _jaccard(chunk_shingles, other) >= threshold for other in chosen_shingles
+        ):
+            duplicates += 1
+            saved += chunk_tokens
+            continue
+        if budget > 0 and tokens + chunk_tokens > budget:
+            if chosen:
+                over_budget += 1
+                saved += chunk_tokens
+                continue
+            # estimate_tokens(text) <= budget for text of up to 3 * (budget - 1) characters.
+            chunk = replace(chunk, content=chunk.content[: 3 * max(budget - 1, 0)])
+            saved += chunk_tokens - estimate_tokens(chunk.content)
+            chunk_tokens = estimate_tokens(chunk.content)
+        chosen.append(chunk)
+        chosen_shingles.append(chunk_shingles)
+        tokens += chunk_tokens
+    return PromptContext(
+        chunks=chosen,
+        tokens=tokens,
+        tokens_saved=saved,
+        duplicates=duplicates,
+        over_budget=over_budget,
+    )
@@ -0,0 +1,237 @@
+"""Compact embedding codes (int8, product quantization or a short prefix) for coarse scoring."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+from .vectors import EMBEDDING_DTYPE, matrix_digest, normalize_rows, normalize_vector
+
+QUANTIZATION_MODES = ("none", "int8", "pq", "prefix")
+
+_SCORE_BLOCK_ROWS = 16384
+_PQ_CENTROIDS = 256
+
+
+def _blocks(rows: np.ndarray | None, count: int):
+    """Yield ``(start, row_selection)`` blocks covering ``rows`` (or every row)."""
+    total = count if rows is None else rows.shape[0]
+    for start in range(0, total, _SCORE_BLOCK_ROWS):
+        stop = min(start + _SCORE_BLOCK_ROWS, total)
+        yield start, slice(start, stop) if rows is None else rows[start:stop]
+
+
+@dataclass(frozen=True)
+class Int8Codes:
+    """Per-dimension symmetric int8 codes: ``row ≈ codes * scale`` (4x smaller than float32)."""
+
+    codes: np.ndarray
+    scale: np.ndarray
+    digest: str
+    mode = "int8"
+
+    @staticmethod
+    def build(matrix: np.ndarray, *, digest: str | None = None) -> "Int8Codes":
+        scale = np.zeros(matrix.shape[1], dtype=EMBEDDING_DTYPE)
+        for _, selection in _blocks(None, matrix.shape[0]):
+            np.maximum(scale, np.abs(matrix[selection]).max(axis=0), out=scale)
+        scale = np.where(scale > 0, scale / 127.0, 1.0).astype(EMBEDDING_DTYPE)
+        codes = np.empty(matrix.shape, dtype=np.int8)
+        for _, selection in _blocks(None, matrix.shape[0]):
+            codes[selection] = np.clip(np.rint(matrix[selection] / scale), -127, 127)
+        return Int8Codes(codes=codes, scale=scale, digest=digest or matrix_digest(matrix))
+
+    def scores(self, query: np.ndarray, rows: np.ndarray | None = None) -> np.ndarray:
+        """Approximate inner products of ``query`` with ``rows`` (default: every row)."""
+        scaled_query = query * self.scale
+        scores = np.empty(self.codes.shape[0] if rows is None else rows.shape[0], EMBEDDING_DTYPE)
+        for start, selection in _blocks(rows, self.codes.shape[0]):
+            block = self.codes[selection].astype(EMBEDDING_DTYPE)
+            scores[start : start + block.shape[0]] = block @ scaled_query
+        return scores
+
+    def arrays(self) -> dict[str, np.ndarray]:
+        return {"codes": self.codes, "scale": self.scale}
+
+
+def _kmeans(
+    points: np.ndarray, clusters: int, iterations: int, rng: np.random.Generator
+) -> np.ndarray:
+    centroids = points[rng.choice(points.shape[0], clusters, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = _nearest(points, centroids)
+        counts = np.bincount(assignments, minlength=clusters)
+        sums = np.stack(
+            [
+                np.bincount(assignments, weights=points[:, dim], minlength=clusters)
+                for dim in range(points.shape[1])
+            ],
+            axis=1,
+        )
+        empty = counts == 0
+        sums[empty] = points[rng.choice(points.shape[0], int(empty.sum()))]
+        counts[empty] = 1
+        centroids = (sums / counts[:, None]).astype(EMBEDDING_DTYPE)
+    return centroids
+
+
+def _nearest(points: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    # argmin ||p - c||^2 == argmin (||c||^2 - 2 p.c)
+    distances = (centroids * centroids).sum(axis=1) - 2.0 * (points @ centroids.T)
+    return np.argmin(distances, axis=1).astype(np.uint8)
+
+
+@dataclass(frozen=True)
+class PQCodes:
+    """Product quantization: each group of ``subvector_dims`` dimensions becomes one byte.
+
+    ``codebooks[j]`` holds the 256 centroids of subspace ``j``; a query is scored
+    by summing per-subspace lookup tables, so each row costs one byte per group.
+    """
+
+    codes: np.ndarray
+    codebooks: np.ndarray
+    digest: str
+    mode = "pq"
+
+    @staticmethod
+    def build(
+        matrix: np.ndarray,
+        *,
+        subvector_dims: int,
+        iterations: int = 10,
+        sample_size: int = 16384,
+        seed: int = 0,
+        digest: str | None = None,
+    ) -> "PQCodes":
+        count, dim = matrix.shape
+        if subvector_dims <= 0 or dim % subvector_dims:
+            raise ValueError(
+                f"PQ subvector size {subvector_dims} does not divide embedding size {dim}"
+            )
+        subspaces = dim // subvector_dims
+        clusters = min(_PQ_CENTROIDS, count)
+        rng = np.random.default_rng(seed)
+        sample_rows = np.sort(rng.choice(count, min(count, sample_size), replace=False))
+        sample = np.asarray(matrix[sample_rows], dtype=EMBEDDING_DTYPE)
+        sample = sample.reshape(-1, subspaces, subvector_dims)
+        codebooks = np.zeros((subspaces, _PQ_CENTROIDS, subvector_dims), dtype=EMBEDDING_DTYPE)
+        for subspace in range(subspaces):
+            codebooks[subspace, :clusters] = _kmeans(
+                sample[:, subspace], clusters, iterations, rng
+            )
+        codes = np.empty((count, subspaces), dtype=np.uint8)
+        for _, selection in _blocks(None, count):
+            block = np.asarray(matrix[selection]).reshape(-1, subspaces, subvector_dims)
+            for subspace in range(subspaces):
+                codes[selection, subspace] = _nearest(
+                    block[:, subspace], codebooks[subspace, :clusters]
+                )
+        return PQCodes(codes=codes, codebooks=codebooks, digest=digest or matrix_digest(matrix))
+
+    def scores(self, query: np.ndarray, rows: np.ndarray | None = None) -> np.ndarray:
+        """Approximate inner products of ``query`` with ``rows`` (default: every row)."""
+        subspaces, _, subvector_dims = self.codebooks.shape
+        tables = np.einsum(
+            "jkd,jd->jk", self.codebooks, query.reshape(subspaces, subvector_dims)
+        ).astype(EMBEDDING_DTYPE)
+        # Flattened lookup: row code c in subspace j reads tables[j * 256 + c].
+        flat_tables = tables.ravel()
+        base = np.arange(subspaces, dtype=np.intp) * _PQ_CENTROIDS
+        scores = np.empty(self.codes.shape[0] if rows is None else rows.shape[0], EMBEDDING_DTYPE)
+        for start, selection in _blocks(rows, self.codes.shape[0]):
+            block = self.codes[selection]
+            scores[start : start + block.shape[0]] = flat_tables[block + base].sum(axis=1)
+        return scores
+
+    def arrays(self) -> dict[str, np.ndarray]:
+        return {"codes": self.codes, "codebooks": self.codebooks}
+
+
+@dataclass(frozen=True)
+class PrefixCodes:
+    """The first ``dims`` dimensions of each row, renormalized to unit length.
+
+    Matryoshka-trained embeddings such as ``gemini-embedding-001`` keep most
+    of their ranking signal in a short prefix, so scoring the prefix reads only
+    ``dims / dim`` of the bytes of the full matrix.
+    """
+
+    codes: np.ndarray
+    digest: str
+    mode = "prefix"
+
+    @staticmethod
+    def build(matrix: np.ndarray, *, dims: int, digest: str | None = None) -> "PrefixCodes":
+        count, dim = matrix.shape
+        if not 0 < dims < dim:
+            raise ValueError(f"First-stage size {dims} must be below the embedding size {dim}")
+        codes = np.empty((count, dims), dtype=EMBEDDING_DTYPE)
+        for _, selection in _blocks(None, count):
+            codes[selection] = normalize_rows(matrix[selection, :dims])
+        return PrefixCodes(codes=codes, digest=digest or matrix_digest(matrix))
+
+    def scores(self, query: np.ndarray, rows: np.ndarray | None = None) -> np.ndarray:
+        """Cosine similarities of ``query``'s prefix with ``rows`` (default: every row)."""
+        prefix = normalize_vector(query[: self.codes.shape[1]])
+        scores = np.empty(self.codes.shape[0] if rows is None else rows.shape[0], EMBEDDING_DTYPE)
+        for start, selection in _blocks(rows, self.codes.shape[0]):
+            block = self.codes[selection]
+            scores[start : start + block.shape[0]] = block @ prefix
+        return scores
+
+    def arrays(self) -> dict[str, np.ndarray]:
+        return {"codes": self.codes}
+
+
+QuantizedCodes = Int8Codes | PQCodes | PrefixCodes
+
+
+def build_codes(
+    matrix: np.ndarray,
+    mode: str,
+    *,
+    pq_subvector_dims: int,
+    first_stage_dims: int = 0,
+    digest: str | None = None,
+) -> QuantizedCodes | None:
+    """Quantize ``matrix`` (unit rows) with ``mode``; ``"none"`` returns None.
+
+    ``digest`` is recorded in the codes (computed from ``matrix`` if omitted).
+    """
+    if mode == "none":
+        return None
+    if mode == "int8":
+        return Int8Codes.build(matrix, digest=digest)
+    if mode == "pq":
+        return PQCodes.build(matrix, subvector_dims=pq_subvector_dims, digest=digest)
+    if mode == "prefix":
+        return PrefixCodes.build(matrix, dims=first_stage_dims, digest=digest)
+    raise ValueError(f"Unknown quantization mode {mode!r}; expected one of {QUANTIZATION_MODES}")
+
+
+def save_codes(codes: QuantizedCodes, path: Path) -> None:
+    with path.open("wb") as handle:
+        np.savez(
+            handle,
+            mode=np.array(codes.mode),
+            digest=np.array(codes.digest),
+            **codes.arrays(),
+        )
+
+
+def load_codes(path: Path) -> QuantizedCodes:
+    with np.load(path, allow_pickle=False) as data:
+        mode = str(data["mode"])
+        digest = str(data["digest"])
+        if mode == "int8":
+            return Int8Codes(codes=data["codes"], scale=data["scale"], digest=digest)
+        if mode == "pq":
+            return PQCodes(
+                codes=data["codes"], codebooks=data["codebooks"], digest=digest
+            )
+        if mode == "prefix":
+            return PrefixCodes(codes=data["codes"], digest=digest)
+    raise ValueError(f"Unknown quantization mode {mode!r} in {path}")
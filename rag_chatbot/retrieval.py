@@ -2,13 +2,27 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass
-from math import sqrt
-from typing import Iterable
+import asyncio
+import heapq
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, replace
+from itertools import islice
+from typing import Any, Iterable, Sequence
 
+import numpy as np
+
+from .caching import TTLCache, normalize_query
+from .clients import ClientRegistry, get_clients, install_clients
 from .config import AppConfig
 from .embeddings import VertexEmbeddingClient
-from .indexing import load_vector_index
+from .indexing import LoadedIndex, ShardedIndex, VectorIndex, load_vector_index
+from .lexical import reciprocal_rank_fusion
+from .metrics import timed
+from .pipeline import bounded_map
+from .vectors import EMBEDDING_DTYPE, normalize_rows, normalize_vector, top_k_indices
 
 
 @dataclass(frozen=True)
@@ -18,33 +32,588 @@ class RetrievedChunk:
     score: float
 
 
-def _cosine_similarity(left: list[float], right: list[float]) -> float:
-    dot = sum(a * b for a, b in zip(left, right))
-    left_norm = sqrt(sum(a * a for a in left))
-    right_norm = sqrt(sum(b * b for b in right))
-    if left_norm == 0 or right_norm == 0:
-        return 0.0
-    return dot / (left_norm * right_norm)
+def _query_vector(index: VectorIndex, query_embedding: Sequence[float]) -> np.ndarray:
+    query = normalize_vector(query_embedding)
+    if index.matrix.shape[1] != query.shape[0]:
+        raise ValueError(
+            f"Query embedding has {query.shape[0]} dimensions, index has {index.matrix.shape[1]}"
+        )
+    return query
+
+
+def score_index(index: VectorIndex, query_embedding: Sequence[float]) -> np.ndarray:
+    """Return the cosine similarity of ``query_embedding`` to every index entry."""
+    return index.matrix @ _query_vector(index, query_embedding)
+
+
+RETRIEVAL_MODES = ("vector", "hybrid", "lexical_first", "lexical")
+
+
+def _vector_rows(
+    index: VectorIndex,
+    query: np.ndarray,
+    *,
+    top_k: int,
+    nprobe: int = 0,
+    shortlist_factor: int = 0,
+    rows: np.ndarray | None = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Return ``(rows, scores)`` of the best ``top_k`` rows, best first.
+
+    ``rows`` (ascending) restricts scoring to those rows in place of the IVF
+    candidates.
+    """
+    if rows is None and nprobe > 0 and index.ann is not None:
+        rows = index.ann.candidates(query, nprobe)
+    if shortlist_factor > 0 and index.codes is not None:
+        shortlist = top_k_indices(index.codes.scores(query, rows), top_k * shortlist_factor)
+        rows = shortlist if rows is None else rows[shortlist]
+        # Ascending rows keep ties in index order and read the matrix front to back.
+        rows.sort()
+    if rows is None:
+        scores = index.matrix @ query
+        positions = top_k_indices(scores, top_k)
+        return positions, scores[positions]
+    scores = index.matrix[rows] @ query
+    best = top_k_indices(scores, top_k)
+    return rows[best], scores[best]
+
+
+def _to_chunks(
+    index: VectorIndex, positions: np.ndarray, scores: np.ndarray
+) -> list[RetrievedChunk]:
+    results = []
+    for position, score in zip(positions, scores):
+        entry = index.entries[int(position)]
+        results.append(RetrievedChunk(uri=entry.uri, content=entry.content, score=float(score)))
+    return results
+
+
+def search_index(
+    index: LoadedIndex,
+    query_embedding: Sequence[float],
+    *,
+    top_k: int = 5,
+    nprobe: int = 0,
+    shortlist_factor: int = 0,
+) -> list[RetrievedChunk]:
+    """Return the ``top_k`` entries most similar to ``query_embedding``.
+
+    With ``nprobe > 0`` and an IVF index attached to ``index``, only the
+    ``nprobe`` closest inverted lists are considered. With ``shortlist_factor >
+    0`` and quantized codes attached, candidates are first scored over the
+    codes and only the best ``top_k * shortlist_factor`` are rescored against
+    the full-precision matrix. Reported scores are always full precision.
+    A :class:`ShardedIndex` is searched with :func:`search_shards`.
+    """
+    if isinstance(index, ShardedIndex):
+        config = replace(
+            index.config,
+            retrieval_mode="vector",
+            ann_nprobe=nprobe,
+            quantized_shortlist_factor=shortlist_factor,
+        )
+        return search_shards(config, index, query_embedding, "", top_k=top_k)
+    if not index.entries:
+        return []
+    query = _query_vector(index, query_embedding)
+    positions, scores = _vector_rows(
+        index, query, top_k=top_k, nprobe=nprobe, shortlist_factor=shortlist_factor
+    )
+    return _to_chunks(index, positions, scores)
+
+
+def _uses_lexical(config: AppConfig, index: LoadedIndex) -> bool:
+    return (
+        config.retrieval_mode != "vector"
+        and isinstance(index, VectorIndex)
+        and index.lexical is not None
+    )
+
+
+def lexical_search(
+    config: AppConfig, index: LoadedIndex, query_text: str
+) -> tuple[np.ndarray, np.ndarray] | None:
+    """Return the best ``LEXICAL_CANDIDATES`` BM25 ``(rows, scores)`` for ``query_text``.
+
+    Returns None when ``RETRIEVAL_MODE`` is ``vector`` or ``index`` has no
+    lexical index attached.
+    """
+    if not _uses_lexical(config, index):
+        return None
+    with timed("lexical_search"):
+        return index.lexical.search(query_text, config.lexical_candidates)
+
+
+def needs_query_embedding(config: AppConfig) -> bool:
+    """Whether ``RETRIEVAL_MODE`` scores vectors (every mode but ``lexical``)."""
+    return config.retrieval_mode != "lexical"
+
+
+def search_chunks(
+    config: AppConfig,
+    index: LoadedIndex,
+    query_embedding: Sequence[float] | None,
+    query_text: str,
+    *,
+    top_k: int = 5,
+    lexical_hits: tuple[np.ndarray, np.ndarray] | None = None,
+) -> list[RetrievedChunk]:
+    """Search ``index`` for a query the way ``RETRIEVAL_MODE`` asks.
+
+    ``vector`` ranks by cosine similarity (see :func:`search_index`).
+    ``hybrid`` fuses the vector and BM25 rankings (each ``LEXICAL_CANDIDATES``
+    deep) with reciprocal rank fusion and reports the fused score.
+    ``lexical_first`` scores vectors only for the BM25 candidates, falling back
+    to a vector search when no query term matches. ``lexical`` ranks by BM25
+    alone and needs no ``query_embedding``. Modes other than ``lexical`` fall
+    back to vector search when the index has no BM25 sidecar. Pass
+    ``lexical_hits`` from :func:`lexical_search` to reuse BM25 results
+    computed while the query embedding was in flight.
+    """
+    with timed("search"):
+        return _search_chunks(config, index, query_embedding, query_text, top_k, lexical_hits)
+
+
+def _search_chunks(
+    config: AppConfig,
+    index: LoadedIndex,
+    query_embedding: Sequence[float] | None,
+    query_text: str,
+    top_k: int,
+    lexical_hits: tuple[np.ndarray, np.ndarray] | None,
+) -> list[RetrievedChunk]:
+    mode = config.retrieval_mode
+    if mode not in RETRIEVAL_MODES:
+        raise ValueError(f"Unknown RETRIEVAL_MODE {mode!r}; expected one of {RETRIEVAL_MODES}")
+    if isinstance(index, ShardedIndex):
+        return search_shards(config, index, query_embedding, query_text, top_k=top_k)
+    if not index.entries:
+        return []
+    if mode == "lexical":
+        if index.lexical is None:
+            raise ValueError("RETRIEVAL_MODE=lexical needs an index built with LEXICAL_INDEX=1")
+        rows, scores = index.lexical.search(query_text, top_k)
+        return _to_chunks(index, rows, scores)
+    query = _query_vector(index, query_embedding)
+    vector_options = {
+        "nprobe": config.ann_nprobe,
+        "shortlist_factor": config.quantized_shortlist_factor,
+    }
+    if lexical_hits is None:
+        lexical_hits = lexical_search(config, index, query_text)
+    if lexical_hits is None:
+        positions, scores = _vector_rows(index, query, top_k=top_k, **vector_options)
+    elif mode == "lexical_first":
+        lexical_rows = np.sort(lexical_hits[0])
+        if lexical_rows.size:
+            positions, scores = _vector_rows(index, query, top_k=top_k, rows=lexical_rows)
+        else:
+            positions, scores = _vector_rows(index, query, top_k=top_k, **vector_options)
+    else:
+        depth = max(top_k, config.lexical_candidates)
+        vector_rows, _ = _vector_rows(index, query, top_k=depth, **vector_options)
+        positions, scores = reciprocal_rank_fusion((vector_rows, lexical_hits[0]), config.rrf_k)
+        positions, scores = positions[:top_k], scores[:top_k]
+    return _to_chunks(index, positions, scores)
+
+
+# Scores one batched matrix product may produce (index rows x queries x 4 bytes).
+_BATCH_SCORE_BYTES = 64 * 1024 * 1024
+
+
+def _scores_whole_matrix(config: AppConfig, index: VectorIndex) -> bool:
+    """Whether :func:`search_chunks` would score every row of ``index`` at full precision."""
+    return (
+        config.retrieval_mode != "lexical"
+        and not _uses_lexical(config, index)
+        and not (config.ann_nprobe > 0 and index.ann is not None)
+        and not (config.quantized_shortlist_factor > 0 and index.codes is not None)
+    )
+
+
+def _batch_vector_rows(
+    index: VectorIndex, queries: np.ndarray, top_k: int
+) -> Iterable[tuple[np.ndarray, np.ndarray]]:
+    """Yield the best ``top_k`` ``(rows, scores)`` of each query (unit rows of ``queries``).
+
+    Queries are scored in blocks with one matrix-matrix product each, so the
+    index matrix is read once per block rather than once per query.
+    """
+    step = max(1, _BATCH_SCORE_BYTES // (4 * index.matrix.shape[0]))
+    for start in range(0, queries.shape[0], step):
+        scores = queries[start : start + step] @ index.matrix.T
+        for query_scores in scores:
+            positions = top_k_indices(query_scores, top_k)
+            yield positions, query_scores[positions]
+
+
+def search_chunks_batch(
+    config: AppConfig,
+    index: LoadedIndex,
+    query_embeddings: Sequence[Sequence[float]] | np.ndarray | None,
+    query_texts: Sequence[str],
+    *,
+    top_k: int = 5,
+) -> list[list[RetrievedChunk]]:
+    """Like :func:`search_chunks` for many queries at once; results are in query order.
+
+    When every row would be scored at full precision anyway (``vector`` mode
+    with no IVF probe or quantized shortlist in use), all queries are scored
+    with matrix-matrix products. Other modes search the queries one by one.
+    ``query_embeddings`` may be None in ``lexical`` mode.
+    """
+    mode = config.retrieval_mode
+    if mode not in RETRIEVAL_MODES:
+        raise ValueError(f"Unknown RETRIEVAL_MODE {mode!r}; expected one of {RETRIEVAL_MODES}")
+    if isinstance(index, ShardedIndex):
+        return search_shards_batch(config, index, query_embeddings, query_texts, top_k=top_k)
+    if not index.entries:
+        return [[] for _ in query_texts]
+    if len(query_texts) > 1 and _scores_whole_matrix(config, index):
+        with timed("search"):
+            queries = normalize_rows(np.asarray(query_embeddings, dtype=EMBEDDING_DTYPE))
+            if index.matrix.shape[1] != queries.shape[1]:
+                raise ValueError(
+                    f"Query embeddings have {queries.shape[1]} dimensions, "
+                    f"index has {index.matrix.shape[1]}"
+                )
+            return [
+                _to_chunks(index, positions, scores)
+                for positions, scores in _batch_vector_rows(index, queries, top_k)
+            ]
+    if query_embeddings is None:
+        query_embeddings = [None] * len(query_texts)
+    return [
+        search_chunks(config, index, embedding, text, top_k=top_k)
+        for embedding, text in zip(query_embeddings, query_texts)
+    ]
+
+
+_shard_workers: list[ProcessPoolExecutor] = []
+_shard_workers_lock = threading.Lock()
+# Storage client override the current shard workers were started with.
+_shard_workers_storage: Any = None
+
+# Shards opened by this process when it runs as a shard search worker.
+_worker_build: str | None = None
+_worker_shards: dict[str, VectorIndex] = {}
+
+
+def _search_shard(
+    config: AppConfig,
+    build: str,
+    location: str,
+    queries: np.ndarray | None,
+    query_texts: Sequence[str],
+    top_k: int,
+) -> list[list[RetrievedChunk]]:
+    """Search one shard in a worker process, keeping the current build's shards open."""
+    global _worker_build
+    if build != _worker_build:
+        _worker_shards.clear()
+        _worker_build = build
+    shard = _worker_shards.get(location)
+    if shard is None:
+        shard = _worker_shards[location] = load_vector_index(config, location)
+    return search_chunks_batch(config, shard, queries, query_texts, top_k=top_k)
+
+
+def _init_shard_worker(storage_client: Any) -> None:
+    """Install the parent's storage client override, e.g. the benchmark's local stand-in."""
+    if storage_client is not None:
+        install_clients(ClientRegistry(storage_client=storage_client))
+
+
+def _get_shard_workers(count: int) -> list[ProcessPoolExecutor]:
+    global _shard_workers_storage
+    # Spawned workers start with the default registry, so a storage override
+    # installed with use_clients() is handed to them when they start.
+    storage = get_clients().storage_override
+    with _shard_workers_lock:
+        if len(_shard_workers) != count or _shard_workers_storage is not storage:
+            for worker in _shard_workers:
+                worker.shutdown(wait=False, cancel_futures=True)
+            # Spawned workers do not inherit the threads and sockets of a running server.
+            context = multiprocessing.get_context("spawn")
+            _shard_workers[:] = [
+                ProcessPoolExecutor(
+                    max_workers=1,
+                    mp_context=context,
+                    initializer=_init_shard_worker,
+                    initargs=(storage,),
+                )
+                for _ in range(count)
+            ]
+            _shard_workers_storage = storage
+        return list(_shard_workers)
+
+
+def shutdown_shard_workers() -> None:
+    """Stop the shard search processes; the next sharded search starts new ones."""
+    with _shard_workers_lock:
+        for worker in _shard_workers:
+            worker.shutdown(wait=True, cancel_futures=True)
+        _shard_workers.clear()
+
+
+def search_shards(
+    config: AppConfig,
+    index: ShardedIndex,
+    query_embedding: Sequence[float] | None,
+    query_text: str,
+    *,
+    top_k: int = 5,
+) -> list[RetrievedChunk]:
+    """Search every shard of ``index`` in parallel and merge their top-k with a heap.
+
+    Each shard is searched with :func:`search_chunks`. Shards run on
+    ``SEARCH_PROCESSES`` worker processes (default one per shard, up to the CPU
+    count). Shard ``i`` always goes to worker ``i % processes``, so each
+    process only opens its own shards; with a single process the shards are
+    searched here instead. BM25 statistics and hybrid fusion are per shard.
+    """
+    query_embeddings = None if query_embedding is None else [query_embedding]
+    return search_shards_batch(config, index, query_embeddings, [query_text], top_k=top_k)[0]
+
+
+def search_shards_batch(
+    config: AppConfig,
+    index: ShardedIndex,
+    query_embeddings: Sequence[Sequence[float]] | np.ndarray | None,
+    query_texts: Sequence[str],
+    *,
+    top_k: int = 5,
+) -> list[list[RetrievedChunk]]:
+    """Like :func:`search_shards` for many queries; each shard gets the whole batch at once."""
+    shards = len(index.locations)
+    queries = None
+    if query_embeddings is not None:
+        queries = np.asarray(query_embeddings, dtype=EMBEDDING_DTYPE)
+    processes = config.search_processes or min(shards, os.cpu_count() or 1)
+    if processes <= 1:
+        results = [
+            search_chunks_batch(config, index.shard(position), queries, query_texts, top_k=top_k)
+            for position in range(shards)
+        ]
+    else:
+        workers = _get_shard_workers(processes)
+        futures = [
+            workers[position % processes].submit(
+                _search_shard, config, index.build, location, queries, query_texts, top_k
+            )
+            for position, location in enumerate(index.locations)
+        ]
+        results = [future.result() for future in futures]
+    # Each shard's results are sorted best first; ties keep shard order.
+    return [
+        list(
+            islice(
+                heapq.merge(*(shard[query] for shard in results), key=lambda chunk: -chunk.score),
+                top_k,
+            )
+        )
+        for query in range(len(query_texts))
+    ]
 
 
 def retrieve_context(
-    config: AppConfig, query: str, *, top_k: int = 5
+    config: AppConfig,
+    query: str,
+    *,
+    top_k: int = 5,
+    index: LoadedIndex | None = None,
 ) -> Iterable[RetrievedChunk]:
-    """Retrieve top-k chunks from the local JSONL vector index."""
-    index = load_vector_index(config, config.vector_index_path)
+    """Retrieve top-k chunks from ``index`` (loaded from the configured path if omitted)."""
+    if index is None:
+        index = load_vector_index(config, config.vector_index_path)
+    if not index.entries:
+        return []
+
+    query_embedding = None
+    if needs_query_embedding(config):
+        client = get_clients().embedding_client(config)
+        with timed("embed_query"):
+            query_embedding = client.embed_texts([query])[0]
+    return search_chunks(config, index, query_embedding, query, top_k=top_k)
+
+
+async def embed_query_async(
+    config: AppConfig,
+    query: str,
+    *,
+    cache: TTLCache[str, list[float]] | None = None,
+    client: VertexEmbeddingClient | None = None,
+) -> list[float]:
+    """Embed a query, reusing a cached embedding for the same normalized text.
+
+    Concurrent calls are micro-batched into shared embedding requests (see
+    :meth:`~rag_chatbot.embeddings.VertexEmbeddingClient.embed_query_async`).
+    Without ``client``, the process-wide one from
+    :func:`~rag_chatbot.clients.get_clients` is used.
+    """
+    key = normalize_query(query)
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+    if client is None:
+        client = get_clients().embedding_client(config)
+    with timed("embed_query"):
+        embedding = await client.embed_query_async(query)
+    if cache is not None:
+        cache.put(key, embedding)
+    return embedding
+
+
+async def retrieve_context_async(
+    config: AppConfig,
+    query: str,
+    *,
+    top_k: int = 5,
+    index: LoadedIndex | None = None,
+    query_embedding: Sequence[float] | None = None,
+    embedding_cache: TTLCache[str, list[float]] | None = None,
+    embedding_client: VertexEmbeddingClient | None = None,
+) -> list[RetrievedChunk]:
+    """Async variant of :func:`retrieve_context`.
+
+    The query embedding is awaited (or taken from ``query_embedding`` /
+    ``embedding_cache``); loading the index and scoring it run on worker
+    threads so the event loop stays free for other requests.
+    """
+    if index is None:
+        index = await asyncio.to_thread(load_vector_index, config, config.vector_index_path)
     if not index.entries:
         return []
 
-    client = VertexEmbeddingClient(config)
-    query_embedding = client.embed_texts([query])[0]
+    lexical_hits = None
+    if _uses_lexical(config, index):
+        # BM25 scoring runs while the embedding request is in flight.
+        lexical_task = asyncio.create_task(asyncio.to_thread(lexical_search, config, index, query))
+        if query_embedding is None and needs_query_embedding(config):
+            try:
+                query_embedding = await embed_query_async(
+                    config, query, cache=embedding_cache, client=embedding_client
+                )
+            except BaseException:
+                lexical_task.cancel()
+                raise
+        lexical_hits = await lexical_task
+    elif query_embedding is None and needs_query_embedding(config):
+        query_embedding = await embed_query_async(
+            config, query, cache=embedding_cache, client=embedding_client
+        )
+    return await asyncio.to_thread(
+        search_chunks,
+        config,
+        index,
+        query_embedding,
+        query,
+        top_k=top_k,
+        lexical_hits=lexical_hits,
+    )
+
+
+def retrieve_context_batch(
+    config: AppConfig,
+    queries: Sequence[str],
+    *,
+    top_k: int = 5,
+    index: LoadedIndex | None = None,
+) -> list[list[RetrievedChunk]]:
+    """Retrieve top-k chunks for every query, in query order.
+
+    Distinct queries are embedded in request-sized batches with up to
+    ``BATCH_CONCURRENCY`` requests in flight, then searched together with
+    :func:`search_chunks_batch`.
+    """
+    if index is None:
+        index = load_vector_index(config, config.vector_index_path)
+    if not index.entries:
+        return [[] for _ in queries]
 
-    scored = [
-        RetrievedChunk(
-            uri=entry.uri,
-            content=entry.content,
-            score=_cosine_similarity(query_embedding, entry.embedding),
+    query_embeddings = None
+    if needs_query_embedding(config):
+        client = get_clients().embedding_client(config)
+        texts = list(dict.fromkeys(queries))
+        with timed("embed_query"):
+            batches = bounded_map(
+                client.embed_texts, client.batches(texts), workers=config.batch_concurrency
+            )
+            vectors = dict(zip(texts, (vector for batch in batches for vector in batch)))
+        query_embeddings = [vectors[query] for query in queries]
+    return search_chunks_batch(config, index, query_embeddings, queries, top_k=top_k)
+
+
+async def embed_queries_async(
+    config: AppConfig,
+    queries: Sequence[str],
+    *,
+    cache: TTLCache[str, list[float]] | None = None,
+    client: VertexEmbeddingClient | None = None,
+) -> list[list[float]]:
+    """Embed many queries like :func:`embed_query_async`, in query order.
+
+    Each distinct normalized query is embedded once. Queries missing from
+    ``cache`` are sent in request-sized batches with up to
+    ``BATCH_CONCURRENCY`` requests in flight.
+    """
+    keys = [normalize_query(query) for query in queries]
+    embeddings: dict[str, list[float]] = {}
+    if cache is not None:
+        for key in dict.fromkeys(keys):
+            cached = cache.get(key)
+            if cached is not None:
+                embeddings[key] = cached
+    missing: dict[str, str] = {}
+    for key, query in zip(keys, queries):
+        if key not in embeddings:
+            missing.setdefault(key, query)
+    if missing:
+        if client is None:
+            client = get_clients().embedding_client(config)
+        semaphore = asyncio.Semaphore(max(1, config.batch_concurrency))
+
+        async def embed(batch: list[str]) -> list[list[float]]:
+            async with semaphore:
+                return await client.embed_texts_async([missing[key] for key in batch])
+
+        batches = list(client.batches(missing, text_of=missing.__getitem__))
+        with timed("embed_query"):
+            results = await asyncio.gather(*(embed(batch) for batch in batches))
+        for batch, vectors in zip(batches, results):
+            for key, vector in zip(batch, vectors):
+                embeddings[key] = vector
+                if cache is not None:
+                    cache.put(key, vector)
+    return [embeddings[key] for key in keys]
+
+
+async def retrieve_context_batch_async(
+    config: AppConfig,
+    queries: Sequence[str],
+    *,
+    top_k: int = 5,
+    index: LoadedIndex | None = None,
+    query_embeddings: Sequence[Sequence[float]] | None = None,
+    embedding_cache: TTLCache[str, list[float]] | None = None,
+    embedding_client: VertexEmbeddingClient | None = None,
+) -> list[list[RetrievedChunk]]:
+    """Async variant of :func:`retrieve_context_batch`.
+
+    Embeddings are awaited with :func:`embed_queries_async` (or taken from
+    ``query_embeddings``); loading and searching the index run on worker
+    threads.
+    """
+    if index is None:
+        index = await asyncio.to_thread(load_vector_index, config, config.vector_index_path)
+    if not index.entries:
+        return [[] for _ in queries]
+    if query_embeddings is None and needs_query_embedding(config):
+        query_embeddings = await embed_queries_async(
+            config, queries, cache=embedding_cache, client=embedding_client
         )
-        for entry in index.entries
-    ]
-    scored.sort(key=lambda item: item.score, reverse=True)
-    return scored[:top_k]
+    return await asyncio.to_thread(
+        search_chunks_batch, config, index, query_embeddings, queries, top_k=top_k
+    )
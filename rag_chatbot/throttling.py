@@ -0,0 +1,169 @@
+"""Adaptive concurrency, rate budgets and retries for Vertex AI calls."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import threading
+import time
+from typing import Awaitable, Callable, TypeVar
+
+R = TypeVar("R")
+
+logger = logging.getLogger(__name__)
+
+# HTTP statuses that mean "slow down": quota exhausted or the service overloaded.
+THROTTLE_STATUSES = frozenset({429, 503})
+# Statuses worth retrying: throttling plus transient server errors and timeouts.
+RETRY_STATUSES = THROTTLE_STATUSES | {500, 502, 504}
+_MAX_BACKOFF_SECONDS = 60.0
+# How often a waiting async caller re-checks for a free slot.
+_POLL_SECONDS = 0.05
+
+
+def error_status(exc: BaseException) -> int | None:
+    """The HTTP status of a Google API error (``GoogleAPICallError.code``), if any."""
+    code = getattr(exc, "code", None)
+    return int(code) if isinstance(code, int) else None
+
+
+class AdaptiveController:
+    """Bound, pace and retry the calls to one Vertex AI model.
+
+    In-flight calls are capped by an AIMD limit. Each success raises it by
+    ``1 / limit`` (about one per round of calls) up to ``max_concurrency``; a
+    throttled call (HTTP 429 or 503) halves it, at most once per round, since
+    calls started before the last cut do not cut it again. With
+    ``requests_per_minute`` set, call starts are spaced evenly to stay within
+    that budget. Throttled calls, other transient server errors (500, 502, 504)
+    and connection errors are retried up to ``max_retries`` times after a
+    full-jitter exponential backoff starting at ``backoff_seconds``.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        max_concurrency: int,
+        requests_per_minute: float = 0,
+        max_retries: int = 5,
+        backoff_seconds: float = 1.0,
+    ) -> None:
+        self.name = name
+        self.max_concurrency = max(1, max_concurrency)
+        self.requests_per_minute = max(0.0, requests_per_minute)
+        self.max_retries = max(0, max_retries)
+        self.backoff_seconds = max(0.0, backoff_seconds)
+        self._condition = threading.Condition()
+        self._limit = float(self.max_concurrency)
+        self._in_flight = 0
+        self._next_start = 0.0
+        self._last_cut = 0.0
+        self.throttles = 0
+        self.retries = 0
+
+    @property
+    def limit(self) -> int:
+        """The number of calls currently allowed in flight."""
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def stats(self) -> dict[str, float]:
+        with self._condition:
+            return {
+                "limit": self.limit,
+                "in_flight": self._in_flight,
+                "throttles": self.throttles,
+                "retries": self.retries,
+            }
+
+    def _try_acquire(self) -> float:
+        """Take a slot and return 0.0, or return how long to wait before trying again."""
+        with self._condition:
+            if self._in_flight >= self.limit:
+                return _POLL_SECONDS
+            if self.requests_per_minute:
+                now = time.monotonic()
+                if now < self._next_start:
+                    return self._next_start - now
+                self._next_start = max(self._next_start, now) + 60.0 / self.requests_per_minute
+            self._in_flight += 1
+            return 0.0
+
+    def _acquire(self) -> float:
+        with self._condition:
+            while delay := self._try_acquire():
+                self._condition.wait(delay)
+        return time.monotonic()
+
+    async def _acquire_async(self) -> float:
+        while delay := self._try_acquire():
+            await asyncio.sleep(delay)
+        return time.monotonic()
+
+    def _release(self, started: float, exc: BaseException | None) -> bool:
+        """Free the slot of a call started at ``started``; return whether to retry it."""
+        status = None if exc is None else error_status(exc)
+        with self._condition:
+            self._in_flight -= 1
+            if exc is None:
+                self._limit = min(float(self.max_concurrency), self._limit + 1.0 / self._limit)
+            elif status in THROTTLE_STATUSES:
+                self.throttles += 1
+                if started >= self._last_cut:
+                    self._limit = max(1.0, self._limit / 2)
+                    self._last_cut = time.monotonic()
+            self._condition.notify_all()
+        return status in RETRY_STATUSES or isinstance(exc, ConnectionError)
+
+    def _retry_delay(self, attempt: int, exc: BaseException) -> float:
+        with self._condition:
+            self.retries += 1
+        delay = random.uniform(0, min(_MAX_BACKOFF_SECONDS, self.backoff_seconds * 2**attempt))
+        logger.warning(
+            "Vertex call to %s failed (%s); retry %d/%d in %.1fs",
+            self.name,
+            type(exc).__name__,
+            attempt + 1,
+            self.max_retries,
+            delay,
+        )
+        return delay
+
+    def call(self, request: Callable[[], R]) -> R:
+        """Run ``request`` within the limits, retrying throttled and transient failures."""
+        attempt = 0
+        while True:
+            started = self._acquire()
+            try:
+                result = request()
+            except BaseException as exc:
+                retryable = self._release(started, exc)
+                if not retryable or attempt >= self.max_retries or not isinstance(exc, Exception):
+                    raise
+                time.sleep(self._retry_delay(attempt, exc))
+                attempt += 1
+                continue
+            self._release(started, None)
+            return result
+
+    async def call_async(self, request: Callable[[], Awaitable[R]]) -> R:
+        """Async variant of :meth:`call`; ``request`` returns a new awaitable per attempt."""
+        attempt = 0
+        while True:
+            started = await self._acquire_async()
+            try:
+                result = await request()
+            except BaseException as exc:
+                retryable = self._release(started, exc)
+                if not retryable or attempt >= self.max_retries or not isinstance(exc, Exception):
+                    raise
+                await asyncio.sleep(self._retry_delay(attempt, exc))
+                attempt += 1
+                continue
+            self._release(started, None)
+            return result
@@ -0,0 +1,61 @@
+"""Vector math helpers shared by indexing and retrieval."""
+
+from __future__ import annotations
+
+import hashlib
+from typing import Sequence
+
+import numpy as np
+
+EMBEDDING_DTYPE = np.float32
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """Return a contiguous float32 copy of ``matrix`` with unit-length rows.
+
+    Rows with zero norm are left as zeros so they score 0.0 against any query,
+    matching the behaviour of a cosine similarity with a zero vector.
+    """
+    matrix = np.array(matrix, dtype=EMBEDDING_DTYPE, order="C", ndmin=2, copy=True)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+
+def normalize_vector(vector: Sequence[float] | np.ndarray) -> np.ndarray:
+    """Return ``vector`` as a unit-length float32 array (zeros stay zeros)."""
+    return normalize_rows(np.asarray(vector, dtype=EMBEDDING_DTYPE).reshape(1, -1))[0]
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Return the indices of the ``k`` highest scores, best first.
+
+    Only the winners are fully sorted; ties keep their original order so the
+    result matches a stable descending sort over all scores.
+    """
+    count = scores.shape[0]
+    if k <= 0 or count == 0:
+        return np.empty(0, dtype=np.intp)
+    if k < count:
+        candidates = np.argpartition(-scores, k - 1)[:k]
+        # argpartition picks arbitrarily among ties at the boundary; widen the
+        # candidate set to every index scoring at least the k-th best score.
+        threshold = scores[candidates].min()
+        candidates = np.flatnonzero(scores >= threshold)
+    else:
+        candidates = np.arange(count)
+    order = np.lexsort((candidates, -scores[candidates]))
+    return candidates[order][:k]
+
+
+def matrix_digest(matrix: np.ndarray, *, block_rows: int = 16384) -> str:
+    """Return a SHA-256 content digest of ``matrix`` (row width plus little-endian float32 rows).
+
+    Sidecar files record the digest of the matrix they were built from, so a
+    sidecar left over from another build is never paired with the wrong index.
+    """
+    digest = hashlib.sha256(f"{matrix.shape[1]}:".encode("ascii"))
+    for start in range(0, matrix.shape[0], block_rows):
+        block = np.ascontiguousarray(matrix[start : start + block_rows], dtype="<f4")
+        digest.update(block.tobytes())
+    return digest.hexdigest()
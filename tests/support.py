@@ -0,0 +1,24 @@
+"""Shared helpers for the test suite."""
+
+from types import SimpleNamespace
+
+from rag_chatbot.config import AppConfig
+
+
+def make_config(**overrides) -> AppConfig:
+    """Return an ``AppConfig`` with test defaults, overridden by keyword arguments."""
+    settings = {
+        "gcp_project_id": "project",
+        "gcp_region": "us-central1",
+        "embedding_model": "gemini-embedding-001",
+        "chat_model": "gemini-1.5-pro",
+        "document_bucket": "bucket",
+        "vector_index_path": "index.jsonl",
+    }
+    settings.update(overrides)
+    return AppConfig(**settings)
+
+
+def fake_embeddings(texts):
+    """Stand-in for ``TextEmbeddingModel.get_embeddings``: ``[len(text), 1.0]`` per text."""
+    return [SimpleNamespace(values=[float(len(text)), 1.0]) for text in texts]
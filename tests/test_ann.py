@@ -0,0 +1,177 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import numpy as np
+from support import make_config
+
+from rag_chatbot import indexing as indexing_module
+from rag_chatbot.ann import IVFIndex, _train_centroids, recall_report
+from rag_chatbot.indexing import (
+    IndexEntry,
+    VectorIndex,
+    ann_path,
+    codes_path,
+    load_vector_index,
+    write_vector_index,
+)
+from rag_chatbot.retrieval import search_index
+from rag_chatbot.vectors import matrix_digest, normalize_rows, top_k_indices
+
+
+def _clustered_matrix(rows: int, dim: int, clusters: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    labels = rng.integers(clusters, size=rows)
+    return normalize_rows(centers[labels] + rng.normal(scale=0.3, size=(rows, dim)))
+
+
+class IVFIndexTests(unittest.TestCase):
+    def test_probing_every_list_matches_exact_search(self) -> None:
+        matrix = _clustered_matrix(500, 16, 8)
+        ann = IVFIndex.build(matrix, lists=10)
+        query = matrix[7]
+
+        rows, scores = ann.search(matrix, query, top_k=5, nprobe=ann.lists)
+
+        expected = top_k_indices(matrix @ query, 5)
+        self.assertEqual(rows.tolist(), expected.tolist())
+        np.testing.assert_allclose(scores, (matrix @ query)[expected], rtol=1e-6)
+
+    def test_recall_grows_with_nprobe(self) -> None:
+        matrix = _clustered_matrix(2000, 32, 16)
+        ann = IVFIndex.build(matrix, lists=32)
+        queries = matrix[:50]
+
+        report = recall_report(matrix, ann, queries, top_k=10, nprobes=[1, 8, 32])
+
+        recalls = [row["recall"] for row in report]
+        self.assertEqual(recalls[0], 1.0)
+        self.assertLessEqual(recalls[1], recalls[2])
+        self.assertEqual(recalls[3], 1.0)
+        self.assertGreater(recalls[2], 0.8)
+
+    def test_centroids_sum_every_row_when_trailing_lists_are_empty(self) -> None:
+        sample = normalize_rows(
+            np.array(
+                [[1.0, 0.0, 0.0], [0.0, 0.0, 1.0], [0.8, 0.6, 0.0], [0.7, 0.7, 0.0]],
+                dtype=np.float32,
+            )
+        )
+
+        class SeededChoice:
+            """Seed lists 1 and 2 with the same row, so list 2 gets no rows."""
+
+            def __init__(self) -> None:
+                self.picks = [np.array([0, 2, 2]), np.array([1])]
+
+            def choice(self, *args, **kwargs) -> np.ndarray:
+                return self.picks.pop(0)
+
+        centroids = _train_centroids(sample, 3, 1, SeededChoice())
+
+        np.testing.assert_allclose(centroids[0], normalize_rows(sample[[0]] + sample[[1]])[0])
+        # Rows 2 and 3 both belong to list 1, the last non-empty list.
+        np.testing.assert_allclose(centroids[1], normalize_rows(sample[[2]] + sample[[3]])[0])
+        np.testing.assert_allclose(centroids[2], sample[1])
+
+    def test_save_load_roundtrip(self) -> None:
+        matrix = _clustered_matrix(100, 8, 4)
+        ann = IVFIndex.build(matrix, lists=4)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / "index.ivf.npz"
+            ann.save(path)
+            loaded = IVFIndex.load(path)
+
+        np.testing.assert_array_equal(loaded.ids, ann.ids)
+        self.assertEqual(loaded.digest, matrix_digest(matrix))
+        changed = matrix.copy()
+        changed[10:40] = changed[40:70]
+        self.assertNotEqual(loaded.digest, matrix_digest(changed))
+
+    def test_write_vector_index_stores_sidecar(self) -> None:
+        config = make_config(vector_index_path="index.vidx", ann_lists=4, ann_nprobe=4)
+        matrix = _clustered_matrix(64, 8, 4)
+        entries = [
+            IndexEntry(uri=f"file#{row}", content=str(row), embedding=vector.tolist())
+            for row, vector in enumerate(matrix)
+        ]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = str(Path(tmp_dir) / "index.vidx")
+            write_vector_index(config, entries, path)
+            self.assertTrue(Path(ann_path(path)).exists())
+
+            index = load_vector_index(config, path)
+            self.assertIsNotNone(index.ann)
+            approximate = search_index(index, matrix[3], top_k=3, nprobe=4)
+            exact = search_index(VectorIndex(entries=entries), matrix[3], top_k=3)
+            self.assertEqual([chunk.uri for chunk in approximate], [c.uri for c in exact])
+
+            self.assertEqual(index.digest, matrix_digest(index.matrix))
+
+    def test_jsonl_sidecars_are_built_without_loading_the_index(self) -> None:
+        config = make_config(
+            vector_index_path="index.jsonl",
+            ann_lists=4,
+            ann_nprobe=4,
+            lexical_index=True,
+            retrieval_mode="hybrid",
+        )
+        matrix = _clustered_matrix(64, 8, 4)
+        entries = [
+            IndexEntry(uri=f"file#{row}", content=f"chunk {row}", embedding=vector.tolist())
+            for row, vector in enumerate(matrix * 3.0)
+        ]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = str(Path(tmp_dir) / "index.jsonl")
+            with (
+                patch.object(indexing_module, "_SIDECAR_BLOCK_ROWS", 10),
+                patch.object(VectorIndex, "load", side_effect=AssertionError("index loaded")),
+            ):
+                write_vector_index(config, entries, path)
+            index = load_vector_index(config, path)
+
+        # The streamed rows hash to the same digest as the loaded matrix.
+        self.assertIsNotNone(index.ann)
+        self.assertEqual(index.ann.digest, index.digest)
+        self.assertIsNotNone(index.lexical)
+
+    def test_sidecars_from_another_build_are_ignored(self) -> None:
+        config = make_config(
+            vector_index_path="index.vidx", ann_lists=4, index_quantization="int8"
+        )
+        matrix = _clustered_matrix(64, 8, 4)
+        # Rows 0, 32 and 63 are untouched; only rows 10-29 change.
+        changed = matrix.copy()
+        changed[10:30] = matrix[10:30][::-1]
+
+        def entries(rows):
+            return [
+                IndexEntry(uri=f"file#{row}", content=str(row), embedding=vector.tolist())
+                for row, vector in enumerate(rows)
+            ]
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = str(Path(tmp_dir) / "index.vidx")
+            write_vector_index(config, entries(matrix), path)
+            old_sidecars = {
+                location: Path(location).read_bytes()
+                for location in (ann_path(path), codes_path(path))
+            }
+
+            plain = make_config(vector_index_path=path)
+            write_vector_index(plain, entries(changed), path)
+            self.assertFalse(any(Path(location).exists() for location in old_sidecars))
+
+            # Put the old sidecars back, as a reader racing a rebuild could see
+            # them: they must still be rejected.
+            for location, payload in old_sidecars.items():
+                Path(location).write_bytes(payload)
+            index = load_vector_index(config, path)
+            self.assertIsNone(index.ann)
+            self.assertIsNone(index.codes)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,14 +1,17 @@
 import importlib.util
+import json
 import os
 import unittest
-from unittest.mock import patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 if importlib.util.find_spec("fastapi") is None:
     raise unittest.SkipTest("fastapi is not installed")
 
 from fastapi.testclient import TestClient
 
+from rag_chatbot import api as api_module
 from rag_chatbot.api import app
+from rag_chatbot.metrics import timed
 from rag_chatbot.retrieval import RetrievedChunk
 
 
@@ -28,8 +31,29 @@ class ApiTests(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.json(), {"status": "ok"})
 
-    @patch("rag_chatbot.api.generate_answer")
-    @patch("rag_chatbot.api.retrieve_context")
+    def test_lifespan_warms_up_and_closes_clients(self) -> None:
+        registry = MagicMock()
+        with (
+            patch.object(api_module, "get_clients", return_value=registry),
+            patch.object(api_module.index_cache, "get_async", new_callable=AsyncMock) as warm_index,
+        ):
+            with TestClient(app):
+                registry.warm_up.assert_called_once()
+                warm_index.assert_awaited_once()
+            registry.close.assert_called_once_with()
+
+    def test_chat_caches_are_sized_from_the_request_config(self) -> None:
+        os.environ["ANSWER_CACHE_SIZE"] = "7"
+        os.environ["QUERY_CACHE_SIZE"] = "3"
+        with patch.object(api_module, "_chat_caches", None):
+            response = TestClient(app).get("/cache/stats")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["answers"]["max_size"], 7)
+        self.assertEqual(response.json()["query_embeddings"]["max_size"], 3)
+
+    @patch("rag_chatbot.api.generate_answer_async", new_callable=AsyncMock)
+    @patch("rag_chatbot.api.retrieve_context_async", new_callable=AsyncMock)
     def test_chat_endpoint(self, mock_retrieve, mock_generate) -> None:
         mock_retrieve.return_value = [
             RetrievedChunk(uri="doc.txt", content="Hello", score=0.9)
@@ -37,7 +61,12 @@ class ApiTests(unittest.TestCase):
         mock_generate.return_value = type(
             "Response",
             (),
-            {"answer": "Hi there", "sources": mock_retrieve.return_value},
+            {
+                "answer": "Hi there",
+                "sources": mock_retrieve.return_value,
+                "prompt_tokens": 2,
+                "tokens_saved": 0,
+            },
         )()
         client = TestClient(app)
 
@@ -47,6 +76,119 @@ class ApiTests(unittest.TestCase):
         payload = response.json()
         self.assertEqual(payload["answer"], "Hi there")
         self.assertEqual(payload["sources"][0]["uri"], "doc.txt")
+        self.assertEqual(payload["prompt_tokens"], 2)
+
+    @patch("rag_chatbot.api.generate_answer_stream")
+    @patch("rag_chatbot.api.retrieve_context_async", new_callable=AsyncMock)
+    def test_chat_stream_endpoint(self, mock_retrieve, mock_stream) -> None:
+        mock_retrieve.return_value = [
+            RetrievedChunk(uri="doc.txt", content="Hello", score=0.9)
+        ]
+        async def tokens(*args):
+            for text in ("Hi", " there"):
+                yield text
+
+        mock_stream.side_effect = tokens
+        client = TestClient(app)
+
+        response = client.post("/chat/stream", json={"query": "Hello?"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers["content-type"].startswith("text/event-stream"))
+        events = [
+            (block.split("\n")[0][len("event: ") :], json.loads(block.split("\n")[1][6:]))
+            for block in response.text.strip().split("\n\n")
+        ]
+        self.assertEqual(events[0][0], "sources")
+        self.assertEqual(events[0][1][0]["uri"], "doc.txt")
+        self.assertEqual(
+            events[1:],
+            [
+                ("token", {"text": "Hi"}),
+                ("token", {"text": " there"}),
+                ("done", {"prompt_tokens": 2, "tokens_saved": 0}),
+            ],
+        )
+
+    @patch("rag_chatbot.api.generate_answer_async", new_callable=AsyncMock)
+    @patch("rag_chatbot.api.retrieve_context_batch_async", new_callable=AsyncMock)
+    @patch("rag_chatbot.api.embed_queries_async", new_callable=AsyncMock)
+    def test_chat_batch_streams_one_line_per_query(
+        self, mock_embed, mock_retrieve, mock_generate
+    ) -> None:
+        mock_embed.return_value = [[1.0, 0.0], [0.0, 1.0]]
+        mock_retrieve.return_value = [
+            [RetrievedChunk(uri="a.txt", content="A", score=0.9)],
+            [RetrievedChunk(uri="b.txt", content="B", score=0.8)],
+        ]
+
+        async def generate(config, query, chunks):
+            if query == "bad":
+                raise RuntimeError("quota exceeded")
+            return type(
+                "Response",
+                (),
+                {
+                    "answer": f"about {query}",
+                    "sources": chunks,
+                    "prompt_tokens": 1,
+                    "tokens_saved": 0,
+                },
+            )()
+
+        mock_generate.side_effect = generate
+        client = TestClient(app)
+
+        response = client.post("/chat/batch", json={"queries": ["good", "bad"]})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers["content-type"].startswith("application/x-ndjson"))
+        lines = sorted(
+            (json.loads(line) for line in response.text.splitlines()),
+            key=lambda line: line["index"],
+        )
+        self.assertEqual(lines[0]["answer"], "about good")
+        self.assertEqual(lines[0]["sources"][0]["uri"], "a.txt")
+        self.assertEqual(lines[1], {"index": 1, "error": "quota exceeded"})
+        self.assertEqual(mock_embed.await_args.args[1], ["good", "bad"])
+
+        retrieval_only = client.post("/chat/batch", json={"queries": ["good"], "generate": False})
+        self.assertEqual(
+            [json.loads(line)["sources"][0]["uri"] for line in retrieval_only.text.splitlines()],
+            ["a.txt"],
+        )
+
+    def test_chat_batch_rejects_oversized_batches(self) -> None:
+        os.environ["BATCH_MAX_QUERIES"] = "1"
+        response = TestClient(app).post("/chat/batch", json={"queries": ["a", "b"]})
+        self.assertEqual(response.status_code, 413)
+
+    @patch("rag_chatbot.api.generate_answer_async", new_callable=AsyncMock)
+    @patch("rag_chatbot.api.retrieve_context_async")
+    def test_stage_timings_reach_server_timing_and_metrics(
+        self, mock_retrieve, mock_generate
+    ) -> None:
+        async def retrieve(*args, **kwargs):
+            with timed("search"):
+                return []
+
+        mock_retrieve.side_effect = retrieve
+        mock_generate.return_value = type(
+            "Response", (), {"answer": "", "sources": [], "prompt_tokens": 0, "tokens_saved": 0}
+        )()
+        client = TestClient(app)
+
+        response = client.post("/chat", json={"query": "Hello?"})
+        metrics = client.get("/metrics")
+
+        self.assertIn("search;dur=", response.headers["server-timing"])
+        self.assertEqual(metrics.status_code, 200)
+        self.assertTrue(metrics.headers["content-type"].startswith("text/plain"))
+        self.assertIn('rag_stage_duration_seconds_count{stage="search"}', metrics.text)
+        self.assertIn(
+            'rag_http_request_duration_seconds_count{method="POST",route="/chat",status="200"}',
+            metrics.text,
+        )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,89 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, patch
+
+from support import fake_embeddings, make_config
+
+from rag_chatbot.batching import MicroBatcher
+from rag_chatbot.embeddings import VertexEmbeddingClient
+
+
+class MicroBatcherTests(unittest.TestCase):
+    def test_concurrent_items_share_one_call(self) -> None:
+        calls = []
+
+        async def process(items):
+            calls.append(items)
+            return [item * 2 for item in items]
+
+        async def run():
+            batcher = MicroBatcher(process, max_batch=10, max_wait=0.01)
+            return await asyncio.gather(*(batcher.submit(item) for item in [1, 2, 2, 3]))
+
+        self.assertEqual(asyncio.run(run()), [2, 4, 4, 6])
+        self.assertEqual(calls, [[1, 2, 3]])
+
+    def test_full_batches_are_sent_without_waiting(self) -> None:
+        calls = []
+
+        async def process(items):
+            calls.append(items)
+            return items
+
+        async def run():
+            batcher = MicroBatcher(process, max_batch=2, max_wait=60)
+            return await asyncio.wait_for(
+                asyncio.gather(*(batcher.submit(item) for item in range(4))), timeout=5
+            )
+
+        self.assertEqual(asyncio.run(run()), [0, 1, 2, 3])
+        self.assertEqual(calls, [[0, 1], [2, 3]])
+
+    def test_errors_reach_every_caller_in_the_batch(self) -> None:
+        async def process(items):
+            raise RuntimeError("quota exceeded")
+
+        async def run():
+            batcher = MicroBatcher(process, max_batch=10, max_wait=0)
+            return await asyncio.gather(
+                batcher.submit("a"), batcher.submit("b"), return_exceptions=True
+            )
+
+        results = asyncio.run(run())
+        self.assertEqual([str(result) for result in results], ["quota exceeded"] * 2)
+
+
+class QueryBatchingTests(unittest.TestCase):
+    @patch("vertexai.preview.language_models.TextEmbeddingModel")
+    def test_concurrent_queries_use_one_embedding_request(self, mock_model) -> None:
+        model = mock_model.from_pretrained.return_value
+        model.get_embeddings_async = AsyncMock(side_effect=fake_embeddings)
+        client = VertexEmbeddingClient(
+            make_config(embedding_model="text-embedding-005", query_batch_wait_ms=5)
+        )
+
+        async def run():
+            return await asyncio.gather(*(client.embed_query_async("q" * n) for n in range(1, 6)))
+
+        embeddings = asyncio.run(run())
+
+        self.assertEqual([vector[0] for vector in embeddings], [1.0, 2.0, 3.0, 4.0, 5.0])
+        model.get_embeddings_async.assert_awaited_once()
+
+    @patch("vertexai.preview.language_models.TextEmbeddingModel")
+    def test_single_text_models_are_not_batched(self, mock_model) -> None:
+        model = mock_model.from_pretrained.return_value
+        model.get_embeddings_async = AsyncMock(side_effect=fake_embeddings)
+        client = VertexEmbeddingClient(make_config(embedding_model="gemini-embedding-001"))
+
+        async def run():
+            return await asyncio.gather(
+                client.embed_query_async("a"), client.embed_query_async("bb")
+            )
+
+        self.assertEqual([vector[0] for vector in asyncio.run(run())], [1.0, 2.0])
+        self.assertEqual(model.get_embeddings_async.await_count, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
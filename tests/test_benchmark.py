@@ -0,0 +1,73 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from support import make_config
+
+from rag_chatbot.benchmark import (
+    BenchmarkSettings,
+    LocalStorageClient,
+    SyntheticCorpus,
+    compare_reports,
+    run_benchmark,
+)
+from rag_chatbot.clients import ClientRegistry, use_clients
+from rag_chatbot.gcp import load_storage_client
+from rag_chatbot.indexing import IndexEntry, load_vector_index, write_vector_index
+
+
+class BenchmarkTests(unittest.TestCase):
+    def test_synthetic_corpus_is_deterministic(self) -> None:
+        corpus = SyntheticCorpus(45, chunks_per_document=20, seed=3)
+        self.assertEqual(corpus.documents, 3)
+        self.assertEqual(corpus.chunk(7), SyntheticCorpus(45, 20, seed=3).chunk(7))
+        self.assertNotEqual(corpus.chunk(7), corpus.chunk(8))
+        uri, text = corpus.document(2)
+        self.assertEqual(uri, "synthetic/0000002.txt")
+        self.assertEqual(text, "".join(corpus.chunk(row) for row in range(40, 45)))
+
+    def test_local_storage_client_serves_gcs_paths(self) -> None:
+        entries = [IndexEntry(uri="a.txt#chunk=0", content="a", embedding=[1.0, 0.0])]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            client = LocalStorageClient(Path(tmp_dir))
+            with use_clients(ClientRegistry(storage_client=client)):
+                self.assertIs(load_storage_client(make_config()), client)
+                write_vector_index(make_config(), entries, "gs://bucket/index.vidx")
+                index = load_vector_index(make_config(), "gs://bucket/index.vidx")
+            self.assertTrue((Path(tmp_dir) / "bucket" / "index.vidx").is_file())
+        self.assertEqual(index.entries[0].uri, "a.txt#chunk=0")
+
+    def test_run_benchmark_reports_each_size(self) -> None:
+        settings = BenchmarkSettings(sizes=(60, 120), dim=16, queries=10, chunks_per_document=3)
+        report = run_benchmark(make_config(), settings, isolate=False)
+
+        self.assertEqual(report["settings"]["sizes"], (60, 120))
+        self.assertEqual([result["size"] for result in report["results"]], [60, 120])
+        result = report["results"][0]
+        self.assertEqual(result["chunks"], 60)
+        self.assertEqual(result["queries"], 10)
+        self.assertGreater(result["index_bytes"], 60 * 16 * 4)
+        self.assertLessEqual(result["query_p50_ms"], result["query_p99_ms"])
+
+    def test_run_benchmark_searches_shards_in_worker_processes(self) -> None:
+        settings = BenchmarkSettings(sizes=(60,), dim=16, queries=5, chunks_per_document=3)
+        config = make_config(index_shards=2, search_processes=2)
+
+        report = run_benchmark(config, settings, isolate=False)
+
+        self.assertEqual(report["settings"]["index_shards"], 2)
+        self.assertEqual(report["results"][0]["queries"], 5)
+
+    def test_compare_reports_flags_regressions(self) -> None:
+        baseline = {"results": [{"size": 10, "query_p95_ms": 2.0, "build_chunks_per_second": 100}]}
+        current = {"results": [{"size": 10, "query_p95_ms": 3.0, "build_chunks_per_second": 95}]}
+
+        rows = {row["metric"]: row for row in compare_reports(baseline, current)}
+
+        self.assertTrue(rows["query_p95_ms"]["regressed"])
+        self.assertAlmostEqual(rows["query_p95_ms"]["change"], 1.5)
+        self.assertFalse(rows["build_chunks_per_second"]["regressed"])
+
+
+if __name__ == "__main__":
+    unittest.main()
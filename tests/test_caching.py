@@ -0,0 +1,65 @@
+import unittest
+from unittest.mock import patch
+
+from rag_chatbot.caching import SemanticAnswerCache, TTLCache, normalize_query
+
+
+class TTLCacheTests(unittest.TestCase):
+    def test_lru_eviction_and_hit_rate(self) -> None:
+        cache = TTLCache(max_size=2, ttl_seconds=60)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        self.assertEqual(cache.get("a"), 1)
+        cache.put("c", 3)
+
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), 3)
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["evictions"]), (2, 1, 1))
+        self.assertAlmostEqual(stats["hit_rate"], 2 / 3)
+
+    @patch("rag_chatbot.caching.time.monotonic")
+    def test_entries_expire(self, mock_monotonic) -> None:
+        mock_monotonic.return_value = 100.0
+        cache = TTLCache(max_size=2, ttl_seconds=10)
+        cache.put("a", 1)
+        mock_monotonic.return_value = 110.0
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats()["expirations"], 1)
+
+    def test_normalize_query(self) -> None:
+        self.assertEqual(normalize_query("  What IS\tthis? "), "what is this?")
+
+
+class SemanticAnswerCacheTests(unittest.TestCase):
+    def test_hits_within_threshold_for_same_index_version(self) -> None:
+        cache = SemanticAnswerCache(max_size=4, ttl_seconds=60, threshold=0.95)
+        cache.put([1.0, 0.0], "v1", "answer")
+
+        self.assertEqual(cache.get([0.99, 0.05], "v1"), "answer")
+        self.assertIsNone(cache.get([0.6, 0.8], "v1"))
+        self.assertIsNone(cache.get([1.0, 0.0], "v2"))
+
+    def test_new_index_version_drops_old_answers(self) -> None:
+        cache = SemanticAnswerCache(max_size=4, ttl_seconds=60, threshold=0.95)
+        cache.put([1.0, 0.0], "v1", "old")
+        cache.put([0.0, 1.0], "v2", "new")
+
+        self.assertEqual(len(cache), 1)
+        self.assertIsNone(cache.get([1.0, 0.0], "v2"))
+        self.assertEqual(cache.get([0.0, 1.0], "v2"), "new")
+
+    def test_evicts_least_recently_used(self) -> None:
+        cache = SemanticAnswerCache(max_size=2, ttl_seconds=60, threshold=0.99)
+        cache.put([1.0, 0.0, 0.0], "v1", "x")
+        cache.put([0.0, 1.0, 0.0], "v1", "y")
+        cache.get([1.0, 0.0, 0.0], "v1")
+        cache.put([0.0, 0.0, 1.0], "v1", "z")
+
+        self.assertEqual(cache.get([1.0, 0.0, 0.0], "v1"), "x")
+        self.assertIsNone(cache.get([0.0, 1.0, 0.0], "v1"))
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,11 @@
+import asyncio
 import unittest
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
-from rag_chatbot.chat import build_prompt, generate_answer
-from rag_chatbot.config import AppConfig
+from support import make_config
+
+from rag_chatbot.chat import build_prompt, generate_answer, generate_answer_stream
+from rag_chatbot.clients import ClientRegistry, use_clients
 from rag_chatbot.retrieval import RetrievedChunk
 
 
@@ -13,30 +16,91 @@ class ChatTests(unittest.TestCase):
         self.assertIn("Hello", prompt)
         self.assertIn("Question?", prompt)
 
-    @patch("rag_chatbot.chat.initialize_vertex_ai")
-    @patch("rag_chatbot.chat._load_generative_model")
-    def test_generate_answer_calls_gemini(self, mock_load_model, mock_init) -> None:
-        mock_model = mock_load_model.return_value
+    @patch("rag_chatbot.clients.initialize_vertex_ai")
+    @patch("vertexai.preview.generative_models.GenerativeModel")
+    def test_generate_answer_calls_gemini(self, mock_model, mock_init) -> None:
         mock_instance = mock_model.return_value
         mock_instance.generate_content.return_value = MagicMock(text="Answer")
-        config = AppConfig(
-            gcp_project_id="project",
-            gcp_region="us-central1",
-            embedding_model="textembedding-gecko@latest",
-            chat_model="gemini-1.5-pro",
-            document_bucket="bucket",
-            vector_index_path="index.jsonl",
-        )
+        config = make_config(embedding_model="textembedding-gecko@latest")
         chunks = [RetrievedChunk(uri="file.txt", content="Hello", score=1.0)]
 
-        response = generate_answer(config, "Question?", chunks)
+        with use_clients(ClientRegistry()):
+            response = generate_answer(config, "Question?", chunks)
+            generate_answer(config, "Again?", chunks)
 
+        # The model handle is created once and reused.
         mock_init.assert_called_once_with(config)
-        mock_load_model.assert_called_once_with()
         mock_model.assert_called_once_with("gemini-1.5-pro")
-        mock_instance.generate_content.assert_called_once()
+        self.assertEqual(mock_instance.generate_content.call_count, 2)
         self.assertEqual(response.answer, "Answer")
 
+    def test_sources_are_the_chunks_in_the_prompt(self) -> None:
+        mock_instance = MagicMock()
+        mock_instance.generate_content.return_value = MagicMock(text="Answer")
+        text = "the tray holds two hundred sheets of paper"
+        chunks = [
+            RetrievedChunk(uri="a.txt", content=text, score=0.9),
+            RetrievedChunk(uri="a-copy.txt", content=text, score=0.8),
+        ]
+
+        with use_clients(ClientRegistry(generative_model=mock_instance)):
+            response = generate_answer(make_config(), "Question?", chunks)
+
+        self.assertEqual([chunk.uri for chunk in response.sources], ["a.txt"])
+        self.assertEqual(response.tokens_saved, response.prompt_tokens)
+        prompt = mock_instance.generate_content.call_args[0][0]
+        self.assertEqual(prompt.count(text), 1)
+
+    def test_generate_answer_stream_yields_chunks(self) -> None:
+        async def responses():
+            for text in ("An", "", "swer"):
+                yield MagicMock(text=text)
+
+        mock_instance = MagicMock()
+        mock_instance.generate_content_async = AsyncMock(return_value=responses())
+        config = make_config()
+        chunks = [RetrievedChunk(uri="file.txt", content="Hello", score=1.0)]
+
+        async def collect() -> list[str]:
+            return [text async for text in generate_answer_stream(config, "Question?", chunks)]
+
+        with use_clients(ClientRegistry(generative_model=mock_instance)):
+            self.assertEqual(asyncio.run(collect()), ["An", "swer"])
+        _, kwargs = mock_instance.generate_content_async.call_args
+        self.assertEqual(kwargs, {"stream": True})
+
+    def test_cancelling_stream_closes_upstream_between_chunks(self) -> None:
+        closed = asyncio.Event()
+
+        async def responses():
+            try:
+                yield MagicMock(text="first")
+                await asyncio.sleep(3600)  # Gemini is slow to send the next chunk.
+                yield MagicMock(text="never")
+            finally:
+                closed.set()
+
+        mock_instance = MagicMock()
+        mock_instance.generate_content_async = AsyncMock(return_value=responses())
+        config = make_config()
+
+        async def consume_then_cancel() -> list[str]:
+            received: list[str] = []
+
+            async def consume() -> None:
+                async for text in generate_answer_stream(config, "Question?", []):
+                    received.append(text)
+
+            task = asyncio.create_task(consume())
+            while not received:
+                await asyncio.sleep(0)
+            task.cancel()
+            await asyncio.wait_for(closed.wait(), timeout=1)
+            return received
+
+        with use_clients(ClientRegistry(generative_model=mock_instance)):
+            self.assertEqual(asyncio.run(consume_then_cancel()), ["first"])
+
 
 if __name__ == "__main__":
     unittest.main()
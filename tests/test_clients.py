@@ -0,0 +1,59 @@
+import unittest
+from unittest.mock import MagicMock, patch
+
+from support import make_config
+
+from rag_chatbot import gcp
+from rag_chatbot.clients import ClientRegistry, get_clients, use_clients
+from rag_chatbot.gcp import initialize_vertex_ai, load_storage_client
+
+
+class ClientRegistryTests(unittest.TestCase):
+    @patch("rag_chatbot.clients._new_generative_model")
+    @patch("rag_chatbot.clients._new_storage_client")
+    def test_clients_are_created_once_and_closed(self, new_storage, new_model) -> None:
+        config = make_config()
+        registry = ClientRegistry()
+
+        with patch("rag_chatbot.embeddings.VertexEmbeddingClient.load_model") as load_model:
+            registry.warm_up(config)
+            registry.warm_up(config)
+
+        new_storage.assert_called_once_with(config)
+        new_model.assert_called_once_with(config)
+        self.assertEqual(load_model.call_count, 2)
+        self.assertIs(registry.embedding_client(config), registry.embedding_client(config))
+        self.assertIsNot(
+            registry.embedding_client(config),
+            registry.embedding_client(make_config(embedding_model="text-embedding-005")),
+        )
+        with use_clients(registry):
+            self.assertIs(load_storage_client(config), new_storage.return_value)
+
+        registry.close()
+        new_storage.return_value.close.assert_called_once_with()
+        registry.storage_client(config)
+        self.assertEqual(new_storage.call_count, 2)
+
+    def test_overrides_replace_the_process_registry(self) -> None:
+        storage = MagicMock()
+        original = get_clients()
+
+        with use_clients(ClientRegistry(storage_client=storage)) as registry:
+            self.assertIs(get_clients(), registry)
+            self.assertIs(load_storage_client(make_config()), storage)
+
+        self.assertIs(get_clients(), original)
+
+    @patch("google.cloud.aiplatform.init")
+    def test_vertex_ai_is_initialized_once_per_project(self, mock_init) -> None:
+        with patch.object(gcp, "_vertex_settings", None):
+            initialize_vertex_ai(make_config())
+            initialize_vertex_ai(make_config())
+            initialize_vertex_ai(make_config(gcp_region="europe-west4"))
+
+        self.assertEqual(mock_init.call_count, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
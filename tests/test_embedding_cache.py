@@ -0,0 +1,83 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from support import fake_embeddings, make_config
+
+from rag_chatbot.embedding_cache import EmbeddingCache
+from rag_chatbot.embeddings import VertexEmbeddingClient
+
+
+class EmbeddingCacheTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp_dir.name) / "cache.sqlite"
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def test_roundtrip_and_persistence(self) -> None:
+        cache = EmbeddingCache(self.path, max_entries=10)
+        cache.put_many("model", ["a", "b"], [[1.0, 2.0], [3.0, 4.0]])
+        self.assertEqual(cache.get_many("model", ["a", "c"]), [[1.0, 2.0], None])
+        self.assertEqual(cache.get_many("other-model", ["a"]), [None])
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+        cache.close()
+
+        reopened = EmbeddingCache(self.path, max_entries=10)
+        self.assertEqual(len(reopened), 2)
+        self.assertEqual(reopened.get_many("model", ["b"]), [[3.0, 4.0]])
+        reopened.close()
+
+    def test_evicts_least_recently_used(self) -> None:
+        cache = EmbeddingCache(self.path, max_entries=2)
+        cache.put_many("model", ["a"], [[1.0]])
+        cache.put_many("model", ["b"], [[2.0]])
+        cache.get_many("model", ["a"])
+        cache.put_many("model", ["c"], [[3.0]])
+
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.evictions, 1)
+        self.assertEqual(cache.get_many("model", ["a", "b", "c"]), [[1.0], None, [3.0]])
+        cache.close()
+
+    @patch("rag_chatbot.embeddings.initialize_vertex_ai")
+    @patch("vertexai.preview.language_models.TextEmbeddingModel")
+    def test_client_only_embeds_misses(self, mock_model_cls, mock_init) -> None:
+        mock_model = mock_model_cls.from_pretrained.return_value
+        mock_model.get_embeddings.side_effect = fake_embeddings
+        config = make_config(embedding_model="text-embedding-005")
+        cache = EmbeddingCache(self.path, max_entries=10)
+        cache.put_many("text-embedding-005", ["bb"], [[99.0]])
+        client = VertexEmbeddingClient(config, cache=cache)
+
+        embeddings = client.embed_texts(["a", "bb", "ccc"])
+
+        self.assertEqual(embeddings, [[1.0, 1.0], [99.0], [3.0, 1.0]])
+        mock_model.get_embeddings.assert_called_once_with(["a", "ccc"])
+        self.assertEqual(client.embed_texts(["ccc"]), [[3.0, 1.0]])
+        self.assertEqual(mock_model.get_embeddings.call_count, 1)
+        cache.close()
+
+    @patch("rag_chatbot.embeddings.initialize_vertex_ai")
+    @patch("vertexai.preview.language_models.TextEmbeddingModel")
+    def test_reduced_dimensions_are_requested_and_cached_apart(
+        self, mock_model_cls, mock_init
+    ) -> None:
+        mock_model = mock_model_cls.from_pretrained.return_value
+        mock_model.get_embeddings.side_effect = lambda texts, **options: fake_embeddings(texts)
+        config = make_config(embedding_model="text-embedding-005", embedding_dimensions=256)
+        cache = EmbeddingCache(self.path, max_entries=10)
+        cache.put_many("text-embedding-005", ["a"], [[99.0]])
+        client = VertexEmbeddingClient(config, cache=cache)
+
+        self.assertEqual(client.embed_texts(["a"]), [[1.0, 1.0]])
+
+        mock_model.get_embeddings.assert_called_once_with(["a"], output_dimensionality=256)
+        self.assertEqual(cache.get_many("text-embedding-005@256", ["a"]), [[1.0, 1.0]])
+        cache.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+import json
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+
+# SDKs that take seconds to import; only the code paths that call them load them.
+HEAVY_MODULES = (
+    "vertexai",
+    "google.cloud.aiplatform",
+    "google.cloud.storage",
+    "google.auth",
+    "fastapi",
+)
+# Importing the CLI took about 1.7s with the Vertex SDK and about 0.2s without it.
+IMPORT_BUDGET_SECONDS = 1.0
+
+_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import {module}
+print(json.dumps({{"seconds": time.perf_counter() - started, "modules": sorted(sys.modules)}}))
+"""
+
+
+def _import(module: str) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", _PROBE.format(module=module)],
+        capture_output=True,
+        check=True,
+        cwd=Path(__file__).resolve().parents[1],
+        text=True,
+    )
+    return json.loads(result.stdout)
+
+
+def _heavy(modules: list[str], allowed: tuple[str, ...] = ()) -> list[str]:
+    return [
+        name
+        for name in modules
+        if any(name == heavy or name.startswith(heavy + ".") for heavy in HEAVY_MODULES)
+        and name not in allowed
+        and not name.startswith(tuple(prefix + "." for prefix in allowed))
+    ]
+
+
+class ImportTests(unittest.TestCase):
+    def test_cli_import_skips_cloud_sdks(self) -> None:
+        probe = _import("rag_chatbot.cli")
+
+        self.assertEqual(_heavy(probe["modules"]), [])
+        self.assertLess(probe["seconds"], IMPORT_BUDGET_SECONDS)
+
+    def test_api_import_skips_cloud_sdks(self) -> None:
+        probe = _import("rag_chatbot.api")
+
+        self.assertEqual(_heavy(probe["modules"], allowed=("fastapi",)), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
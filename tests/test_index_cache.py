@@ -0,0 +1,71 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from support import make_config
+
+from rag_chatbot import index_cache as index_cache_module
+from rag_chatbot.index_cache import IndexCache
+from rag_chatbot.indexing import IndexEntry, VectorIndex
+
+
+class IndexCacheTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp_dir.name) / "index.jsonl"
+        VectorIndex(entries=[IndexEntry(uri="a#0", content="a", embedding=[1.0, 0.0])]).save(
+            self.path
+        )
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def test_reuses_index_until_file_changes(self) -> None:
+        cache = IndexCache()
+        config = make_config(vector_index_path=str(self.path), index_refresh_seconds=0)
+        with patch.object(
+            index_cache_module,
+            "load_vector_index",
+            wraps=index_cache_module.load_vector_index,
+        ) as mock_load:
+            first = cache.get(config)
+            second = cache.get(config)
+            self.assertIs(first, second)
+            self.assertEqual(mock_load.call_count, 1)
+
+            VectorIndex(
+                entries=[
+                    IndexEntry(uri="a#0", content="a", embedding=[1.0, 0.0]),
+                    IndexEntry(uri="b#0", content="b", embedding=[0.0, 1.0]),
+                ]
+            ).save(self.path)
+            stat = self.path.stat()
+            os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+            third = cache.get(config)
+            self.assertEqual(mock_load.call_count, 2)
+            self.assertEqual(len(third.entries), 2)
+
+    def test_refresh_interval_skips_revalidation(self) -> None:
+        cache = IndexCache()
+        config = make_config(vector_index_path=str(self.path), index_refresh_seconds=3600)
+        cache.get(config)
+        with patch.object(index_cache_module, "get_index_version") as mock_version:
+            cache.get(config)
+            mock_version.assert_not_called()
+
+
+    def test_version_is_returned_with_the_index_it_belongs_to(self) -> None:
+        cache = IndexCache()
+        config = make_config(vector_index_path=str(self.path), index_refresh_seconds=0)
+        index, version = cache.get_with_version(config)
+
+        self.assertEqual(len(index.entries), 1)
+        self.assertEqual(version, index_cache_module.get_index_version(config, str(self.path)))
+        self.assertIs(cache.get(config), index)
+
+
+if __name__ == "__main__":
+    unittest.main()
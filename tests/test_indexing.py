@@ -1,9 +1,53 @@
-import json
+import hashlib
+import os
+import tempfile
 import unittest
 from pathlib import Path
+from unittest.mock import patch
 
-from rag_chatbot.embeddings import chunk_text
-from rag_chatbot.indexing import IndexEntry, VectorIndex
+from support import fake_embeddings, make_config
+
+from rag_chatbot.config import AppConfig
+from rag_chatbot.embeddings import (
+    VertexEmbeddingClient,
+    chunk_text,
+    iter_batches,
+    max_texts_per_request,
+)
+from rag_chatbot.indexing import (
+    IndexEntry,
+    VectorIndex,
+    _excluded_blob_names,
+    build_vector_index,
+    build_vector_index_from_gcs,
+    load_index_manifest,
+    save_vector_index,
+    write_vector_index,
+)
+
+
+class FakeBlob:
+    def __init__(self, name: str, data: bytes, generation: int) -> None:
+        self.name = name
+        self.data = data
+        self.generation = generation
+        self.md5_hash = hashlib.md5(data).hexdigest()
+        self.downloads = 0
+
+    def download_as_bytes(self) -> bytes:
+        self.downloads += 1
+        return self.data
+
+
+class FakeStorageClient:
+    def __init__(self, blobs: list[FakeBlob]) -> None:
+        self.blobs = {blob.name: blob for blob in blobs}
+
+    def bucket(self, name: str) -> str:
+        return name
+
+    def list_blobs(self, bucket: str, prefix: str | None = None) -> list[FakeBlob]:
+        return [blob for name, blob in self.blobs.items() if name.startswith(prefix or "")]
 
 
 class IndexingTests(unittest.TestCase):
@@ -28,6 +72,177 @@ class IndexingTests(unittest.TestCase):
         self.assertEqual(reloaded.entries[1].content, "world")
         self.assertEqual(reloaded.entries[1].embedding, [0.3, 0.4])
 
+    def test_binary_index_roundtrip(self) -> None:
+        entries = [
+            IndexEntry(uri="file#0", content="hello", embedding=[0.1, 0.2]),
+            IndexEntry(uri="file#1", content="wörld", embedding=[0.3, 0.4]),
+            IndexEntry(uri="file#2", content="", embedding=[0.0, 0.0]),
+        ]
+        index = VectorIndex(entries=entries)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / "index.vidx"
+            index.save(path)
+            reloaded = VectorIndex.load(path)
+
+            self.assertEqual(len(reloaded.entries), 3)
+            self.assertEqual(reloaded.entries[1].uri, "file#1")
+            self.assertEqual(reloaded.entries[1].content, "wörld")
+            self.assertEqual(reloaded.entries[-1].content, "")
+            for original, loaded in zip(entries, reloaded.entries):
+                for expected, actual in zip(original.embedding, loaded.embedding):
+                    self.assertAlmostEqual(expected, actual, places=6)
+            self.assertTrue((reloaded.matrix == index.matrix).all())
+
+    def test_binary_index_empty(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / "index.vidx"
+            VectorIndex(entries=[]).save(path)
+            self.assertEqual(len(VectorIndex.load(path).entries), 0)
+
+    def test_write_vector_index_keeps_old_index_on_failure(self) -> None:
+        config = make_config(vector_index_path="index.vidx")
+
+        def entries(fail: bool):
+            yield IndexEntry(uri="file#0", content="hello", embedding=[0.1, 0.2])
+            if fail:
+                raise RuntimeError("embedding failed")
+            yield IndexEntry(uri="file#1", content="world", embedding=[0.3, 0.4])
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / "index.vidx"
+            self.assertEqual(write_vector_index(config, entries(False), str(path)), 2)
+            with self.assertRaises(RuntimeError):
+                write_vector_index(config, entries(True), str(path))
+
+            self.assertEqual(len(VectorIndex.load(path).entries), 2)
+            self.assertEqual(sorted(p.name for p in Path(tmp_dir).iterdir()), ["index.vidx"])
+
+    def test_iter_batches_respects_item_and_token_limits(self) -> None:
+        texts = ["a" * 30, "b" * 30, "c" * 30, "d", "e", "f"]
+        batches = list(iter_batches(texts, max_items=2, max_tokens=15))
+        self.assertEqual(batches, [["a" * 30], ["b" * 30], ["c" * 30, "d"], ["e", "f"]])
+
+    @patch("rag_chatbot.embeddings.initialize_vertex_ai")
+    @patch("vertexai.preview.language_models.TextEmbeddingModel")
+    def test_build_vector_index_batches_embedding_calls(self, mock_model_cls, mock_init) -> None:
+        mock_model = mock_model_cls.from_pretrained.return_value
+        mock_model.get_embeddings.side_effect = fake_embeddings
+        config = make_config(embedding_model="text-embedding-005", embedding_batch_size=3)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            first = Path(tmp_dir) / "first.txt"
+            second = Path(tmp_dir) / "second.txt"
+            first.write_text("x" * 3500, encoding="utf-8")
+            second.write_text("y" * 1600, encoding="utf-8")
+
+            output_path = Path(tmp_dir) / "index.jsonl"
+            written = build_vector_index(config, [first, second], output_path)
+            index = VectorIndex.load(output_path)
+
+        self.assertEqual(written, 5)
+        self.assertEqual(
+            [entry.uri.rsplit("/", 1)[-1] for entry in index.entries],
+            [
+                "first.txt#chunk=0",
+                "first.txt#chunk=1",
+                "first.txt#chunk=2",
+                "second.txt#chunk=0",
+                "second.txt#chunk=1",
+            ],
+        )
+        self.assertEqual(
+            [entry.embedding[0] for entry in index.entries], [1500.0, 1500.0, 500.0, 1500.0, 100.0]
+        )
+        self.assertEqual(mock_model.get_embeddings.call_count, 2)
+        mock_model_cls.from_pretrained.assert_called_once_with("text-embedding-005")
+        mock_init.assert_called_once_with(config)
+
+    @patch("rag_chatbot.embeddings.initialize_vertex_ai")
+    @patch("vertexai.preview.language_models.TextEmbeddingModel")
+    def test_default_config_sends_one_text_per_gemini_request(
+        self, mock_model_cls, mock_init
+    ) -> None:
+        mock_model = mock_model_cls.from_pretrained.return_value
+        mock_model.get_embeddings.side_effect = fake_embeddings
+        with patch.dict(os.environ, {"EMBEDDING_MODEL": "gemini-embedding-001"}):
+            config = AppConfig.from_env()
+
+        VertexEmbeddingClient(config).embed_texts(["a", "b", "c"])
+
+        self.assertEqual(
+            [call.args[0] for call in mock_model.get_embeddings.call_args_list],
+            [["a"], ["b"], ["c"]],
+        )
+        self.assertEqual(max_texts_per_request("text-embedding-005"), 250)
+
+    @patch("rag_chatbot.embeddings.initialize_vertex_ai")
+    @patch("vertexai.preview.language_models.TextEmbeddingModel")
+    def test_incremental_gcs_build_only_embeds_changed_blobs(
+        self, mock_model_cls, mock_init
+    ) -> None:
+        mock_model = mock_model_cls.from_pretrained.return_value
+        mock_model.get_embeddings.side_effect = fake_embeddings
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            config = make_config(
+                embedding_model="text-embedding-005",
+                vector_index_path=str(Path(tmp_dir) / "index.jsonl"),
+            )
+            storage = FakeStorageClient(
+                [
+                    FakeBlob("docs/keep.txt", b"keep", 1),
+                    FakeBlob("docs/edit.txt", b"before", 1),
+                    FakeBlob("docs/gone.txt", b"gone", 1),
+                    FakeBlob("other/outside.txt", b"outside", 1),
+                ]
+            )
+            with patch("rag_chatbot.indexing.load_storage_client", return_value=storage):
+                full = build_vector_index_from_gcs(config)
+                save_vector_index(config, full, config.vector_index_path)
+
+                del storage.blobs["docs/gone.txt"]
+                storage.blobs["docs/edit.txt"] = FakeBlob("docs/edit.txt", b"after!!", 2)
+                storage.blobs["docs/new.txt"] = FakeBlob("docs/new.txt", b"new", 1)
+                storage.blobs["docs/keep.txt"].generation = 2  # re-upload, same content
+                mock_model.get_embeddings.reset_mock()
+
+                updated = build_vector_index_from_gcs(config, prefix="docs/", incremental=True)
+                save_vector_index(config, updated, config.vector_index_path)
+                manifest = load_index_manifest(config, config.vector_index_path)
+
+        self.assertEqual(
+            sorted(entry.uri for entry in updated.entries),
+            [
+                "gs://bucket/docs/edit.txt#chunk=0",
+                "gs://bucket/docs/keep.txt#chunk=0",
+                "gs://bucket/docs/new.txt#chunk=0",
+                "gs://bucket/other/outside.txt#chunk=0",
+            ],
+        )
+        self.assertEqual(storage.blobs["docs/keep.txt"].downloads, 1)
+        mock_model.get_embeddings.assert_called_once_with(["after!!", "new"])
+        self.assertEqual(
+            sorted(manifest),
+            ["docs/edit.txt", "docs/keep.txt", "docs/new.txt", "other/outside.txt"],
+        )
+        self.assertEqual(manifest["docs/edit.txt"]["generation"], 2)
+        self.assertEqual(manifest["docs/keep.txt"]["generation"], 2)
+
+
+    def test_gcs_builds_skip_index_artifacts_in_document_bucket(self) -> None:
+        config = make_config(
+            document_bucket="b", vector_index_path="gs://b/index/index.vidx"
+        )
+        self.assertEqual(
+            _excluded_blob_names(config),
+            {
+                "index/index.vidx",
+                "index/index.vidx.manifest.json",
+                "index/index.vidx.shards.json",
+                "index/index.vidx.ivf.npz",
+                "index/index.vidx.codes.npz",
+                "index/index.vidx.bm25.npz",
+            },
+        )
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,77 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock
+
+from support import make_config
+
+from rag_chatbot.benchmark import LocalStorageClient
+from rag_chatbot.clients import ClientRegistry, use_clients
+from rag_chatbot.ingest import _crc32c_base64, _matches_blob, upload_documents
+
+
+class IngestTests(unittest.TestCase):
+    def test_uploads_skip_unchanged_files_and_report_status(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            root = Path(tmp_dir)
+            docs = root / "docs"
+            docs.mkdir()
+            paths = [docs / f"doc{number}.txt" for number in range(5)]
+            for number, path in enumerate(paths):
+                path.write_text(f"document {number}")
+            client = LocalStorageClient(root / "gcs")
+            config = make_config(ingest_workers=3)
+
+            with use_clients(ClientRegistry(storage_client=client)):
+                first = upload_documents(config, paths)
+                paths[1].write_text("document 1, edited")
+                second = upload_documents(config, [*paths, docs / "missing.txt"])
+
+            stored = root / "gcs" / config.document_bucket / "doc1.txt"
+            self.assertEqual(stored.read_text(), "document 1, edited")
+
+        self.assertEqual(
+            first.uploaded, [f"gs://{config.document_bucket}/doc{n}.txt" for n in range(5)]
+        )
+        self.assertEqual(first.bytes_uploaded, sum(len(f"document {n}") for n in range(5)))
+        self.assertEqual(second.uploaded, [f"gs://{config.document_bucket}/doc1.txt"])
+        self.assertEqual(len(second.skipped), 4)
+        self.assertEqual(second.bytes_uploaded, len("document 1, edited"))
+        self.assertEqual([upload.path.name for upload in second.failed], ["missing.txt"])
+        self.assertEqual(
+            [upload.status for upload in second.files],
+            ["skipped", "uploaded", "skipped", "skipped", "skipped", "failed"],
+        )
+
+    def test_large_files_use_chunked_uploads(self) -> None:
+        bucket = MagicMock()
+        bucket.get_blob.return_value = None
+        client = MagicMock()
+        client.bucket.return_value = bucket
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            small = Path(tmp_dir) / "small.txt"
+            large = Path(tmp_dir) / "large.bin"
+            small.write_bytes(b"x")
+            large.write_bytes(b"x" * (1024 * 1024 + 1))
+
+            with use_clients(ClientRegistry(storage_client=client)):
+                upload_documents(make_config(upload_chunk_mb=1), [small, large])
+
+        chunk_sizes = {
+            call.args[0]: call.kwargs["chunk_size"] for call in bucket.blob.call_args_list
+        }
+        self.assertEqual(chunk_sizes, {"small.txt": None, "large.bin": 1024 * 1024})
+
+    def test_composite_blobs_match_on_crc32c(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / "doc.txt"
+            path.write_text("content")
+            blob = MagicMock(size=7, md5_hash=None, crc32c=_crc32c_base64(path))
+            self.assertTrue(_matches_blob(path, 7, blob))
+            blob.crc32c = "AAAAAA=="
+            self.assertFalse(_matches_blob(path, 7, blob))
+            self.assertFalse(_matches_blob(path, 7, None))
+
+
+if __name__ == "__main__":
+    unittest.main()
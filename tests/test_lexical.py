@@ -0,0 +1,97 @@
+import asyncio
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock
+
+import numpy as np
+from support import make_config
+
+from rag_chatbot.indexing import IndexEntry, lexical_path, load_vector_index, write_vector_index
+from rag_chatbot.lexical import BM25Index, reciprocal_rank_fusion, tokenize
+from rag_chatbot.retrieval import retrieve_context_async, search_chunks
+
+_TEXTS = [
+    "The printer shows error E-1042 when the tray is empty.",
+    "Restart the router to clear connection errors.",
+    "SKU 88-311 ships with a spare tray.",
+    "General troubleshooting for printers and routers.",
+]
+
+
+def _entries() -> list[IndexEntry]:
+    # Vectors point away from the keyword matches so the modes disagree.
+    vectors = [[0.0, 1.0], [1.0, 0.1], [0.1, 1.0], [1.0, 0.0]]
+    return [
+        IndexEntry(uri=f"doc{row}.txt#chunk=0", content=text, embedding=vector)
+        for row, (text, vector) in enumerate(zip(_TEXTS, vectors))
+    ]
+
+
+class LexicalTests(unittest.TestCase):
+    def test_tokenize_keeps_identifiers_and_their_parts(self) -> None:
+        self.assertEqual(tokenize("Error E-1042!"), ["error", "e-1042", "e", "1042"])
+        self.assertEqual(tokenize("ERR_CONN"), ["err_conn", "err", "conn"])
+
+    def test_bm25_ranks_exact_identifiers_and_roundtrips(self) -> None:
+        index = BM25Index.build(_TEXTS, digest="d")
+        rows, scores = index.search("what is E-1042", limit=5)
+        self.assertEqual(rows.tolist(), [0])
+        self.assertGreater(scores[0], 0)
+        # Same term count; the shorter chunk ranks first.
+        self.assertEqual(index.search("tray", limit=5)[0].tolist(), [2, 0])
+        self.assertEqual(index.search("unknown words", limit=5)[0].size, 0)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / "index.bm25.npz"
+            index.save(path)
+            loaded = BM25Index.load(path)
+        self.assertEqual(loaded.digest, "d")
+        np.testing.assert_array_equal(loaded.search("tray", 5)[1], index.search("tray", 5)[1])
+
+    def test_reciprocal_rank_fusion(self) -> None:
+        rows, scores = reciprocal_rank_fusion((np.array([3, 1]), np.array([1, 2])), k=60)
+        self.assertEqual(rows.tolist(), [1, 3, 2])
+        self.assertAlmostEqual(float(scores[0]), 1 / 62 + 1 / 61, places=6)
+
+    def test_retrieval_modes(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = str(Path(tmp_dir) / "index.vidx")
+            write_vector_index(make_config(lexical_index=True), _entries(), path)
+            self.assertTrue(Path(lexical_path(path)).exists())
+
+            def search(mode: str) -> list[str]:
+                config = make_config(retrieval_mode=mode, lexical_candidates=10)
+                index = load_vector_index(config, path)
+                chunks = search_chunks(config, index, [1.0, 0.0], "E-1042 tray", top_k=2)
+                return [chunk.uri.split("#")[0] for chunk in chunks]
+
+            self.assertEqual(search("vector"), ["doc3.txt", "doc1.txt"])
+            self.assertEqual(search("lexical"), ["doc0.txt", "doc2.txt"])
+            # Vector order, but only over chunks that mention a query term.
+            self.assertEqual(search("lexical_first"), ["doc2.txt", "doc0.txt"])
+            self.assertEqual(search("hybrid")[0], "doc0.txt")
+            with self.assertRaises(ValueError):
+                search("keyword")
+
+    def test_lexical_mode_skips_the_embedding_call(self) -> None:
+        config = make_config(retrieval_mode="lexical")
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = str(Path(tmp_dir) / "index.vidx")
+            write_vector_index(make_config(lexical_index=True), _entries(), path)
+            index = load_vector_index(config, path)
+            client = MagicMock()
+            client.embed_query_async = AsyncMock()
+
+            chunks = asyncio.run(
+                retrieve_context_async(
+                    config, "SKU 88-311", top_k=1, index=index, embedding_client=client
+                )
+            )
+
+        self.assertEqual([chunk.uri for chunk in chunks], ["doc2.txt#chunk=0"])
+        client.embed_query_async.assert_not_awaited()
+
+
+if __name__ == "__main__":
+    unittest.main()
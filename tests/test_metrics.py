@@ -0,0 +1,68 @@
+import asyncio
+import unittest
+
+from rag_chatbot.metrics import (
+    VERTEX_ERRORS,
+    MetricsRegistry,
+    collect_timings,
+    server_timing,
+    timed,
+    vertex_call,
+)
+
+
+class MetricsTests(unittest.TestCase):
+    def test_render_uses_the_prometheus_text_format(self) -> None:
+        registry = MetricsRegistry()
+        requests = registry.counter("app_requests_total", "Requests.", ("route",))
+        latency = registry.histogram("app_seconds", "Latency.", buckets=(0.1, 1.0))
+        registry.collector(
+            "app_entries", "Entries.", ("cache",), "gauge", lambda: [({"cache": "a"}, 3)]
+        )
+        requests.inc(route="/chat")
+        requests.inc(2, route="/chat")
+        latency.observe(0.05)
+        latency.observe(0.5)
+
+        text = registry.render()
+
+        self.assertIn("# TYPE app_requests_total counter\n", text)
+        self.assertIn('app_requests_total{route="/chat"} 3\n', text)
+        self.assertIn('app_seconds_bucket{le="0.1"} 1\n', text)
+        self.assertIn('app_seconds_bucket{le="1"} 2\n', text)
+        self.assertIn('app_seconds_bucket{le="+Inf"} 2\n', text)
+        self.assertIn("app_seconds_sum 0.55\n", text)
+        self.assertIn("app_seconds_count 2\n", text)
+        self.assertIn('app_entries{cache="a"} 3\n', text)
+        self.assertIs(registry.counter("app_requests_total", "Requests.", ("route",)), requests)
+        with self.assertRaises(ValueError):
+            requests.inc(path="/chat")
+
+    def test_timings_are_collected_across_worker_threads(self) -> None:
+        async def request() -> list[tuple[str, float]]:
+            with collect_timings() as timings:
+                with timed("embed_query"):
+                    pass
+                await asyncio.to_thread(self._timed_search)
+            return timings
+
+        timings = asyncio.run(request())
+
+        self.assertEqual([stage for stage, _ in timings], ["embed_query", "search"])
+        header = server_timing([("search", 0.0012), ("search", 0.001), ("generate", 1.5)])
+        self.assertEqual(header, "search;dur=2.2, generate;dur=1500.0")
+
+    @staticmethod
+    def _timed_search() -> None:
+        with timed("search"):
+            pass
+
+    def test_vertex_call_counts_errors_by_type(self) -> None:
+        before = VERTEX_ERRORS.value(operation="test", error="TimeoutError")
+        with self.assertRaises(TimeoutError), vertex_call("test"):
+            raise TimeoutError
+        self.assertEqual(VERTEX_ERRORS.value(operation="test", error="TimeoutError"), before + 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
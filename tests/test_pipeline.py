@@ -0,0 +1,49 @@
+import threading
+import time
+import unittest
+
+from rag_chatbot.pipeline import bounded_map
+
+
+class PipelineTests(unittest.TestCase):
+    def test_bounded_map_preserves_order(self) -> None:
+        def slow_square(value: int) -> int:
+            time.sleep(0.001 * (10 - value))
+            return value * value
+
+        self.assertEqual(
+            list(bounded_map(slow_square, range(10), workers=4)), [v * v for v in range(10)]
+        )
+
+    def test_bounded_map_limits_items_in_flight(self) -> None:
+        consumed = 0
+        produced = 0
+        max_ahead = 0
+        lock = threading.Lock()
+
+        def source():
+            nonlocal produced, max_ahead
+            for value in range(50):
+                with lock:
+                    produced += 1
+                    max_ahead = max(max_ahead, produced - consumed)
+                yield value
+
+        for _ in bounded_map(lambda value: value, source(), workers=2, max_pending=3):
+            consumed += 1
+            time.sleep(0.001)
+
+        self.assertLessEqual(max_ahead, 4)
+
+    def test_bounded_map_propagates_errors(self) -> None:
+        def fail_on_three(value: int) -> int:
+            if value == 3:
+                raise ValueError("boom")
+            return value
+
+        with self.assertRaises(ValueError):
+            list(bounded_map(fail_on_three, range(10), workers=2))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+
+from support import make_config
+
+from rag_chatbot.embeddings import estimate_tokens
+from rag_chatbot.prompting import assemble_context
+from rag_chatbot.retrieval import RetrievedChunk
+
+_DOCUMENT = " ".join(f"word{position}" for position in range(400))
+
+
+def _chunk(uri: str, content: str, score: float = 1.0) -> RetrievedChunk:
+    return RetrievedChunk(uri=uri, content=content, score=score)
+
+
+class PromptingTests(unittest.TestCase):
+    def test_near_duplicates_are_dropped_and_counted(self) -> None:
+        original = _chunk("a.txt#chunk=0", _DOCUMENT[:1500])
+        # A re-upload sliced a few words later overlaps almost entirely.
+        reupload = _chunk("a-copy.txt#chunk=0", _DOCUMENT[40:1540], 0.9)
+        other = _chunk("b.txt#chunk=0", "An unrelated chunk about printers.", 0.8)
+
+        context = assemble_context(make_config(), [original, reupload, other])
+
+        self.assertEqual(context.chunks, [original, other])
+        self.assertEqual(context.duplicates, 1)
+        self.assertEqual(context.tokens_saved, estimate_tokens(reupload.content))
+        self.assertEqual(
+            context.tokens, estimate_tokens(original.content) + estimate_tokens(other.content)
+        )
+
+    def test_budget_drops_chunks_that_do_not_fit(self) -> None:
+        chunks = [_chunk(f"doc{n}.txt", f"chunk {n} " + "x" * 300) for n in range(4)]
+        config = make_config(prompt_token_budget=250, prompt_duplicate_threshold=0.0)
+
+        context = assemble_context(config, chunks)
+
+        self.assertEqual([chunk.uri for chunk in context.chunks], ["doc0.txt", "doc1.txt"])
+        self.assertEqual(context.over_budget, 2)
+        self.assertLessEqual(context.tokens, 250)
+        again = assemble_context(config, context.chunks)
+        self.assertEqual(
+            (again.chunks, again.tokens, again.tokens_saved), (context.chunks, context.tokens, 0)
+        )
+
+    def test_best_chunk_is_truncated_to_the_budget(self) -> None:
+        config = make_config(prompt_token_budget=10)
+        context = assemble_context(config, [_chunk("big.txt", "y" * 100)])
+
+        self.assertEqual(len(context.chunks), 1)
+        self.assertLessEqual(context.tokens, 10)
+        self.assertEqual(context.tokens + context.tokens_saved, estimate_tokens("y" * 100))
+        self.assertEqual(assemble_context(config, context.chunks).chunks, context.chunks)
+
+    def test_zero_disables_both_checks(self) -> None:
+        chunks = [_chunk("a.txt", _DOCUMENT), _chunk("b.txt", _DOCUMENT)]
+        config = make_config(prompt_token_budget=0, prompt_duplicate_threshold=0.0)
+
+        self.assertEqual(assemble_context(config, chunks).chunks, chunks)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,184 @@
+import tempfile
+import tracemalloc
+import unittest
+from pathlib import Path
+
+import numpy as np
+from support import make_config
+
+from rag_chatbot.indexing import (
+    IndexEntry,
+    VectorIndex,
+    codes_path,
+    load_vector_index,
+    write_vector_index,
+)
+from rag_chatbot.quantization import (
+    Int8Codes,
+    PQCodes,
+    PrefixCodes,
+    build_codes,
+    load_codes,
+    save_codes,
+)
+from rag_chatbot.retrieval import search_index
+from rag_chatbot.vectors import normalize_rows
+
+
+def _matrix(rows: int, dim: int, seed: int = 0) -> np.ndarray:
+    return normalize_rows(np.random.default_rng(seed).normal(size=(rows, dim)))
+
+
+def _matryoshka_matrix(rows: int, dim: int, seed: int = 0) -> np.ndarray:
+    # Variance decays along the dimensions, so leading ones carry most of the signal.
+    decay = np.exp(-np.arange(dim) / (dim / 4))
+    return normalize_rows(np.random.default_rng(seed).normal(size=(rows, dim)) * decay)
+
+
+class QuantizationTests(unittest.TestCase):
+    def test_int8_scores_track_exact_scores(self) -> None:
+        matrix = _matrix(300, 32)
+        codes = Int8Codes.build(matrix)
+        query = matrix[0]
+
+        self.assertEqual(codes.codes.nbytes * 4, matrix.nbytes)
+        np.testing.assert_allclose(codes.scores(query), matrix @ query, atol=0.02)
+        rows = np.array([5, 1, 9])
+        np.testing.assert_allclose(codes.scores(query, rows), codes.scores(query)[rows])
+
+    def test_pq_is_sixteen_times_smaller_and_ranks_neighbours_high(self) -> None:
+        matrix = _matrix(1000, 32)
+        codes = PQCodes.build(matrix, subvector_dims=4)
+        query = matrix[3]
+
+        self.assertEqual(codes.codes.nbytes * 16, matrix.nbytes)
+        self.assertEqual(int(np.argmax(codes.scores(query))), 3)
+
+    def test_pq_rejects_uneven_subvectors(self) -> None:
+        with self.assertRaises(ValueError):
+            PQCodes.build(_matrix(10, 30), subvector_dims=4)
+        with self.assertRaises(ValueError):
+            build_codes(_matrix(10, 8), "fp4", pq_subvector_dims=4)
+
+    def test_prefix_scores_are_cosines_of_the_prefix(self) -> None:
+        matrix = _matrix(50, 16)
+        codes = PrefixCodes.build(matrix, dims=4)
+        query = matrix[7]
+
+        self.assertEqual(codes.codes.shape, (50, 4))
+        np.testing.assert_allclose(
+            codes.scores(query),
+            normalize_rows(matrix[:, :4]) @ normalize_rows(query[:4])[0],
+            rtol=1e-5,
+        )
+        rows = np.array([1, 7, 30])
+        np.testing.assert_allclose(codes.scores(query, rows), codes.scores(query)[rows])
+        with self.assertRaises(ValueError):
+            build_codes(matrix, "prefix", pq_subvector_dims=4, first_stage_dims=16)
+
+    def test_codes_roundtrip(self) -> None:
+        matrix = _matrix(50, 8)
+        for codes in (
+            Int8Codes.build(matrix),
+            PQCodes.build(matrix, subvector_dims=2),
+            PrefixCodes.build(matrix, dims=4),
+        ):
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                path = Path(tmp_dir) / "codes.npz"
+                save_codes(codes, path)
+                loaded = load_codes(path)
+            self.assertIs(type(loaded), type(codes))
+            np.testing.assert_array_equal(loaded.codes, codes.codes)
+            self.assertEqual(loaded.digest, codes.digest)
+
+    def test_shortlist_rescoring_matches_exact_search(self) -> None:
+        matrix = _matrix(2000, 32, seed=1)
+        entries = [
+            IndexEntry(uri=f"file#{row}", content=str(row), embedding=vector.tolist())
+            for row, vector in enumerate(matrix)
+        ]
+        queries = _matrix(20, 32, seed=2)
+        exact_index = VectorIndex(entries=entries)
+        for mode in ("int8", "pq"):
+            config = make_config(index_quantization=mode)
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                path = str(Path(tmp_dir) / "index.vidx")
+                write_vector_index(config, entries, path)
+                self.assertTrue(Path(codes_path(path)).exists())
+                index = load_vector_index(config, path)
+                self.assertIsNotNone(index.codes)
+
+                hits = 0
+                for query in queries:
+                    exact = search_index(exact_index, query, top_k=10)
+                    coarse = search_index(index, query, top_k=10, shortlist_factor=10)
+                    hits += len({c.uri for c in exact} & {c.uri for c in coarse})
+                    self.assertAlmostEqual(coarse[0].score, exact[0].score, places=5)
+                self.assertGreaterEqual(hits / (10 * len(queries)), 0.95, mode)
+
+    def test_prefix_shortlist_matches_exact_search(self) -> None:
+        matrix = _matryoshka_matrix(2000, 64, seed=1)
+        entries = [
+            IndexEntry(uri=f"file#{row}", content=str(row), embedding=vector.tolist())
+            for row, vector in enumerate(matrix)
+        ]
+        queries = _matryoshka_matrix(20, 64, seed=2)
+        exact_index = VectorIndex(entries=entries)
+        config = make_config(index_quantization="prefix", first_stage_dims=16)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = str(Path(tmp_dir) / "index.vidx")
+            write_vector_index(config, entries, path)
+            index = load_vector_index(config, path)
+            self.assertIsInstance(index.codes, PrefixCodes)
+
+            hits = 0
+            for query in queries:
+                exact = search_index(exact_index, query, top_k=10)
+                coarse = search_index(index, query, top_k=10, shortlist_factor=10)
+                hits += len({c.uri for c in exact} & {c.uri for c in coarse})
+                self.assertAlmostEqual(coarse[0].score, exact[0].score, places=5)
+        self.assertGreaterEqual(hits / (10 * len(queries)), 0.95)
+
+    def test_quantized_search_keeps_full_precision_rows_on_disk(self) -> None:
+        matrix = _matrix(4000, 128, seed=3)
+        entries = [
+            IndexEntry(uri=f"file#{row}", content=str(row), embedding=vector.tolist())
+            for row, vector in enumerate(matrix)
+        ]
+        queries = _matrix(5, 128, seed=4)
+        config = make_config(index_quantization="pq")
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = str(Path(tmp_dir) / "index.vidx")
+            write_vector_index(config, entries, path)
+            del entries
+            tracemalloc.start()
+            try:
+                index = load_vector_index(config, path)
+                for query in queries:
+                    search_index(index, query, top_k=10, shortlist_factor=10)
+                resident, _ = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+            self.assertIsNotNone(index.codes)
+            del index
+
+        # PQ codes are 1/16 of the float32 matrix; rows are read from the mmap.
+        self.assertLess(resident, matrix.nbytes // 4)
+
+    def test_quantization_requires_a_binary_index(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / "index.jsonl"
+            with self.assertRaises(ValueError):
+                write_vector_index(make_config(index_quantization="int8"), [], str(path))
+            self.assertFalse(path.exists())
+
+    def test_unknown_mode_is_rejected_before_writing(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / "index.vidx"
+            with self.assertRaises(ValueError):
+                write_vector_index(make_config(index_quantization="fp4"), [], str(path))
+            self.assertFalse(path.exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,184 @@
+import asyncio
+import math
+import random
+import unittest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import numpy as np
+from support import make_config
+
+from rag_chatbot.caching import TTLCache
+from rag_chatbot.clients import ClientRegistry, use_clients
+from rag_chatbot.embeddings import VertexEmbeddingClient
+from rag_chatbot.indexing import IndexEntry, VectorIndex
+from rag_chatbot.retrieval import (
+    embed_queries_async,
+    embed_query_async,
+    retrieve_context_async,
+    retrieve_context_batch,
+    search_chunks_batch,
+    search_index,
+)
+from rag_chatbot.vectors import top_k_indices
+
+
+def _reference_ranking(entries, query, top_k):
+    def cosine(left, right):
+        dot = sum(a * b for a, b in zip(left, right))
+        left_norm = math.sqrt(sum(a * a for a in left))
+        right_norm = math.sqrt(sum(b * b for b in right))
+        if left_norm == 0 or right_norm == 0:
+            return 0.0
+        return dot / (left_norm * right_norm)
+
+    scored = [(entry.uri, cosine(query, entry.embedding)) for entry in entries]
+    scored.sort(key=lambda item: item[1], reverse=True)
+    return scored[:top_k]
+
+
+class RetrievalTests(unittest.TestCase):
+    def test_search_index_matches_reference_ranking(self) -> None:
+        rng = random.Random(7)
+        entries = [
+            IndexEntry(
+                uri=f"doc#{position}",
+                content=f"chunk {position}",
+                embedding=[rng.uniform(-1, 1) for _ in range(16)],
+            )
+            for position in range(200)
+        ]
+        entries.append(IndexEntry(uri="zero", content="", embedding=[0.0] * 16))
+        index = VectorIndex(entries=entries)
+        query = [rng.uniform(-1, 1) for _ in range(16)]
+
+        results = search_index(index, query, top_k=10)
+        expected = _reference_ranking(entries, query, 10)
+
+        self.assertEqual([chunk.uri for chunk in results], [uri for uri, _ in expected])
+        for chunk, (_, score) in zip(results, expected):
+            self.assertAlmostEqual(chunk.score, score, places=5)
+
+    def test_top_k_indices_keeps_tie_order(self) -> None:
+        scores = np.array([0.5, 0.9, 0.5, 0.5, 0.1], dtype=np.float32)
+        self.assertEqual(top_k_indices(scores, 3).tolist(), [1, 0, 2])
+        self.assertEqual(top_k_indices(scores, 10).tolist(), [1, 0, 2, 3, 4])
+
+    def test_search_empty_index(self) -> None:
+        self.assertEqual(search_index(VectorIndex(entries=[]), [1.0, 0.0]), [])
+
+    @patch("rag_chatbot.embeddings.initialize_vertex_ai")
+    @patch("vertexai.preview.language_models.TextEmbeddingModel")
+    def test_retrieve_context_async_awaits_embedding(self, mock_model_cls, mock_init) -> None:
+        mock_model = mock_model_cls.from_pretrained.return_value
+        mock_model.get_embeddings_async = AsyncMock(
+            return_value=[SimpleNamespace(values=[0.0, 1.0])]
+        )
+        config = make_config()
+        index = VectorIndex(
+            entries=[
+                IndexEntry(uri="a", content="a", embedding=[1.0, 0.0]),
+                IndexEntry(uri="b", content="b", embedding=[0.0, 2.0]),
+            ]
+        )
+
+        with use_clients(ClientRegistry()):
+            results = asyncio.run(retrieve_context_async(config, "query", top_k=1, index=index))
+
+        self.assertEqual([chunk.uri for chunk in results], ["b"])
+        mock_model.get_embeddings_async.assert_awaited_once_with(["query"])
+        mock_model.get_embeddings.assert_not_called()
+
+    @patch("rag_chatbot.embeddings.initialize_vertex_ai")
+    @patch("vertexai.preview.language_models.TextEmbeddingModel")
+    def test_shared_embedding_client_loads_model_once(self, mock_model_cls, mock_init) -> None:
+        mock_model = mock_model_cls.from_pretrained.return_value
+        mock_model.get_embeddings_async = AsyncMock(
+            return_value=[SimpleNamespace(values=[0.0, 1.0])]
+        )
+        config = make_config()
+        client = VertexEmbeddingClient(config)
+
+        async def two_queries() -> None:
+            for query in ("first", "second"):
+                await embed_query_async(config, query, client=client)
+
+        asyncio.run(two_queries())
+
+        mock_model_cls.from_pretrained.assert_called_once_with(config.embedding_model)
+        self.assertEqual(mock_model.get_embeddings_async.await_count, 2)
+
+    def test_search_chunks_batch_matches_single_searches(self) -> None:
+        rng = np.random.default_rng(3)
+        entries = [
+            IndexEntry(uri=f"doc#{row}", content=str(row), embedding=vector.tolist())
+            for row, vector in enumerate(rng.normal(size=(300, 8)))
+        ]
+        index = VectorIndex(entries=entries)
+        queries = rng.normal(size=(6, 8))
+        config = make_config()
+
+        with patch("rag_chatbot.retrieval._BATCH_SCORE_BYTES", 300 * 4 * 4):
+            results = search_chunks_batch(config, index, queries, [""] * 6, top_k=4)
+
+        self.assertEqual(len(results), 6)
+        for query, found in zip(queries, results):
+            expected = search_index(index, query, top_k=4)
+            self.assertEqual([c.uri for c in found], [c.uri for c in expected])
+            for chunk, reference in zip(found, expected):
+                self.assertAlmostEqual(chunk.score, reference.score, places=5)
+        with self.assertRaises(ValueError):
+            search_chunks_batch(config, index, np.ones((2, 3)), ["", ""])
+
+    @patch("rag_chatbot.embeddings.initialize_vertex_ai")
+    @patch("vertexai.preview.language_models.TextEmbeddingModel")
+    def test_retrieve_context_batch_embeds_distinct_queries_in_batches(
+        self, mock_model_cls, mock_init
+    ) -> None:
+        mock_model = mock_model_cls.from_pretrained.return_value
+        mock_model.get_embeddings.side_effect = lambda texts: [
+            SimpleNamespace(values=[1.0, 0.0] if text.startswith("a") else [0.0, 1.0])
+            for text in texts
+        ]
+        config = make_config(embedding_model="text-embedding-005", embedding_batch_size=2)
+        index = VectorIndex(
+            entries=[
+                IndexEntry(uri="a", content="a", embedding=[1.0, 0.0]),
+                IndexEntry(uri="b", content="b", embedding=[0.0, 2.0]),
+            ]
+        )
+
+        with use_clients(ClientRegistry()):
+            results = retrieve_context_batch(
+                config, ["a1", "b1", "a1", "a2", "b2"], top_k=1, index=index
+            )
+
+        self.assertEqual(
+            [[chunk.uri for chunk in chunks] for chunks in results],
+            [["a"], ["b"], ["a"], ["a"], ["b"]],
+        )
+        self.assertEqual(mock_model.get_embeddings.call_count, 2)
+
+    def test_embed_queries_async_reuses_cache_and_deduplicates(self) -> None:
+        client = SimpleNamespace(
+            batches=lambda items, text_of=str: iter([list(items)]),
+            embed_texts_async=AsyncMock(
+                side_effect=lambda texts: [[float(len(text))] for text in texts]
+            ),
+        )
+        cache = TTLCache(max_size=10, ttl_seconds=60)
+        cache.put("cached", [9.0])
+
+        embeddings = asyncio.run(
+            embed_queries_async(
+                make_config(), ["Cached", "new", "NEW ", "other"], cache=cache, client=client
+            )
+        )
+
+        self.assertEqual(embeddings, [[9.0], [3.0], [3.0], [5.0]])
+        client.embed_texts_async.assert_awaited_once_with(["new", "other"])
+        self.assertEqual(cache.get("other"), [5.0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+from support import make_config
+
+from rag_chatbot.indexing import (
+    IndexEntry,
+    ShardedIndex,
+    VectorIndex,
+    get_index_version,
+    load_vector_index,
+    shard_of,
+    shards_path,
+    write_vector_index,
+)
+from rag_chatbot.retrieval import search_chunks_batch, search_index, shutdown_shard_workers
+from rag_chatbot.vectors import normalize_rows
+
+
+def _entries(documents: int, chunks: int, dim: int = 16) -> list[IndexEntry]:
+    matrix = normalize_rows(np.random.default_rng(0).normal(size=(documents * chunks, dim)))
+    return [
+        IndexEntry(
+            uri=f"docs/{row // chunks}.txt#{row % chunks}",
+            content=str(row),
+            embedding=vector.tolist(),
+        )
+        for row, vector in enumerate(matrix)
+    ]
+
+
+class ShardingTests(unittest.TestCase):
+    def tearDown(self) -> None:
+        shutdown_shard_workers()
+
+    def test_documents_are_split_across_shards(self) -> None:
+        entries = _entries(40, 3)
+        config = make_config(index_shards=4)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = str(Path(tmp_dir) / "index.vidx")
+            self.assertEqual(write_vector_index(config, entries, path), len(entries))
+            index = load_vector_index(config, path)
+
+            self.assertIsInstance(index, ShardedIndex)
+            self.assertFalse(Path(path).exists())
+            self.assertEqual(len(index.entries), len(entries))
+            self.assertEqual(sum(1 for count in index.counts if count), 4)
+            for position in range(4):
+                for entry in index.shard(position).entries:
+                    self.assertEqual(shard_of(entry.uri, 4), position)
+            self.assertEqual(
+                sorted(entry.uri for entry in index.entries),
+                sorted(entry.uri for entry in entries),
+            )
+
+    def test_sharded_search_matches_unsharded_search(self) -> None:
+        entries = _entries(50, 4)
+        exact_index = VectorIndex(entries=entries)
+        queries = normalize_rows(np.random.default_rng(1).normal(size=(5, 16)))
+        for processes in (1, 2):
+            config = make_config(index_shards=3, search_processes=processes)
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                path = str(Path(tmp_dir) / "index.vidx")
+                write_vector_index(config, entries, path)
+                index = load_vector_index(config, path)
+                batch = search_chunks_batch(config, index, queries, [""] * 5, top_k=7)
+                for query, batch_found in zip(queries, batch):
+                    expected = search_index(exact_index, query, top_k=7)
+                    found = search_index(index, query, top_k=7)
+                    self.assertEqual([c.uri for c in found], [c.uri for c in expected])
+                    self.assertEqual([c.uri for c in batch_found], [c.uri for c in expected])
+                    for chunk, reference in zip(found, expected):
+                        self.assertAlmostEqual(chunk.score, reference.score, places=5)
+
+    def test_rebuilds_replace_previous_files(self) -> None:
+        entries = _entries(10, 2)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = str(Path(tmp_dir) / "index.vidx")
+            write_vector_index(make_config(), entries, path)
+            first_version = get_index_version(make_config(), path)
+
+            write_vector_index(make_config(index_shards=2), entries, path)
+            self.assertNotEqual(get_index_version(make_config(), path), first_version)
+            write_vector_index(make_config(index_shards=3), entries, path)
+            names = sorted(p.name for p in Path(tmp_dir).iterdir())
+            self.assertEqual(len(names), 4)
+            self.assertIn(Path(shards_path(path)).name, names)
+            self.assertTrue(
+                all("-of-003" in name for name in names if name != "index.vidx.shards.json")
+            )
+
+            write_vector_index(make_config(), entries, path)
+            self.assertEqual([p.name for p in Path(tmp_dir).iterdir()], ["index.vidx"])
+            self.assertIsInstance(load_vector_index(make_config(), path), VectorIndex)
+
+    def test_sharding_requires_a_binary_index(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir, self.assertRaises(ValueError):
+            write_vector_index(make_config(index_shards=2), [], str(Path(tmp_dir) / "index.jsonl"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+import asyncio
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from google.api_core.exceptions import InvalidArgument, ResourceExhausted, ServiceUnavailable
+from support import fake_embeddings, make_config
+
+from rag_chatbot.clients import ClientRegistry, use_clients
+from rag_chatbot.embeddings import VertexEmbeddingClient
+from rag_chatbot.metrics import REGISTRY
+from rag_chatbot.throttling import AdaptiveController, error_status
+
+
+def _flaky(failures, result="ok"):
+    """A request that raises each of ``failures`` in turn, then returns ``result``."""
+    remaining = list(failures)
+
+    def request():
+        if remaining:
+            raise remaining.pop(0)
+        return result
+
+    return request
+
+
+class AdaptiveControllerTests(unittest.TestCase):
+    def test_retries_throttled_and_transient_failures(self) -> None:
+        controller = AdaptiveController("model", max_concurrency=4, backoff_seconds=0)
+
+        result = controller.call(
+            _flaky([ResourceExhausted("quota"), ServiceUnavailable("busy"), ConnectionError()])
+        )
+
+        self.assertEqual(result, "ok")
+        self.assertEqual(controller.stats()["retries"], 3)
+        self.assertEqual(controller.stats()["throttles"], 2)
+        self.assertEqual(controller.in_flight, 0)
+
+    def test_other_errors_and_exhausted_retries_are_raised(self) -> None:
+        controller = AdaptiveController(
+            "model", max_concurrency=4, max_retries=1, backoff_seconds=0
+        )
+
+        with self.assertRaises(InvalidArgument):
+            controller.call(_flaky([InvalidArgument("bad"), InvalidArgument("bad")]))
+        with self.assertRaises(ResourceExhausted):
+            controller.call(_flaky([ResourceExhausted("quota")] * 2))
+
+        self.assertEqual(controller.retries, 1)
+        self.assertEqual(error_status(ResourceExhausted("quota")), 429)
+        self.assertIsNone(error_status(ValueError()))
+
+    def test_limit_halves_once_per_round_and_grows_back(self) -> None:
+        controller = AdaptiveController("model", max_concurrency=8, max_retries=0)
+        started = [controller._acquire() for _ in range(3)]
+        for start in started:
+            controller._release(start, ResourceExhausted("quota"))
+        self.assertEqual(controller.limit, 4)
+
+        for _ in range(40):
+            controller.call(lambda: None)
+        self.assertEqual(controller.limit, 8)
+
+    def test_in_flight_calls_stay_within_the_limit(self) -> None:
+        controller = AdaptiveController("model", max_concurrency=2)
+        active = 0
+        peak = 0
+        lock = threading.Lock()
+
+        def request():
+            nonlocal active, peak
+            with lock:
+                active += 1
+                peak = max(peak, active)
+            time.sleep(0.01)
+            with lock:
+                active -= 1
+
+        threads = [threading.Thread(target=controller.call, args=(request,)) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(peak, 2)
+
+    def test_requests_per_minute_spaces_async_calls(self) -> None:
+        controller = AdaptiveController("model", max_concurrency=8, requests_per_minute=3000)
+
+        async def request():
+            return time.monotonic()
+
+        async def run():
+            return await asyncio.gather(*(controller.call_async(request) for _ in range(5)))
+
+        starts = asyncio.run(run())
+
+        # 3000 per minute is one call every 20 ms.
+        self.assertGreaterEqual(max(starts) - min(starts), 0.075)
+
+
+class ControlledCallTests(unittest.TestCase):
+    @patch("rag_chatbot.embeddings.initialize_vertex_ai")
+    @patch("vertexai.preview.language_models.TextEmbeddingModel")
+    def test_embedding_requests_survive_throttling(self, mock_model_cls, mock_init) -> None:
+        mock_model = mock_model_cls.from_pretrained.return_value
+        mock_model.get_embeddings.side_effect = [ResourceExhausted("quota"), fake_embeddings(["a"])]
+        config = make_config(vertex_backoff_seconds=0)
+
+        with use_clients(ClientRegistry()) as registry:
+            embeddings = VertexEmbeddingClient(config).embed_texts(["a"])
+            controller = registry.vertex_controller(config, config.embedding_model)
+            metrics = REGISTRY.render()
+
+        self.assertEqual(embeddings, [[1.0, 1.0]])
+        self.assertEqual(mock_model.get_embeddings.call_count, 2)
+        self.assertEqual(controller.throttles, 1)
+        self.assertIs(controller, registry.vertex_controllers()[0])
+        self.assertIn('rag_vertex_throttles_total{model="gemini-embedding-001"} 1', metrics)
+        self.assertIn('rag_vertex_concurrency_limit{model="gemini-embedding-001"} 8', metrics)
+
+
+if __name__ == "__main__":
+    unittest.main()